@@ -0,0 +1,276 @@
+# coding: utf-8
+"""
+
+## Activations Module
+- ActivationsModel class (inverse sigmoid curves of the antenna activations, fitted once by experimental dataset)
+- Dense lookup table of the activations means and standard deviations by distance
+- Vectorized evaluation of the activations of many (point, antenna) distances, with batched gaussian noise
+
+The model reproduces the values of ```exponential_regression_1D_array``` (main agent module), without fitting
+the curves again on each evaluation.
+
+The fitted parameters are saved next to the experimental dataset (```<dataset name>.activations.npz```), so the curves
+are only fitted again when the dataset changes. The directory of the parameters files can be set with the environment
+variable ```BACKEND_ACTIVATIONS_PARAMS_DIR```.
+
+"""
+import os
+import csv
+import hashlib
+import threading
+import statistics
+import numpy as np
+from scipy.optimize import curve_fit
+
+# Maximum distance (in meters) of the activations of the antennas (beyond it the activations are 0)
+activations_max_distance = 10
+
+# Distance step (in meters) of the lookup table (the measured distances are rounded to 2 decimal places)
+lookup_table_resolution = 0.01
+
+# Decimal places of the activations values
+activations_precision = 4
+
+# Default directory of the fitted parameters files (the directory of the experimental datasets)
+default_activations_params_dir = os.environ.get("BACKEND_ACTIVATIONS_PARAMS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "static-files", "antenna_datasets"))
+
+# Fitted activations models by dataset (sha1 of the csv file content)
+_activations_models = {}
+_activations_models_lock = threading.Lock()
+
+# inverse sigmoid function (also used by the activations regressions of the main agent module)
+# source: https://stackoverflow.com/questions/43213069/fit-bipolar-sigmoid-python/43213692#43213692
+def inv_sigmoid(x: np.ndarray, a: float, b: float, c: float, d: float) -> np.ndarray:
+    """
+    Inverse Sigmoid Function source: https://stackoverflow.com/questions/43213069/fit-bipolar-sigmoid-python/43213692#43213692
+
+    Args:
+        x (np.ndarray): Array of data to apply the optimization
+        a (float): adjusts amplitude;
+        b (float): adjusts y offset;
+        c (float): adjusts x offset;
+        d (float): adjusts slope
+
+    Returns:
+        np.ndarray: The inverse sigmoid function curve.
+    """
+    y = ((a-b) / (1 + np.exp(x-(c/2))**d)) + b
+    return y
+
+class ActivationsModel:
+    """
+    Inverse sigmoid curves of the activations of each antenna RF transmission power (280, 290, 300 mW) over the distance.
+    """
+    def __init__(self, params: np.ndarray, experimental_distances: np.ndarray, experimental_stds: np.ndarray, dataset_key: str = None):
+        """
+        Initialize the ActivationsModel class object and build its lookup table.
+
+        Args:
+            self: ActivationsModel object itself
+            params (np.ndarray): Array of shape (C, 4) with the fitted inverse sigmoid parameters of each column
+            experimental_distances (np.ndarray): Array of shape (D,) with the sorted distances of the experimental dataset
+            experimental_stds (np.ndarray): Array of shape (D, C) with the standard deviations of each column by distance
+            dataset_key (str): Key of the experimental dataset of the model (sha1 of the csv file content)
+        """
+        self.dataset_key = dataset_key
+        self.params = np.asarray(params, dtype=float)
+        self.experimental_distances = np.asarray(experimental_distances, dtype=float)
+        self.experimental_stds = np.asarray(experimental_stds, dtype=float)
+
+        # dense lookup table of distance -> means / standard deviations
+        nr_steps = int(round(activations_max_distance / lookup_table_resolution)) + 1
+        self.lookup_distances = np.round(np.arange(nr_steps) * lookup_table_resolution, 2)
+        self.lookup_means = self.activations_means(self.lookup_distances)
+        self.lookup_stds = self.activations_stds(self.lookup_distances)
+
+    @classmethod
+    def fit(cls, dataset: str) -> "ActivationsModel":
+        """
+        Fit the activations curves of the experimental Antenna RF dataset
+        (same curve_fit parameters of exponential_regression_1D_array, on each power column).
+
+        Args:
+            dataset (str): Content of the csv file of the experimental Antenna RF dataset
+
+        Returns:
+            ActivationsModel: The fitted activations model
+        """
+        distances, values, stds = _read_dataset(dataset)
+
+        params = []
+        for i in range(values.shape[1]):
+            x = np.linspace(np.min(distances), np.max(distances), len(distances))
+            y = values[:, i]
+
+            # this is an mandatory initial guess
+            p0_inv_sig = [max(y), min(y), max(x), 1.0]
+
+            # curve_fit call
+            popt, pcov = curve_fit(inv_sigmoid, np.concatenate((x[:6],x[10:])), np.concatenate((y[:6],y[10:])), p0_inv_sig, maxfev=10000, method='dogbox')
+            params.append(popt)
+
+        order = np.argsort(distances, kind="stable")
+        return cls(np.array(params), distances[order], stds[order], dataset_key(dataset))
+
+    @classmethod
+    def load(cls, file_path: str) -> "ActivationsModel":
+        """
+        Load an activations model saved with save().
+
+        Args:
+            file_path (str): Path of the .npz file
+
+        Returns:
+            ActivationsModel: The loaded activations model
+        """
+        with np.load(file_path) as data:
+            return cls(data["params"], data["experimental_distances"], data["experimental_stds"],
+                       str(data["dataset_key"]) or None if "dataset_key" in data.files else None)
+
+    def save(self, file_path: str):
+        """
+        Save the fitted parameters and the lookup table of the activations model to a .npz file (written on a temporary file
+        and then renamed, so a concurrent load never sees a partial file).
+
+        Args:
+            self: ActivationsModel object itself
+            file_path (str): Path of the .npz file
+        """
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            np.savez(file, params=self.params, experimental_distances=self.experimental_distances, experimental_stds=self.experimental_stds,
+                     lookup_distances=self.lookup_distances, lookup_means=self.lookup_means, lookup_stds=self.lookup_stds,
+                     dataset_key=np.array(self.dataset_key or ""))
+        os.replace(temp_path, file_path)
+
+    def activations_means(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the fitted curves (activations without noise) on a set of distances.
+
+        Args:
+            self: ActivationsModel object itself
+            distances (np.ndarray): Array of shape (K,) with distances in meters
+
+        Returns:
+            np.ndarray: Array of shape (K, C) with the activations of each column, rounded to 4 decimal places
+        """
+        distances = np.asarray(distances, dtype=float).reshape(-1, 1)
+        return np.round(inv_sigmoid(distances, *[self.params[:, p] for p in range(4)]), activations_precision)
+
+    def activations_stds(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Get the standard deviations of the activations on a set of distances
+        (of the maximum experimental distance no greater than each distance, or of the first one).
+
+        Args:
+            self: ActivationsModel object itself
+            distances (np.ndarray): Array of shape (K,) with distances in meters
+
+        Returns:
+            np.ndarray: Array of shape (K, C) with the standard deviations of each column
+        """
+        distances = np.asarray(distances, dtype=float).reshape(-1)
+        under_index = np.maximum(np.searchsorted(self.experimental_distances, distances, side="right") - 1, 0)
+        return self.experimental_stds[under_index]
+
+    def evaluate(self, distances: list, rng: object = np.random) -> list:
+        """
+        Evaluate the activations of a set of distances with gaussian noise of the experimental standard deviations
+        (all the noise samples are drawn in one call, in the same order of consecutive exponential_regression_1D_array calls).
+
+        Args:
+            self: ActivationsModel object itself
+            distances (list): List of K distances in meters
+            rng (object): Random generator with a normal(loc, scale) method (by default, the numpy global random state)
+
+        Returns:
+            list: List of K lists with the noised activations of each antenna RF transmission power (280, 290, 300 mW)
+        """
+        distances = np.asarray(distances, dtype=float).reshape(-1)
+        if len(distances) == 0:
+            return []
+
+        # lookup table for the distances on its steps, the fitted curves for the others
+        steps = np.clip(np.rint(distances / lookup_table_resolution).astype(np.int64), 0, len(self.lookup_distances) - 1)
+        on_table = self.lookup_distances[steps] == distances
+        means = self.lookup_means[steps]
+        stds = self.lookup_stds[steps]
+        if not np.all(on_table):
+            means[~on_table] = self.activations_means(distances[~on_table])
+            stds[~on_table] = self.activations_stds(distances[~on_table])
+
+        # sum noise to output values and round to 4 decimal places
+        noised = np.round(means + rng.normal(0, stds), activations_precision)
+
+        # clip to 0 if value is negative
+        return [[value if value >= 0 else 0 for value in row] for row in noised.tolist()]
+
+# Get the key of an experimental dataset (sha1 of the csv file content)
+def dataset_key(dataset: str) -> str:
+    return hashlib.sha1(dataset.encode("utf-8")).hexdigest()
+
+# Get the path of the fitted parameters file of an experimental dataset
+def activations_params_path(dataset_name: str, params_dir: str = default_activations_params_dir) -> str:
+    """
+    Get the path of the fitted parameters file of an experimental dataset (next to the dataset, by default).
+
+    Args:
+        dataset_name (str): File name of the experimental dataset (e.g. antenna_experimental_dataset_10m.csv)
+        params_dir (str): Directory of the parameters files
+
+    Returns:
+        str: Path of the parameters file
+    """
+    return os.path.join(os.path.abspath(params_dir), f"{os.path.splitext(dataset_name)[0]}.activations.npz")
+
+# Get the activations model of an experimental dataset (loaded from its parameters file, or fitted and saved)
+def load_activations_model(dataset: str, params_path: str = None) -> ActivationsModel:
+    """
+    Get the activations model of the experimental Antenna RF dataset, by dataset content: loaded from the parameters file
+    (if saved from the same dataset), or fitted and saved on the parameters file.
+
+    Args:
+        dataset (str): Content of the csv file of the experimental Antenna RF dataset
+        params_path (str): Path of the fitted parameters file of the dataset (None to fit it on each process start)
+
+    Returns:
+        ActivationsModel: The activations model
+    """
+    key = dataset_key(dataset)
+    with _activations_models_lock:
+        if key in _activations_models:
+            return _activations_models[key]
+
+        model = None
+        if params_path is not None and os.path.isfile(params_path):
+            try:
+                model = ActivationsModel.load(params_path)
+            except (OSError, ValueError, KeyError) as error:
+                print(f"Skipping invalid activations parameters file '{params_path}': {error}")
+            if model is not None and model.dataset_key != key:
+                model = None
+
+        if model is None:
+            model = ActivationsModel.fit(dataset)
+            if params_path is not None:
+                try:
+                    model.save(params_path)
+                except OSError as error:
+                    print(f"Error on save of the activations parameters file '{params_path}': {error}")
+
+        _activations_models[key] = model
+        return model
+
+# Read the experimental dataset (averages and standard deviations of the power columns by distance)
+def _read_dataset(dataset: str) -> tuple:
+    rows_by_distance = {}
+    for row in csv.DictReader(dataset.splitlines()):
+        # power columns (the digit keys, e.g. 280, 290, 300)
+        rows_by_distance.setdefault(row["distance"], []).append([float(row[key]) for key in row.keys() if key.isdigit()])
+
+    distances = np.array(list(rows_by_distance.keys()), dtype=float)
+    values = np.array([[statistics.mean(column) for column in zip(*rows)] for rows in rows_by_distance.values()])
+    stds = np.array([np.std(rows, axis=0) for rows in rows_by_distance.values()])
+
+    return distances, values, stds
@@ -0,0 +1,335 @@
+# coding: utf-8
+"""
+
+## Batch Simulation Module
+- Headless batch simulation of a map config file: the asset point animations (```asset_point_animations```) are replayed
+  as on the frontend (positions and lobes bearing), and the backend calculate runs in-process (no MQTT broker, no browser)
+  as fast as the CPU allows.
+- Datasets with the same columns of the csv listener clients (```static-files/utils/python_mqtt_client```): RSSI of the
+  antennas and asset point coordinates (one row by asset point and step), or antennas activations, anchors activations,
+  asset points distances and asset point coordinates (one row by step).
+
+Usage (from repository root), e.g.:
+```python -m src.backend.src.batch_simulation_module src/static-files/config_files/config-params-library-ua-floor2.json --features rssi --rows 100000```
+
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+import argparse
+from datetime import datetime
+
+# Activations columns of each antenna (antenna RF transmission powers in mW)
+activations_powers = (280, 290, 300)
+
+class DatasetClient:
+    """
+    Client of the calculate results (replaces the MQTT client): keeps the last message published to the frontend topic.
+    """
+    def __init__(self, frontend_topic: str):
+        """
+        Initialize the DatasetClient class object.
+
+        Args:
+            self: DatasetClient object itself
+            frontend_topic (str): The frontend topic of the sessions (the results messages are published to frontend_topic/uuid)
+        """
+        self.frontend_topic = frontend_topic + "/"
+        self.message = None
+
+    def publish(self, topic: str, payload: str):
+        """
+        Receive a published message (only the results of the frontend topic are kept).
+
+        Args:
+            self: DatasetClient object itself
+            topic (str): The topic of the message
+            payload (str): The message (JSON)
+        """
+        if topic.startswith(self.frontend_topic):
+            self.message = json.loads(payload)
+
+# Bearing (degrees) between two locations, as the frontend animations (getBearingBetweenLocations)
+def get_bearing(last_coords: list, new_coords: list) -> float:
+    """
+    Get the bearing between two locations, as set on the large lobe of the animated asset points by the frontend.
+
+    Args:
+        last_coords (list): Longitude and Latitude of the last position
+        new_coords (list): Longitude and Latitude of the new position
+
+    Returns:
+        float: The bearing in degrees (-180 to 180)
+    """
+    bearing = math.atan2(math.radians(new_coords[1]) - math.radians(last_coords[1]), math.radians(new_coords[0]) - math.radians(last_coords[0]))
+    return restrict_to_180_degrees(math.degrees(bearing) - 90)
+
+# Restrict an angle to -180 to 180 degrees (as the frontend rescrictTo180Degrees)
+def restrict_to_180_degrees(angle: float) -> float:
+    angle = (float(angle) % 360 + 360) % 360
+    return angle - 360 if angle > 180 else angle
+
+# Read the features of a geojson file of the config (paths relative to the static-files directory)
+def read_features(static_files_dir: str, path_name: str) -> list:
+    with open(os.path.normpath(os.path.join(static_files_dir, path_name))) as file:
+        return json.load(file)["features"]
+
+def load_scene(config_file: str, animations: list = None) -> dict:
+    """
+    Load the scene of a map config file: antennas, anchors and asset points (as the messages of the frontend),
+    the trajectories of the asset point animations and the RSSI path loss parameters.
+
+    Args:
+        config_file (str): Path of the config file (in the config_files directory of the static-files)
+        animations (list): Numbers (1 to K) of the asset point animations to replay, one asset point by animation (None for all)
+
+    Returns:
+        dict: The scene ("antennas", "anchors", "asset_points" and "rssi_params" message data, and the "trajectories")
+    """
+    with open(config_file) as file:
+        config_json = json.load(file)
+    static_files_dir = os.path.dirname(os.path.dirname(os.path.abspath(config_file)))
+    map_config = config_json["map"]
+
+    antennas = [{"LongLat": feature["geometry"]["coordinates"], "DirOpen": [feature["properties"]["angle_direction"], feature["properties"]["angle_opening"]],
+                 "TxPower": feature["properties"]["tx_power"]} for feature in read_features(static_files_dir, map_config["antennas_url"])]
+    anchors = [{"LongLat": feature["geometry"]["coordinates"]} for feature in read_features(static_files_dir, map_config["anchors_url"])]
+    asset_points_features = read_features(static_files_dir, map_config["assets_url"])
+
+    animations_paths = map_config.get("asset_point_animations", [])
+    animations = animations if animations else list(range(1, len(animations_paths) + 1))
+    trajectories = []
+    for animation in animations:
+        if animation < 1 or animation > len(animations_paths):
+            raise ValueError(f"Unknown animation #{animation} (the config file has {len(animations_paths)} animations)")
+        trajectories.append(read_features(static_files_dir, animations_paths[animation - 1])[0]["geometry"]["coordinates"])
+
+    # asset points of the animations (with the lobes openings of the asset points of the map, if set)
+    asset_points = []
+    for index in range(len(trajectories)):
+        properties = asset_points_features[index]["properties"] if index < len(asset_points_features) else {}
+        asset_points.append({"LongLat": trajectories[index][0],
+                             "LargeDirOpen": [properties.get("angle_direction_large_lobe", 0), properties.get("angle_opening_large_lobe", 180)],
+                             "SmallDirOpen": [properties.get("angle_direction_small_lobe", 180), properties.get("angle_opening_small_lobe", 180)]})
+
+    path_loss = config_json["rssi_path_loss_parameters"]
+    rssi_params = {"tx": path_loss["transmission_power"], "ple(n)": path_loss["path_loss_expoent"], "cf": path_loss["gaussian_distribuition"],
+                   "skew": path_loss["skew_index"], "d0": path_loss["reference_distance"], "af": path_loss["attenuation_factor"]}
+
+    return {"config_file": os.path.basename(config_file), "static_files_dir": static_files_dir, "antennas": antennas, "anchors": anchors,
+            "asset_points": asset_points, "trajectories": trajectories, "animations": animations, "rssi_params": rssi_params}
+
+def animation_steps(asset_points: list, trajectories: list):
+    """
+    Replay the trajectories of the asset points as the frontend animations (the large lobe follows the bearing of the move,
+    the small lobe the opposite direction), looping over the trajectories.
+
+    Args:
+        asset_points (list): The asset points message data (one by trajectory)
+        trajectories (list): The trajectories (lists of Longitude and Latitude coordinates)
+
+    Yields:
+        list: The asset points message data of each step
+    """
+    step = 0
+    while True:
+        for index, trajectory in enumerate(trajectories):
+            last_coords = asset_points[index]["LongLat"]
+            new_coords = trajectory[step % len(trajectory)]
+            direction = get_bearing(last_coords, new_coords)
+            asset_points[index] = {"LongLat": [round(new_coords[0], 8), round(new_coords[1], 8)],
+                                   "LargeDirOpen": [round(direction, 2), asset_points[index]["LargeDirOpen"][1]],
+                                   "SmallDirOpen": [round(restrict_to_180_degrees(direction + 180), 2), asset_points[index]["SmallDirOpen"][1]]}
+        yield asset_points
+        step += 1
+
+# Header of the RSSI dataset (as paho_mqtt_client_antennas_rssi_to_csv_file)
+def rssi_header(nr_antennas: int) -> list:
+    return ['RSSI_Antenna_' + str(i + 1) for i in range(nr_antennas)] + ['AssetPoint_Longitude', 'AssetPoint_Latitude']
+
+# Rows of the RSSI dataset of a results message (one by asset point)
+def rssi_rows(message: dict) -> list:
+    return [list(message["ap-rssi"][index]) + list(message["ap-coords"][index]) for index in range(len(message["ap-coords"]))]
+
+# Header of the activations dataset (as paho_mqtt_client_antennas_activations_to_csv_file, by asset point)
+def activations_header(nr_asset_points: int, nr_anchors: int, nr_antennas: int) -> list:
+    header = []
+    for ap in range(nr_asset_points):
+        header += [f'AP{ap + 1}_{power}_Antenna{i + 1}' for i in range(nr_antennas) for power in activations_powers]
+    for j in range(nr_anchors):
+        header += [f'Anchor{j + 1}_{power}_Antenna{k + 1}' for k in range(nr_antennas) for power in activations_powers]
+    for ap in range(nr_asset_points):
+        header += [f'AP{ap + 1}_distance_Antenna{i + 1}' for i in range(nr_antennas)]
+    return header + ['AP1_Longitude', 'AP1_Latitude']
+
+# Rows of the activations dataset of a results message (one row)
+def activations_rows(message: dict) -> list:
+    row = [value for activations in message["ap-activ"] for antenna in activations for value in antenna]
+    row += [value for activations in message["anch-activ"] for antenna in activations for value in antenna]
+    row += [distance for distances in message["ap-dist"] for distance in distances]
+    return [row + list(message["ap-coords"][0])]
+
+def dataset_file_name(scene: dict, features: str) -> str:
+    """
+    Get the file name of a dataset (as the names of the csv listener clients files).
+
+    Args:
+        scene (dict): The scene of the simulation (from load_scene)
+        features (str): The features of the dataset ("rssi" or "activations")
+
+    Returns:
+        str: The file name of the dataset
+    """
+    dt_string = datetime.now().strftime("%d-%m-%Y_%H%M%S")
+    nr_antennas = len(scene["antennas"])
+    if features == "activations":
+        return f"antennas_multi_features_{dt_string}_Ant#{nr_antennas}.csv"
+    rssi_params = scene["rssi_params"]
+    return (f"rssi_antennas_{dt_string}_APs#{len(scene['asset_points'])}_Ant#{nr_antennas}_n{rssi_params['ple(n)']}_TxPwr{rssi_params['tx']}"
+            f"_Xsigma{rssi_params['cf']}_sigma{rssi_params['skew']}_Anim#{'-'.join(str(animation) for animation in scene['animations'])}.csv")
+
+def prepare_agent(scene: dict) -> tuple:
+    """
+    Prepare the backend (main agent module) to calculate the scene in-process: the static files are read from the local
+    directory of the config file, with the map id of the config file (a new map id, if the config file is not a known map),
+    and the map context is built (the measured geometry of the steps is only kept on the calculate cache).
+
+    Args:
+        scene (dict): The scene of the simulation (from load_scene)
+
+    Returns:
+        tuple: The main agent module and the map id of the scene
+    """
+    from src.backend.src import main_agent_module as agent
+    from src.backend.src.trajectories_module import TrajectoryTables
+    from src.backend.src.wall_crossings_raster_module import WallCrossingsRasters
+
+    agent.host_domain_name_server = "file://" + os.path.dirname(scene["static_files_dir"])
+    map_ids = {config_file: map_id for map_id, config_file in agent.config_files_by_map_id.items()}
+    if scene["config_file"] not in map_ids:
+        map_ids[scene["config_file"]] = max(agent.config_files_by_map_id) + 1
+        agent.config_files_by_map_id[map_ids[scene["config_file"]]] = scene["config_file"]
+    agent.god = agent.GOD()
+
+    # build the map context, then drop the wall crossings rasters and trajectory tables of the map (built on background threads
+    # for the long-lived sessions): the session replays the same trajectories (the calculate cache hits from the second lap)
+    agent.map_contexts.get(map_ids[scene["config_file"]])
+    agent.wall_crossings_rasters = WallCrossingsRasters(agent.wall_intersections_pool)
+    agent.trajectory_tables = TrajectoryTables(agent.wall_intersections_pool)
+    return agent, map_ids[scene["config_file"]]
+
+def open_session(agent: object, scene: dict, map_id: int, session_uuid: str):
+    """
+    Open a session of the scene on the GOD object (as the setup messages of the frontend).
+
+    Args:
+        agent (object): The main agent module (from prepare_agent)
+        scene (dict): The scene of the simulation (from load_scene)
+        map_id (int): The map id of the scene
+        session_uuid (str): The session uuid
+    """
+    agent.god.setStatus("open", session_uuid)
+    agent.god.setMapId(map_id, session_uuid)
+    agent.god.updateAntenna(scene["antennas"], session_uuid)
+    agent.god.updateAnchor(scene["anchors"], session_uuid)
+    agent.god.setAlgorithms(["all"], session_uuid)
+    agent.god.setRssiParams(scene["rssi_params"], session_uuid)
+
+# Header of the dataset of a scene (columns of the csv listener clients)
+def dataset_header(scene: dict, features: str) -> list:
+    if features == "activations":
+        return activations_header(len(scene["asset_points"]), len(scene["anchors"]), len(scene["antennas"]))
+    return rssi_header(len(scene["antennas"]))
+
+def simulation_rows(agent: object, scene: dict, features: str, session_uuid: str):
+    """
+    Replay the animations of the scene on an open session, calculating each step in-process.
+
+    Args:
+        agent (object): The main agent module (from prepare_agent)
+        scene (dict): The scene of the simulation (from load_scene)
+        features (str): The features of the dataset ("rssi" or "activations")
+        session_uuid (str): The session uuid (from open_session)
+
+    Yields:
+        list: The dataset rows of each step
+    """
+    get_rows = activations_rows if features == "activations" else rssi_rows
+    client = DatasetClient(agent.publish_topic_frontend)
+    for asset_points in animation_steps(list(scene["asset_points"]), scene["trajectories"]):
+        agent.god.updateAssetPoint(asset_points, session_uuid)
+        agent.calculate(client, session_uuid, agent.calculate_cache)
+        yield get_rows(client.message)
+
+def simulate(scene: dict, features: str, nr_rows: int, output_file: str, seed: int = None) -> int:
+    """
+    Run the batch simulation of a scene: replay its animations step by step, calculate each step in-process and write
+    the dataset rows until nr_rows rows.
+
+    Args:
+        scene (dict): The scene of the simulation (from load_scene)
+        features (str): The features of the dataset ("rssi" or "activations")
+        nr_rows (int): Amount of rows of the dataset
+        output_file (str): Path of the csv file of the dataset
+        seed (int): Fixed seed of the RSSI and activations noise (None for a random seed)
+
+    Returns:
+        int: Amount of steps simulated
+    """
+    from src.backend.src.noise_module import NoiseGenerators
+
+    agent, map_id = prepare_agent(scene)
+    if seed is not None:
+        agent.noise_generators = NoiseGenerators(seed)
+    session_uuid = "batch-simulation"
+    open_session(agent, scene, map_id, session_uuid)
+
+    nr_steps = 0
+    written_rows = 0
+    with open(output_file, 'w', encoding='UTF8', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator='\n')
+        csv_writer.writerow(dataset_header(scene, features))
+        for rows in simulation_rows(agent, scene, features, session_uuid):
+            rows = rows[:nr_rows - written_rows]
+            csv_writer.writerows(rows)
+            written_rows += len(rows)
+            nr_steps += 1
+            if written_rows >= nr_rows:
+                break
+
+    return nr_steps
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description="Generate a dataset of a map config file without MQTT (headless batch simulation of its animations)")
+    parser.add_argument("config_file", help="config file of the map (in the config_files directory of the static-files)")
+    parser.add_argument("--features", choices=("rssi", "activations"), default="rssi", help="features of the dataset")
+    parser.add_argument("--rows", type=int, default=10000, help="amount of rows of the dataset")
+    parser.add_argument("--animations", type=int, nargs="+", help="numbers of the asset point animations to replay, one asset point by animation (default: all)")
+    parser.add_argument("--seed", type=int, default=None, help="fixed seed of the RSSI and activations noise")
+    parser.add_argument("--tx", type=float, help="transmission power (dBm) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--ple", type=float, help="path loss expoent (n) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--cf", type=float, help="constant of fading (Xσ) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--skew", type=float, help="skew index (σ) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--output-dir", default=".", help="directory of the dataset file")
+    parser.add_argument("--output", help="path of the dataset file (default: named as the csv listener clients files, on output-dir)")
+    args = parser.parse_args(args)
+
+    scene = load_scene(args.config_file, args.animations)
+    for param, value in (("tx", args.tx), ("ple(n)", args.ple), ("cf", args.cf), ("skew", args.skew)):
+        if value is not None:
+            scene["rssi_params"][param] = value
+    output_file = args.output or os.path.join(args.output_dir, dataset_file_name(scene, args.features))
+
+    t_start = time.perf_counter()
+    nr_steps = simulate(scene, args.features, args.rows, output_file, args.seed)
+    t_total = time.perf_counter() - t_start
+    from src.backend.src import main_agent_module as agent
+    agent.wall_intersections_pool.shutdown()
+    print(f"{output_file}: {args.rows} rows ({nr_steps} steps of {len(scene['asset_points'])} asset points) in {t_total:.1f} s "
+          f"({nr_steps / t_total:.0f} steps/s)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
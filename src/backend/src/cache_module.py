@@ -0,0 +1,245 @@
+# coding: utf-8
+"""
+
+## Cache Module
+- CalculateCache class (bounded in-memory cache of the calculate results, with LRU eviction)
+- Hashed structured keys (session uuid + digest of the point and antenna data)
+- Hit / miss / eviction counters (and hit rate) by session, and removal of all the entries of a session (e.g. on the session close)
+
+The cache budget can be set with the environment variables ```BACKEND_CACHE_MAX_ENTRIES``` (maximum amount of entries)
+and ```BACKEND_CACHE_MAX_MB``` (maximum estimated memory size of the entries, in megabytes).
+
+"""
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Default maximum amount of entries of the cache
+default_max_entries = int(os.environ.get("BACKEND_CACHE_MAX_ENTRIES", 100000))
+
+# Default maximum estimated memory size of the cache entries (in bytes)
+default_max_bytes = int(float(os.environ.get("BACKEND_CACHE_MAX_MB", 256)) * 1024 * 1024)
+
+# Estimate the memory size (in bytes) of a cache value (dicts, lists and tuples are measured recursively)
+def estimate_size(value: object) -> int:
+    """
+    Estimate the memory size of a value, adding the size of the items of dicts, lists and tuples.
+
+    Args:
+        value (object): The value to measure
+
+    Returns:
+        int: Estimated memory size in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+class CalculateCache:
+    """
+    Bounded in-memory cache of the calculate results by point (Asset Point or Anchor), with LRU eviction.
+    """
+    def __init__(self, max_entries: int = default_max_entries, max_bytes: int = default_max_bytes):
+        """
+        Initialize the CalculateCache class object.
+
+        Args:
+            self: CalculateCache object itself
+            max_entries (int): Maximum amount of entries (None for no limit)
+            max_bytes (int): Maximum estimated memory size of the entries in bytes (None for no limit)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.session_keys = {}
+        self.session_stats = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(session_uuid: str, *key_data: object) -> tuple:
+        """
+        Make a cache key of a session from the data the cached values depend on.
+
+        Args:
+            session_uuid (str): The session uuid
+            key_data (object): Data of the key (e.g. point coordinates and lobes, antenna coordinates and lobe)
+
+        Returns:
+            tuple: The cache key (session uuid, digest of the key data)
+        """
+        return (session_uuid, CalculateCache.make_digest(*key_data))
+
+    @staticmethod
+    def make_digest(*key_data: object) -> bytes:
+        """
+        Make the digest of the data of a key (e.g. of a point or of an antenna, to join the digests of many pairs into keys).
+
+        Args:
+            key_data (object): Data of the key
+
+        Returns:
+            bytes: The digest of the key data
+        """
+        return hashlib.blake2b(repr(key_data).encode("utf-8"), digest_size=16).digest()
+
+    def _get_stats(self, session_uuid: str) -> dict:
+        if session_uuid not in self.session_stats:
+            self.session_stats[session_uuid] = {"hits": 0, "misses": 0, "evictions": 0}
+        return self.session_stats[session_uuid]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: tuple) -> object:
+        """
+        Get the cached value of a key (counted as a hit or a miss of the key session).
+
+        Args:
+            self: CalculateCache object itself
+            key (tuple): The cache key (from make_key)
+
+        Returns:
+            object: The cached value (or None, if not cached)
+        """
+        with self.lock:
+            stats = self._get_stats(key[0])
+            if key not in self.entries:
+                stats["misses"] += 1
+                return None
+            stats["hits"] += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def get_many(self, keys: list) -> list:
+        """
+        Get the cached values of many keys at once (each key counted as a hit or a miss of its session).
+
+        Args:
+            self: CalculateCache object itself
+            keys (list): The cache keys
+
+        Returns:
+            list: The cached value of each key (or None, if not cached)
+        """
+        values = []
+        with self.lock:
+            for key in keys:
+                value = self.entries.get(key)
+                if value is not None:
+                    self.entries.move_to_end(key)
+                values.append(value)
+            for session_uuid in set(key[0] for key in keys):
+                session_values = [value for key, value in zip(keys, values) if key[0] == session_uuid]
+                stats = self._get_stats(session_uuid)
+                stats["misses"] += session_values.count(None)
+                stats["hits"] += len(session_values) - session_values.count(None)
+        return values
+
+    def put(self, key: tuple, value: object):
+        """
+        Store a value in the cache (the least recently used entries are evicted to keep the budget).
+
+        Args:
+            self: CalculateCache object itself
+            key (tuple): The cache key (from make_key)
+            value (object): The value to store
+        """
+        size = estimate_size(value)
+        with self.lock:
+            if key in self.entries:
+                self._remove_entry(key)
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.total_bytes += size
+            self.session_keys.setdefault(key[0], set()).add(key)
+            self._evict()
+
+    def put_many(self, items: list):
+        """
+        Store many values in the cache at once (the least recently used entries are evicted to keep the budget).
+
+        Args:
+            self: CalculateCache object itself
+            items (list): The (key, value) pairs to store
+        """
+        sizes = [estimate_size(value) for key, value in items]
+        with self.lock:
+            for (key, value), size in zip(items, sizes):
+                if key in self.entries:
+                    self._remove_entry(key)
+                self.entries[key] = value
+                self.sizes[key] = size
+                self.total_bytes += size
+                self.session_keys.setdefault(key[0], set()).add(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self.entries) > 1 and ((self.max_entries is not None and len(self.entries) > self.max_entries) or
+                                         (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            evicted_key = next(iter(self.entries))
+            self._remove_entry(evicted_key)
+            self._get_stats(evicted_key[0])["evictions"] += 1
+
+    def _remove_entry(self, key: tuple):
+        del self.entries[key]
+        self.total_bytes -= self.sizes.pop(key)
+        keys = self.session_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.session_keys[key[0]]
+
+    def remove_session(self, session_uuid: str):
+        """
+        Remove all the entries (and the counters) of a session.
+
+        Args:
+            self: CalculateCache object itself
+            session_uuid (str): The session uuid
+        """
+        with self.lock:
+            for key in list(self.session_keys.get(session_uuid, ())):
+                self._remove_entry(key)
+            self.session_stats.pop(session_uuid, None)
+
+    def get_stats(self, session_uuid: str = None) -> dict:
+        """
+        Get the hit / miss / eviction counters of a session (or the totals, with the size of the cache).
+
+        Args:
+            self: CalculateCache object itself
+            session_uuid (str): The session uuid (None for the totals of all the sessions)
+
+        Returns:
+            dict: Counters of hits, misses and evictions, hit rate (and entries and bytes of the cache, for the totals)
+        """
+        with self.lock:
+            if session_uuid is not None:
+                stats = dict(self.session_stats.get(session_uuid, {"hits": 0, "misses": 0, "evictions": 0}))
+                stats["hit_rate"] = _hit_rate(stats)
+                stats["entries"] = len(self.session_keys.get(session_uuid, ()))
+                return stats
+
+            stats = {"hits": 0, "misses": 0, "evictions": 0}
+            for session_stats in self.session_stats.values():
+                for counter in stats:
+                    stats[counter] += session_stats[counter]
+            stats["hit_rate"] = _hit_rate(stats)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.total_bytes
+            return stats
+
+# Hit rate of the hit and miss counters
+def _hit_rate(stats: dict) -> float:
+    lookups = stats["hits"] + stats["misses"]
+    return round(stats["hits"] / lookups, 4) if lookups else 0.0
@@ -0,0 +1,162 @@
+# coding: utf-8
+"""
+
+## Entity Matrices Module
+- EntityMatrices class (distances, wall intersections and lobes visibility matrices between the entities of a kind,
+  Asset Points or Anchors, and the Antennas of a session, kept between the processing ticks)
+- Per entity and per antenna dirty tracking: each entity and each antenna has a signature (its coordinates and lobes);
+  only the rows of the entities and the columns of the antennas whose signature changed since the last tick (or new)
+  are recomputed, the other values are reused (e.g. moving one antenna recomputes one column).
+- EntityMatricesStore class (matrices by session and kind of entities)
+
+"""
+import threading
+import numpy as np
+
+class EntityMatrices:
+    """
+    Matrices (entities x antennas) of a kind of entities of a session, with per entity dirty tracking.
+    """
+    def __init__(self):
+        """
+        Initialize the EntityMatrices class object.
+
+        Args:
+            self: EntityMatrices object itself
+        """
+        self.entity_signatures = []
+        self.antennas_signatures = []
+        self.distances = np.zeros((0, 0))
+        self.wall_intersections = np.zeros((0, 0), dtype=np.int64)
+        self.visibility = np.zeros((0, 0), dtype=bool)
+
+    def update_signatures(self, entity_signatures: list, antennas_signatures: list) -> tuple:
+        """
+        Update the signatures of the entities and of the antennas, and get the entities and the antennas changed (dirty rows and columns).
+        The matrices are resized to the new amount of entities and antennas, keeping the values of the ones not changed.
+
+        Args:
+            self: EntityMatrices object itself
+            entity_signatures (list): Signature of each entity (e.g. tuple of its coordinates and lobes)
+            antennas_signatures (list): Signature of each antenna (e.g. tuple of its coordinates and lobe)
+
+        Returns:
+            tuple: (list indexes of the entities changed, list indexes of the antennas changed)
+        """
+        dirty_rows = _changed_indexes(self.entity_signatures, entity_signatures)
+        dirty_cols = _changed_indexes(self.antennas_signatures, antennas_signatures)
+
+        shape = (len(entity_signatures), len(antennas_signatures))
+        if self.distances.shape != shape:
+            self.distances = _resize(self.distances, shape)
+            self.wall_intersections = _resize(self.wall_intersections, shape)
+            self.visibility = _resize(self.visibility, shape)
+
+        self.entity_signatures = list(entity_signatures)
+        self.antennas_signatures = list(antennas_signatures)
+        return dirty_rows, dirty_cols
+
+    def set_cells(self, rows: list, cols: list, distances: np.ndarray, wall_intersections: np.ndarray, visibility: np.ndarray):
+        """
+        Set the recomputed values of the (entity, antenna) pairs of some rows and columns of the matrices.
+
+        Args:
+            self: EntityMatrices object itself
+            rows (list): Indexes of the entities recomputed
+            cols (list): Indexes of the antennas recomputed
+            distances (np.ndarray): Array of shape (len(rows), len(cols)) with the distances (in meters)
+            wall_intersections (np.ndarray): Array of shape (len(rows), len(cols)) with the wall intersections of the lines of sight
+            visibility (np.ndarray): Boolean array of shape (len(rows), len(cols)) with the lobes visibility of the lines of sight
+        """
+        cells = np.ix_(rows, cols)
+        self.distances[cells] = distances
+        self.wall_intersections[cells] = wall_intersections
+        self.visibility[cells] = visibility
+
+    def set_pairs(self, rows: np.ndarray, cols: np.ndarray, distances: np.ndarray, wall_intersections: np.ndarray, visibility: np.ndarray):
+        """
+        Set the values of many (entity, antenna) pairs of the matrices (e.g. got from a cache).
+
+        Args:
+            self: EntityMatrices object itself
+            rows (np.ndarray): Array of shape (P,) with the index of the entity of each pair
+            cols (np.ndarray): Array of shape (P,) with the index of the antenna of each pair
+            distances (np.ndarray): Array of shape (P,) with the distances (in meters)
+            wall_intersections (np.ndarray): Array of shape (P,) with the wall intersections of the lines of sight
+            visibility (np.ndarray): Boolean array of shape (P,) with the lobes visibility of the lines of sight
+        """
+        self.distances[rows, cols] = distances
+        self.wall_intersections[rows, cols] = wall_intersections
+        self.visibility[rows, cols] = visibility
+
+    def set_cell(self, row: int, col: int, distance: float, wall_intersections: int, visibility: bool):
+        """
+        Set the values of an (entity, antenna) pair of the matrices (e.g. got from a cache).
+
+        Args:
+            self: EntityMatrices object itself
+            row (int): Index of the entity
+            col (int): Index of the antenna
+            distance (float): Distance (in meters) between the entity and the antenna
+            wall_intersections (int): Wall intersections of the line of sight
+            visibility (bool): Lobes visibility of the line of sight
+        """
+        self.distances[row, col] = distance
+        self.wall_intersections[row, col] = wall_intersections
+        self.visibility[row, col] = visibility
+
+class EntityMatricesStore:
+    """
+    Entity matrices by session and kind of entities (e.g. "ap" and "anchors").
+    """
+    def __init__(self):
+        """
+        Initialize the EntityMatricesStore class object.
+
+        Args:
+            self: EntityMatricesStore object itself
+        """
+        self.matrices = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_uuid: str, kind: str) -> EntityMatrices:
+        """
+        Get the matrices of a kind of entities of a session (created on the first call).
+
+        Args:
+            self: EntityMatricesStore object itself
+            session_uuid (str): The session uuid
+            kind (str): The kind of entities (e.g. "ap" or "anchors")
+
+        Returns:
+            EntityMatrices: The matrices of the entities of the session
+        """
+        with self.lock:
+            if (session_uuid, kind) not in self.matrices:
+                self.matrices[(session_uuid, kind)] = EntityMatrices()
+            return self.matrices[(session_uuid, kind)]
+
+    def remove_session(self, session_uuid: str):
+        """
+        Remove the matrices of a session (e.g. on the session close).
+
+        Args:
+            self: EntityMatricesStore object itself
+            session_uuid (str): The session uuid
+        """
+        with self.lock:
+            for key in [key for key in self.matrices if key[0] == session_uuid]:
+                del self.matrices[key]
+
+# Get the indexes of the signatures changed (or new) from the previous signatures
+def _changed_indexes(previous_signatures: list, signatures: list) -> list:
+    nr_kept = min(len(previous_signatures), len(signatures))
+    return [index for index in range(nr_kept) if signatures[index] != previous_signatures[index]] + list(range(nr_kept, len(signatures)))
+
+# Resize a matrix (keeping the values of the first rows and columns, and adding zeros)
+def _resize(matrix: np.ndarray, shape: tuple) -> np.ndarray:
+    resized = np.zeros(shape, dtype=matrix.dtype)
+    nr_rows = min(shape[0], matrix.shape[0])
+    nr_cols = min(shape[1], matrix.shape[1])
+    resized[:nr_rows, :nr_cols] = matrix[:nr_rows, :nr_cols]
+    return resized
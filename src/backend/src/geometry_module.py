@@ -0,0 +1,358 @@
+# coding: utf-8
+"""
+
+## Geometry Module
+- Vectorized (NumPy) geometric calculations used by the backend agent on each processing tick.
+- Distances matrix between a set of points (Asset Points or Anchors) and the Antennas, in a single batched call.
+- Walls compiled into contiguous arrays and batched counting of the wall intersections of the lines of sight (optionally through a walls spatial index).
+- Detection of the lines of sight with close intersections of the same map feature (used by the wall crossings rasters).
+- Radio Frequency lobes visibility matrix between the points (Asset Points or Anchors) and the Antennas.
+- Quantization of the positions on cells of a tolerance in meters (shared cache keys of close positions).
+
+"""
+import math
+import json
+import numpy as np
+
+# Earth mean radius in meters (same value used by turfpy 'measurement.distance')
+avg_earth_radius_m = 6371008.8
+
+# Decimal places kept on coordinates (same precision set on geojson geometries by the backend agent)
+coordinates_precision = 8
+
+# Convert a list of coordinates (or objects with getCoords) into a (N, 2) float array
+def coords_to_array(coords_data: list) -> np.ndarray:
+    """
+    Convert a list of coordinates into a (N, 2) float array of Longitude and Latitude values.
+
+    Args:
+        coords_data (list): List of (Longitude, Latitude) pairs, or objects with a getCoords() method (AssetPoint, Anchor, Antenna)
+
+    Returns:
+        np.ndarray: Array of shape (N, 2) with Longitude and Latitude coordinates values
+    """
+    coords = [item.getCoords() if hasattr(item, "getCoords") else item for item in coords_data]
+    return np.array(coords, dtype=float).reshape(-1, 2)
+
+# Size (in degrees) of the cells of a position quantization tolerance (in meters), at a Latitude
+def quantization_steps(tolerance: float, latitude: float) -> tuple:
+    """
+    Get the size in degrees of Longitude and Latitude of the square cells of a position quantization.
+
+    Args:
+        tolerance (float): Size of the cells in meters
+        latitude (float): Latitude of the map (e.g. map center)
+
+    Returns:
+        tuple: (Longitude step, Latitude step) in degrees
+    """
+    lat_step = math.degrees(tolerance / avg_earth_radius_m)
+    return (lat_step / math.cos(math.radians(latitude)), lat_step)
+
+# Quantize a position to the index of its cell
+def quantize_position(lng: float, lat: float, steps: tuple) -> tuple:
+    """
+    Get the cell of a position quantization (the positions of the same cell share the cell index).
+
+    Args:
+        lng (float): Longitude of the position
+        lat (float): Latitude of the position
+        steps (tuple): (Longitude step, Latitude step) of the cells in degrees (from quantization_steps)
+
+    Returns:
+        tuple: (Longitude index, Latitude index) of the cell
+    """
+    return (math.floor(float(lng) / steps[0]), math.floor(float(lat) / steps[1]))
+
+# Measure the full distance matrix between points (asset points or anchors) and antennas
+def measure_distances_matrix(points_coords: np.ndarray, antennas_coords: np.ndarray) -> np.ndarray:
+    """
+    Measure the Haversine distances between all the points (Asset Points or Anchors) and all the Antennas in one batched call.
+
+    Reproduces the values of turfpy 'measurement.distance' (converted from 'km' to 'm' and rounded to 2 decimal places),
+    including the rounding of the coordinates to the geojson geometries precision.
+
+    $$
+        d = 2 R \\arctan2(\\sqrt{h}, \\sqrt{1 - h}), \\quad h = \\sin^2(\\frac{Δφ}{2}) + \\cos φ_1 \\cos φ_2 \\sin^2(\\frac{Δλ}{2})
+    $$
+
+    Args:
+        points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points (Asset Points or Anchors)
+        antennas_coords (np.ndarray): Array of shape (M, 2) with Longitude and Latitude of the Antennas
+
+    Returns:
+        np.ndarray: Array of shape (N, M) with the distances in meters between each point and each Antenna
+    """
+    points = np.round(np.asarray(points_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+    antennas = np.round(np.asarray(antennas_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+
+    lat1 = np.radians(points[:, 1])[:, None]
+    lat2 = np.radians(antennas[:, 1])[None, :]
+    delta_lat = np.radians(antennas[:, 1][None, :] - points[:, 1][:, None])
+    delta_lng = np.radians(antennas[:, 0][None, :] - points[:, 0][:, None])
+
+    a = np.sin(delta_lat / 2) ** 2 + np.sin(delta_lng / 2) ** 2 * np.cos(lat1) * np.cos(lat2)
+    b = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    # convert radians to 'km' and then Units from 'km' to 'm' (same operations order of the turfpy path)
+    distances_km = b * (avg_earth_radius_m * 0.001)
+    distances_m = (distances_km * 1000 * 100) / 100
+
+    return np.round(distances_m, 2)
+
+# Decimal places of the wall intersection points used to count distinct intersections
+# (precision of the geojson intersection features built in turfpy 'line_intersect', as set by the backend agent)
+intersections_precision = coordinates_precision
+
+# Maximum amount of (line, wall) pairs evaluated at once by the intersections kernel
+intersections_chunk_size = 2000000
+
+# Compile the walls features of a map into a contiguous array
+def compile_walls_array(walls_data: list) -> tuple:
+    """
+    Compile the walls features of a map (as returned by catch_map_walls) into a contiguous (N, 4) float array.
+
+    Each row holds a wall line segment as [start_long, start_lat, end_long, end_lat]. The walls groups array
+    holds the group of the map feature (polygon) each wall segment belongs to, used to count distinct intersections:
+    the turfpy intersection features carry the properties of the wall polygon, so the polygons with the same properties
+    share a group (their intersections on the same point are the same feature).
+
+    Args:
+        walls_data (list): List of walls sets (one set of line segment features by map polygon)
+
+    Returns:
+        tuple: (np.ndarray walls array of shape (N, 4), np.ndarray walls groups of shape (N,))
+    """
+    walls = []
+    groups = []
+    groups_by_properties = {}
+
+    for wall_set in walls_data:
+        for wall in wall_set:
+            group = groups_by_properties.setdefault(json.dumps(wall.get("properties"), sort_keys=True, default=str), len(groups_by_properties))
+            line_seg = wall.geometry.coordinates
+            # skip degenerated (zero length) line segments
+            if line_seg[0] == line_seg[1]:
+                continue
+            walls.append((line_seg[0][0], line_seg[0][1], line_seg[1][0], line_seg[1][1]))
+            groups.append(group)
+
+    walls_array = np.ascontiguousarray(np.array(walls, dtype=float).reshape(-1, 4))
+    walls_groups = np.array(groups, dtype=np.int64)
+
+    return walls_array, walls_groups
+
+# Build the lines of sight array between points (asset points or anchors) and antennas
+def build_lines_array(points_coords: np.ndarray, antennas_coords: np.ndarray) -> np.ndarray:
+    """
+    Build the lines of sight between all the points (Asset Points or Anchors) and all the Antennas as a (N * M, 4) float array.
+
+    Lines are ordered by point and then by antenna, as [point_long, point_lat, antenna_long, antenna_lat]
+    (the same coordinates of the LineString features created by catch_lines_of_sight).
+
+    Args:
+        points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points (Asset Points or Anchors)
+        antennas_coords (np.ndarray): Array of shape (M, 2) with Longitude and Latitude of the Antennas
+
+    Returns:
+        np.ndarray: Array of shape (N * M, 4) with the lines of sight line segments
+    """
+    points = np.round(np.asarray(points_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+    antennas = np.round(np.asarray(antennas_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+
+    lines = np.empty((len(points), len(antennas), 4), dtype=float)
+    lines[:, :, 0:2] = points[:, None, :]
+    lines[:, :, 2:4] = antennas[None, :, :]
+
+    return lines.reshape(-1, 4)
+
+# Batched segment-segment intersection kernel counting distinct wall crossings by line of sight
+def count_wall_intersections(lines_array: np.ndarray, walls_array: np.ndarray, walls_groups: np.ndarray, walls_index: object = None) -> np.ndarray:
+    """
+    Count the distinct wall intersections of many lines of sight at once.
+
+    Solves the segment-segment intersection for every (line, wall) pair with
+    $p + t r = q + u s$, where a pair intersects when $0 \\leq t \\leq 1$ and $0 \\leq u \\leq 1$
+    (collinear overlapping segments also count as an intersection).
+    Intersections of the same line with walls of the same map feature on the same point
+    (e.g. a line of sight passing through a shared wall corner) are counted only once.
+
+    When a walls spatial index is given (see spatial_index_module), only the (line, wall) candidate
+    pairs returned by the index are tested, otherwise every line is tested against every wall.
+
+    Args:
+        lines_array (np.ndarray): Array of shape (L, 4) with the lines of sight line segments
+        walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+        walls_groups (np.ndarray): Array of shape (N,) with the map feature index of each wall
+        walls_index (object): Walls spatial index with a query_pairs(lines_array) method (optional)
+
+    Returns:
+        np.ndarray: Array of shape (L,) with the wall intersections counter by line of sight
+    """
+    lines = np.asarray(lines_array, dtype=float).reshape(-1, 4)
+    counters = np.zeros(len(lines), dtype=np.int64)
+
+    for start, lines_chunk, line_index, wall_index in _candidate_pairs(lines, walls_array, walls_index):
+        counters[start:start + len(lines_chunk)] = _count_pairs_intersections(lines_chunk, walls_array, walls_groups, line_index, wall_index)
+
+    return counters
+
+# Find the lines of sight with close intersections of walls of the same map feature
+def find_close_intersections(lines_array: np.ndarray, walls_array: np.ndarray, walls_groups: np.ndarray, tolerance: float, walls_index: object = None) -> np.ndarray:
+    """
+    Find the lines of sight that intersect walls of the same map feature (e.g. both sides of a thin wall polygon)
+    on points closer than a tolerance, whose distinct intersections counter depends on the rounding of the points.
+
+    Args:
+        lines_array (np.ndarray): Array of shape (L, 4) with the lines of sight line segments
+        walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+        walls_groups (np.ndarray): Array of shape (N,) with the map feature index of each wall
+        tolerance (float): Maximum distance (in degrees, on Longitude or Latitude) between the close intersections
+        walls_index (object): Walls spatial index with a query_pairs(lines_array) method (optional)
+
+    Returns:
+        np.ndarray: Boolean array of shape (L,) with the lines of sight with close intersections
+    """
+    lines = np.asarray(lines_array, dtype=float).reshape(-1, 4)
+    close = np.zeros(len(lines), dtype=bool)
+
+    for start, lines_chunk, line_index, wall_index in _candidate_pairs(lines, walls_array, walls_index):
+        hits_line, hits_wall, hits_t = _pairs_intersections(lines_chunk, walls_array, line_index, wall_index)
+        hits_group = walls_groups[hits_wall]
+
+        # consecutive intersections (along each line) of the same map feature
+        order = np.lexsort((hits_t, hits_group, hits_line))
+        hits_line, hits_group, hits_t = hits_line[order], hits_group[order], hits_t[order]
+        same_feature = (hits_line[1:] == hits_line[:-1]) & (hits_group[1:] == hits_group[:-1])
+        delta_t = hits_t[1:] - hits_t[:-1]
+        line_extent = np.maximum(np.abs(lines_chunk[hits_line[1:], 2] - lines_chunk[hits_line[1:], 0]),
+                                 np.abs(lines_chunk[hits_line[1:], 3] - lines_chunk[hits_line[1:], 1]))
+        close_lines = hits_line[1:][same_feature & (delta_t * line_extent <= tolerance)]
+        close[start + close_lines] = True
+
+    return close
+
+# Candidate (line, wall) pairs to test, by chunks of lines (from the walls spatial index, or all the pairs)
+def _candidate_pairs(lines: np.ndarray, walls_array: np.ndarray, walls_index: object = None):
+    if len(lines) == 0 or len(walls_array) == 0:
+        return
+
+    if walls_index is not None:
+        line_index, wall_index = walls_index.query_pairs(lines)
+        yield 0, lines, line_index, wall_index
+        return
+
+    chunk = max(1, intersections_chunk_size // len(walls_array))
+
+    for start in range(0, len(lines), chunk):
+        lines_chunk = lines[start:start + chunk]
+        # all (line, wall) pairs of the chunk
+        line_index = np.repeat(np.arange(len(lines_chunk)), len(walls_array))
+        wall_index = np.tile(np.arange(len(walls_array)), len(lines_chunk))
+        yield start, lines_chunk, line_index, wall_index
+
+# Count distinct wall intersections of a set of (line, wall) pairs
+def _count_pairs_intersections(lines: np.ndarray, walls_array: np.ndarray, walls_groups: np.ndarray, line_index: np.ndarray, wall_index: np.ndarray) -> np.ndarray:
+    hits_line, hits_wall, hits_t = _pairs_intersections(lines, walls_array, line_index, wall_index)
+
+    if len(hits_line) == 0:
+        return np.zeros(len(lines), dtype=np.int64)
+
+    points_x = np.round(lines[hits_line, 0] + hits_t * (lines[hits_line, 2] - lines[hits_line, 0]), intersections_precision)
+    points_y = np.round(lines[hits_line, 1] + hits_t * (lines[hits_line, 3] - lines[hits_line, 1]), intersections_precision)
+
+    # count distinct (line, map feature, intersection point) keys
+    keys = np.column_stack((hits_line, walls_groups[hits_wall], points_x, points_y))
+    unique_keys = np.unique(keys, axis=0)
+
+    return np.bincount(unique_keys[:, 0].astype(np.int64), minlength=len(lines))
+
+# Intersections of a set of (line, wall) pairs, as (lines indexes, walls indexes, parameter t along the line)
+def _pairs_intersections(lines: np.ndarray, walls_array: np.ndarray, line_index: np.ndarray, wall_index: np.ndarray) -> tuple:
+    if len(line_index) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    # lines as p + t r and walls as q + u s
+    px = lines[line_index, 0]
+    py = lines[line_index, 1]
+    rx = lines[line_index, 2] - px
+    ry = lines[line_index, 3] - py
+    qx = walls_array[wall_index, 0]
+    qy = walls_array[wall_index, 1]
+    sx = walls_array[wall_index, 2] - qx
+    sy = walls_array[wall_index, 3] - qy
+
+    qpx = qx - px
+    qpy = qy - py
+    denom = rx * sy - ry * sx
+    t_num = qpx * sy - qpy * sx
+    u_num = qpx * ry - qpy * rx
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = t_num / denom
+        u = u_num / denom
+
+    # proper (non parallel) intersections
+    hits = (denom != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+    # collinear overlapping segments
+    collinear = (denom == 0) & (u_num == 0)
+    if np.any(collinear):
+        r_len = rx * rx + ry * ry
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t0 = (qpx * rx + qpy * ry) / r_len
+            t1 = t0 + (sx * rx + sy * ry) / r_len
+        t_min = np.minimum(t0, t1)
+        t_max = np.maximum(t0, t1)
+        overlap = collinear & (t_max >= 0) & (t_min <= 1)
+        t = np.where(overlap, np.clip(t_min, 0, 1), t)
+        hits |= overlap
+
+    return np.asarray(line_index)[hits].astype(np.int64), np.asarray(wall_index)[hits].astype(np.int64), t[hits]
+
+# Check the Radio Frequency lobes visibility between all the points (asset points or anchors) and all the antennas
+def measure_lobes_visibility(points_coords: np.ndarray, antennas_coords: np.ndarray, antennas_directions: np.ndarray, antennas_openings: np.ndarray,
+                             large_directions: np.ndarray = None, large_openings: np.ndarray = None,
+                             small_directions: np.ndarray = None, small_openings: np.ndarray = None) -> np.ndarray:
+    """
+    Check if the lines of sight between all the points (Asset Points or Anchors) and all the Antennas are directionated
+    with the Antennas Radio Frequency Signal Propagation lobe (and with the Asset Points Large or Small lobes, when given), in one pass.
+
+    Reproduces get_line_of_sight_angle, check_antenna_direction_intersection and check_asset_point_directions_intersections
+    (the line of sight angle seen from the Asset Point is the angle of the line of sight plus 180 degrees).
+
+    Args:
+        points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points (Asset Points or Anchors)
+        antennas_coords (np.ndarray): Array of shape (M, 2) with Longitude and Latitude of the Antennas
+        antennas_directions (np.ndarray): Array of shape (M,) with the direction angles of the Antennas lobes
+        antennas_openings (np.ndarray): Array of shape (M,) with the opening angles of the Antennas lobes
+        large_directions (np.ndarray): Array of shape (N,) with the direction angles of the Asset Points Large lobes (optional)
+        large_openings (np.ndarray): Array of shape (N,) with the opening angles of the Asset Points Large lobes (optional)
+        small_directions (np.ndarray): Array of shape (N,) with the direction angles of the Asset Points Small lobes (optional)
+        small_openings (np.ndarray): Array of shape (N,) with the opening angles of the Asset Points Small lobes (optional)
+
+    Returns:
+        np.ndarray: Boolean array of shape (N, M) with the visibility of each point and each Antenna
+    """
+    points = np.round(np.asarray(points_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+    antennas = np.round(np.asarray(antennas_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+
+    # angles of the lines of sight (in degrees)
+    delta_lat = points[:, 1][:, None] - antennas[:, 1][None, :]
+    delta_lng = points[:, 0][:, None] - antennas[:, 0][None, :]
+    lines_angles = np.arctan2(delta_lat, delta_lng) * (180 / np.pi) - 90
+
+    visibility = _inside_lobe(lines_angles, np.asarray(antennas_directions, dtype=float)[None, :], np.asarray(antennas_openings, dtype=float)[None, :])
+
+    if large_directions is not None:
+        large_lobe = _inside_lobe(lines_angles + 180, np.asarray(large_directions, dtype=float)[:, None], np.asarray(large_openings, dtype=float)[:, None])
+        small_lobe = _inside_lobe(lines_angles + 180, np.asarray(small_directions, dtype=float)[:, None], np.asarray(small_openings, dtype=float)[:, None])
+        visibility &= large_lobe | small_lobe
+
+    return visibility
+
+# Check if angles are inside lobes (of given direction and opening angles)
+def _inside_lobe(angles: np.ndarray, directions: np.ndarray, openings: np.ndarray) -> np.ndarray:
+    abs_angles = np.abs(angles - directions)
+    abs_angles = np.where(abs_angles > 180, np.abs(abs_angles - 360), abs_angles)
+    return abs_angles - openings / 2 <= 0
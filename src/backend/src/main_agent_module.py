@@ -16,6 +16,7 @@ import time
 import csv
 import math
 import json
+import os
 import geojson
 import random
 import threading
@@ -23,18 +24,29 @@ import queue
 import urllib.request
 import statistics
 from turfpy import measurement
-from turfpy.misc import line_segment, line_intersect
+from turfpy.misc import line_segment
 from geojson import Point, Feature, LineString, FeatureCollection
 from shapely.geometry import Point
 from scipy import interpolate
 from scipy.optimize import curve_fit
-from joblib import Parallel, delayed
 from typing import Literal
 from src.backend.src.asset_classes_module import * 
-import cProfile
-
-# profiler to check performances
-#profiler = cProfile.Profile()
+from src.backend.src.geometry_module import *
+from src.backend.src.spatial_index_module import *
+from src.backend.src.worker_pool_module import *
+from src.backend.src.wall_crossings_raster_module import *
+from src.backend.src.trajectories_module import *
+from src.backend.src.activations_module import load_activations_model, activations_params_path, inv_sigmoid
+from src.backend.src.noise_module import *
+from src.backend.src.cache_module import *
+from src.backend.src.map_context_module import *
+from src.backend.src.map_artifacts_module import *
+from src.backend.src.scheduler_module import *
+from src.backend.src.entity_matrices_module import *
+from src.backend.src.static_anchors_module import *
+from src.backend.src.stage_timings_module import *
+from src.backend.src.metrics_module import *
+from src.backend.src.profiling_module import *
 
 # global host_domain_name_server
 host_domain_name_server = "http://nginx:80"
@@ -63,81 +75,198 @@ geojson.geometry.Geometry.__init__.__defaults__ = (None, False, 8)
 # save previous values to verify changes
 previousValues = {}
 
-# global var to get first msg
-first_msg = []
+# config files by map id
+config_files_by_map_id = {
+    0: "config-params-library-ua-floor2.json",
+    1: "config-params-aveiro-it-building1.json",
+    2: "config-params-sjm-policlinica-mario-martins.json",
+}
+
+# compiled map artifacts (walls arrays and spatial index, memory-mapped at startup and compiled on demand)
+map_artifacts = MapArtifacts()
+
+# compiled contexts by map id (config, walls and experimental dataset tables, built once by map and shared by the sessions)
+map_contexts = MapContexts(lambda map_id: build_map_context(map_id))
+
+# long-lived worker pool to count the wall intersections (the amount of cores is set by BACKEND_NUM_CORES)
+wall_intersections_pool = WallIntersectionsPool()
+
+# wall crossings rasters of the antennas by map (built in background, with the exact geometry meanwhile)
+wall_crossings_rasters = WallCrossingsRasters(wall_intersections_pool)
+
+# distances and wall intersections of the known asset point animations positions against the antennas by map (built in background)
+trajectory_tables = TrajectoryTables(wall_intersections_pool)
+
+# noise generators of the RSSI measurements and antennas activations by session (fixed seed set by BACKEND_NOISE_SEED)
+noise_generators = NoiseGenerators()
+
+# distances, wall intersections and lobes visibility matrices of the asset points and anchors by session (kept between ticks)
+entity_matrices = EntityMatricesStore()
+
+# precomputed values of the anchors by session (rebuilt only when the anchors or the antennas change)
+static_anchors = StaticAnchorsStore()
+
+# metrics of the backend (stage histograms, publish counters and gauges), served on a local HTTP endpoint (set by BACKEND_METRICS_PORT)
+# and published on an MQTT stats topic (if set by BACKEND_METRICS_TOPIC)
+metrics = Metrics()
+
+# time spent by stage of calculate by session (e.g. the cache hit path and the geometry of the cache misses), also observed on the
+# stage histograms of the metrics
+stage_timings = StageTimings(lambda stage, seconds: metrics.observe("calculate_stage_seconds", seconds, stage=stage))
+
+# bounded in-memory cache of calculate results, shared by the workers (budget set by BACKEND_CACHE_MAX_ENTRIES and BACKEND_CACHE_MAX_MB)
+calculate_cache = CalculateCache()
+
+# per session mailboxes of the received messages, processed by a pool of workers (set by BACKEND_NUM_WORKERS and BACKEND_SCHEDULER_POLICY)
+# (pending partial updates of a session are coalesced, latest-wins, unless disabled by BACKEND_COALESCE_PARTIAL_UPDATES=0)
+# (with BACKEND_PERIODIC_TICKS=1, each session is also recalculated at its read rate cadence without new messages)
+scheduler = SessionScheduler(lambda session_uuid, item: processSessionMessage(session_uuid, item),
+                             lambda session_uuid: getSessionInterval(session_uuid),
+                             coalesce_function=(lambda pending_item, item: coalescePartialUpdates(pending_item, item))
+                             if os.environ.get("BACKEND_COALESCE_PARTIAL_UPDATES", "1") != "0" else None,
+                             periodic=default_periodic_ticks)
+
+# MQTT client of the last message of each session (used on the periodic recalculations)
+session_clients = {}
+
+# on-demand profiler of the ticks of calculate (armed by a "profile" control message, or by BACKEND_PROFILE_TICKS at the start)
+tick_profiler = TickProfiler()
+
+# help texts of the metrics, and gauges of the scheduler and of the calculate cache (read on each scrape)
+metrics.describe("calculate_stage_seconds", "Time of the stages of calculate (map context, entities, cache, geometry, RSSI, activations, serialization and publish)")
+metrics.describe("session_loop_seconds", "Time of the processing of a session message (or periodic recalculation) by a scheduler worker")
+metrics.describe("session_messages_total", "Session messages processed by the scheduler workers (received messages and periodic recalculations)")
+metrics.describe("session_errors_total", "Session messages processed with an exception")
+metrics.describe("published_messages_total", "Messages published by calculate, by topic")
+metrics.set_gauge("queue_depth", lambda: scheduler.get_queue_depth(), "Pending messages of all the sessions")
+metrics.set_gauge("active_sessions", lambda: scheduler.get_sessions_count(), "Sessions with a mailbox on the scheduler")
+metrics.set_gauge("coalesced_messages_total", lambda: scheduler.get_coalesced_count(), "Messages merged into pending messages", kind="counter")
+metrics.set_gauge("pacing_fires_total", lambda: scheduler.get_pacing_stats()["fires"], "Fires of the sessions by the pacing engine", kind="counter")
+metrics.set_gauge("pacing_missed_deadlines_total", lambda: scheduler.get_pacing_stats()["missed"], "Missed deadlines of the sessions", kind="counter")
+metrics.set_gauge("pacing_jitter_max_seconds", lambda: scheduler.get_pacing_stats()["jitter_max"], "Max jitter of the session fires")
+metrics.set_gauge("cache_entries", lambda: calculate_cache.get_stats()["entries"], "Entries of the calculate cache")
+metrics.set_gauge("cache_bytes", lambda: calculate_cache.get_stats()["bytes"], "Estimated size of the calculate cache")
+metrics.set_gauge("cache_hit_rate", lambda: calculate_cache.get_stats()["hit_rate"], "Hit rate of the calculate cache")
+metrics.set_gauge("cache_evictions_total", lambda: calculate_cache.get_stats()["evictions"], "Evictions of the calculate cache", kind="counter")
+metrics.set_gauge("position_quantization_error_bound_meters", lambda: max((map_context.quantization_error_bound for map_context in list(map_contexts.contexts.values())), default=0.0),
+                  "Max position error bound of the quantized asset points cache keys of the loaded maps (0 without quantization)")
+
+########## Session messages processing ##########
+# Process a received message of a session (called by the session scheduler workers)
+def processSessionMessage(session_uuid: str, item: tuple):
+    """
+    Process a received message of a session: update god with the message data and calculate
+    (the session scheduler paces each session at its read rate, see scheduler_module)
 
-# global dict to get walls_by_quadrants by session
-walls_by_quadrants = {}
+    Args:
+        session_uuid (str): Frontend session UUID
+        item (tuple): The MQTT client and the received message data (None to recalculate the current session state)
+    """
+    start = time.time()
 
-# global dict to get featuresType by session
-featuresType = {}
+    # periodic recalculation (no new message), with the MQTT client of the last message of the session
+    if item is None:
+        client = session_clients.get(session_uuid)
+        if client is None:
+            # session without a processed message (e.g. closed), nothing to publish the recalculation to
+            return
+        item = (client, {"uuid": session_uuid})
+    else:
+        session_clients[session_uuid] = item[0]
+
+    try:  
+        # update god with received message data    
+        for i in item[1]:
+            if i == "uuid":
+                god.setSessionUUID(item[1][i])
+            elif i == "map":
+                god.setMapId(item[1][i], item[1]["uuid"])
+            elif i == "ap":
+                god.updateAssetPoint(item[1][i], item[1]["uuid"])
+            elif i == "ant":
+                god.updateAntenna(item[1][i], item[1]["uuid"])
+            elif i == "anchors":
+                god.updateAnchor(item[1][i], item[1]["uuid"])
+            elif i == "algs":
+                god.setAlgorithms(item[1][i], item[1]["uuid"])
+            elif i == "read_rate":
+                god.setReadRateParam(item[1][i], item[1]["uuid"])
+            elif i == "rp":
+                god.setRssiParams(item[1][i], item[1]["uuid"])
+            elif i == "status":
+                god.setStatus(item[1][i], item[1]["uuid"])
+            elif i == "profile":
+                # profile the next ticks of the session (e.g. {"ticks": 50, "mode": "sampling"})
+                if isinstance(item[1][i], dict):
+                    tick_profiler.request(item[1][i].get("ticks", 0), item[1][i].get("mode", default_profile_mode), item[1]["uuid"])
+                else:
+                    # reject the request (the session message is still processed)
+                    print(f"Invalid profile request: {item[1][i]!r} (expected e.g. {{\"ticks\": 50, \"mode\": \"sampling\"}})")
 
-########## Queue worker ##########
-# Deal with Mqtt message arrival frequency
-def queueWorker():
+        # call calculate (calculate will send the mqtt messages to frontend and predictor)
+        calculate(item[0], item[1]["uuid"], calculate_cache)
+        metrics.inc("session_messages_total", kind="message" if len(item[1]) > 1 else "periodic")
+        metrics.observe("session_loop_seconds", time.time() - start)
+
+        # remove the mailbox of a closed session
+        if god.getStatus(session_uuid) == "close":
+            scheduler.remove_session(session_uuid)
+            session_clients.pop(session_uuid, None)
+    except:
+        metrics.inc("session_errors_total")
+        print("Exception occurred: Possibly session uuid not recognized. Wait Full-Update message.")
+
+# Verify if a received message is a partial update (e.g. asset points, antennas or anchors values of an open session)
+def isPartialUpdate(message: dict) -> bool:
     """
-    Queue to deal with frequency of MQTT message arrival
+    Verify if a received message is a partial update: a message of an open session without the map and read rate
+    (sent only on the full updates), and without a status transition (e.g. the "close" message).
+
+    Args:
+        message (dict): The received message data
+
+    Returns:
+        bool: Result of the message is or not a partial update
     """
-    lastIteration = time.time()
-    item = None
-    count = 0
-    calculate_cache = {}
+    return "map" not in message and "read_rate" not in message and message.get("status", "open") == "open"
 
-    while True:
-        try:
-            item = q.get(block=item is None)
-            count += 1
-            print("==========> Start of Iteration:", count, "<========== \n")
+# Coalesce a partial update into the pending partial update of the same session (latest-wins)
+def coalescePartialUpdates(pending_item: tuple, item: tuple) -> tuple:
+    """
+    Merge a received partial update into the last pending partial update of the session: the values of the received
+    message replace the pending ones (the asset points, antennas and anchors arrays are always sent whole).
+    Full updates and status transitions are never merged.
 
-        except queue.Empty:
-            #print ("Warning: Queue is Empty. \n")
-            continue
+    Args:
+        pending_item (tuple): The MQTT client and the data of the last pending message of the session
+        item (tuple): The MQTT client and the received message data
 
-        if time is None:
-            continue
-        
-        # set timestap of loop start
-        now = time.time()
-
-        try:  
-            # update god with received message data    
-            for i in item[1]:
-                if i == "uuid":
-                    god.setSessionUUID(item[1][i])
-                elif i == "map":
-                    god.setMapId(item[1][i], item[1]["uuid"])
-                elif i == "ap":
-                    god.updateAssetPoint(item[1][i], item[1]["uuid"])
-                elif i == "ant":
-                    god.updateAntenna(item[1][i], item[1]["uuid"])
-                elif i == "anchors":
-                    god.updateAnchor(item[1][i], item[1]["uuid"])
-                elif i == "algs":
-                    god.setAlgorithms(item[1][i], item[1]["uuid"])
-                elif i == "read_rate":
-                    god.setReadRateParam(item[1][i], item[1]["uuid"])
-                elif i == "rp":
-                    god.setRssiParams(item[1][i], item[1]["uuid"])
-                elif i == "status":
-                    god.setStatus(item[1][i], item[1]["uuid"])
-
-            # call calculate (calculate will send the mqtt messages to frontend and predictor)
-            calculate(item[0], item[1]["uuid"], calculate_cache)
-
-            # calculate queue wait time and worker loop time 
-            wait_time = min((god.getReadRateParam(item[1]["uuid"]) / 1000), max(0, (god.getReadRateParam(item[1]["uuid"]) / 1000) - (now - lastIteration)))
-            print("Queue wait time:", wait_time, "seconds |", "Worker loop time:", now - lastIteration, "seconds \n")
-            lastIteration = now
-            
-            # sleep communication to the queue wait time
-            time.sleep(wait_time)
-            print("==========>  End of Iteration:", count, " <==========", "\n")
-        except:
-            print("Exception occurred: Possibly session uuid not recognized. Wait Full-Update message.")
+    Returns:
+        tuple: The MQTT client and the merged message data (or None, if the messages can not be coalesced)
+    """
+    if not (isPartialUpdate(pending_item[1]) and isPartialUpdate(item[1])):
+        return None
+
+    merged_message = dict(pending_item[1])
+    merged_message.update(item[1])
+    return (item[0], merged_message)
+
+# Get the pacing interval of a session (its read rate, in seconds)
+def getSessionInterval(session_uuid: str) -> float:
+    """
+    Get the pacing interval of a session: the time between the processing of two messages of the session.
+
+    Args:
+        session_uuid (str): Frontend session UUID
+
+    Returns:
+        float: The read rate of the session in seconds
+    """
+    return god.getReadRateParam(session_uuid) / 1000
 
 #################### Distances and RSSI calculations ####################
 # Apply RSSI calculations
-def measure_RSSI(txPower: float, pathLossExpoent: float, constantFading: float, skewIndex: float, referenceDistance: float, distance: float, attenuation: float) -> float:
+def measure_RSSI(txPower: float, pathLossExpoent: float, constantFading: float, skewIndex: float, referenceDistance: float, distance: float, attenuation: float, noise: float = None) -> float:
     """
     Function to perform RSSI calculations.
 
@@ -171,11 +300,15 @@ def measure_RSSI(txPower: float, pathLossExpoent: float, constantFading: float,
         referenceDistance (float): Reference Distance of the Radio Frequency Signal Propagation of the Antenna object
         distance (float): Distance of the Measurement in the Radio Frequency Signal Propagation of the Antenna object
         attenuation (float): Attenuation Factor (1 dBm) by each wall between Antenna and Asset Point object
+        noise (float): Sample of the Gaussian-distribution random variable $X_σ$ (drawn with random_gaussian_dist, if not set)
         
     Returns:
         float: Calculated RSSI value.
     """
-    measuredRSSI = - (10 * pathLossExpoent * math.log10(distance / referenceDistance)) + txPower + random_gaussian_dist(-constantFading, constantFading, skewIndex) - attenuation
+    if noise is None:
+        noise = random_gaussian_dist(-constantFading, constantFading, skewIndex)
+
+    measuredRSSI = - (10 * pathLossExpoent * math.log10(distance / referenceDistance)) + txPower + noise - attenuation
 
     if (measuredRSSI > 0):
         measuredRSSI = -0.99
@@ -225,29 +358,14 @@ def measure_distances_to_antennas(points_data: list, antennas_data: list) -> lis
     Returns:
         list: All distances between a set of points (Asset Points or Anchors) and the Antennas in the Map
     """
-    distances = []
-    dists_by_point = []
-
-    for point in points_data:
-        pointLongLat = point.getCoords()
-
-        for antenna in antennas_data:
-            antennaLongLat = antenna.getCoords()
+    # get coordinates arrays of points and antennas
+    points_coords = coords_to_array(points_data)
+    antennas_coords = coords_to_array(antennas_data)
 
-            start = Feature(geometry=Point(
-                (float(pointLongLat[0]), float(pointLongLat[1]))))
-            end = Feature(geometry=Point(
-                (float(antennaLongLat[0]), float(antennaLongLat[1]))))
+    # calculate all the distances (in 'm') in one batched call
+    distances = measure_distances_matrix(points_coords, antennas_coords)
 
-            # calculate the distance and convert Units from 'km' to 'm'
-            line = measurement.distance(start, end)
-            distance_value = round((line * 1000 * 100) / 100, 20)
-            dists_by_point.append(round(distance_value, 2))
-
-        distances.append(dists_by_point)
-        dists_by_point = []
-
-    return distances
+    return distances.tolist()
 
 # Return knowing angle of the line of sight
 def get_line_of_sight_angle(line: list) -> float:
@@ -455,180 +573,6 @@ def catch_lines_of_sight(some_point: Anchor or AssetPoint, antennas_data: list)
     lines = FeatureCollection(lines_data)
     return lines
 
-# function to verify the Quadrants of a Point
-
-def verify_point_in_quad(some_point: list) -> int:
-    """
-    Get the Quadrant where some point is.
-
-    Quadrants order:
-    #Q0 Q1
-    #Q3 Q2
-
-    Args:
-        some_point (list): Point (Asset Point or Anchor) coordinates
-       
-    Returns:
-        int: Value with result Quadrant where some point is
-    """
-    if some_point[0] >= matrix_quadrants_long:  # right
-        if some_point[1] >= matrix_quadrants_lat:  # top
-            return 1  # Q1
-        else:  # bottom
-            return 2  # Q2
-    else:  # left
-        if some_point[1] >= matrix_quadrants_lat:  # top
-            return 0  # Q0
-        else:  # bottom
-            return 3  # Q3
-
-# function organize Line Segment Walls by Quadrants
-def get_line_segment_walls_by_quad(walls_array: FeatureCollection) -> list:
-    """
-    Get the line segments walls divided by Quadrants.
-
-    Quadrants order:
-    #Q0 Q1
-    #Q3 Q2
-
-    Args:
-        walls_array (FeatureCollection): FeatureCollection with array of walls data
-       
-    Returns:
-        list: The 4 Quadrants with respective divided walls
-    """
-
-    quadrants = [[], [], [], []]
-
-    # iterate by walls_array
-    for wall in walls_array:
-        # iterate by wall
-        for wallSection in wall:
-            # get line segment coordinates
-            line_seg = wallSection.geometry.coordinates
-            # verify quadrant for the points
-            quad_of_line_point1 = verify_point_in_quad(line_seg[0])
-            quad_of_line_point2 = verify_point_in_quad(line_seg[1])
-            # calculate difference module between quadrants of both points
-            dif_abs = np.abs(quad_of_line_point1 - quad_of_line_point2)
-
-            # verify results
-            if dif_abs == 0:
-                quadrants[quad_of_line_point1].append(wallSection)
-            elif dif_abs == 1 or dif_abs == 3:
-                quadrants[quad_of_line_point1].append(wallSection)
-                quadrants[quad_of_line_point2].append(wallSection)
-            else:
-                quadrants[0].append(wallSection)
-                quadrants[1].append(wallSection)
-                quadrants[2].append(wallSection)
-                quadrants[3].append(wallSection)
-
-    return quadrants
-
-# function to catch quadrants where lines of sight are pass
-def get_quadrants_of_lines(lines_data: list) -> list:
-    """
-    get_quadrants_of_lines - Get the Lines of Sight divided by Quadrants.
-
-    Quadrants order:
-    #Q0 Q1
-    #Q3 Q2
-
-    Args:
-        lines_data (list): Array of lines of sight data
-       
-    Returns:
-        list: Lines of Sight with respective Quadrants where each line are passing
-    """
-
-    lines = []
-
-    # iterate by lines_data.features object
-    for feature in range(len(lines_data.features)):
-        # append an empty array for each feature
-        lines.append([])
-        # get line segment coordinates
-        line_seg = lines_data.features[feature].geometry.coordinates
-        # verify quadrant for the points
-        quad_of_line_point1 = verify_point_in_quad(line_seg[0])
-        quad_of_line_point2 = verify_point_in_quad(line_seg[1])
-        # calculate difference module between quadrants of both points
-        dif_abs = np.abs(quad_of_line_point1 - quad_of_line_point2)
-
-        # verify results
-        if dif_abs == 0:
-            lines[feature].append(quad_of_line_point1)
-        elif dif_abs == 1 or dif_abs == 3:
-            lines[feature].append(quad_of_line_point1)
-            lines[feature].append(quad_of_line_point2)
-        else:
-            lines[feature].append(0)
-            lines[feature].append(1)
-            lines[feature].append(2)
-            lines[feature].append(3)
-
-    return lines
-
-# Process Line function to deal with wall_intersections line by line in each quadrant array
-def process_line_segment(line: list, quadrant_array: list, walls_by_quadrant: list) -> int:
-    """
-    Deal with wall intersections counter by line in each quadrant array
-    
-    Quadrants order:
-    #Q0 Q1
-    #Q3 Q2
-
-    Args:
-        line (list): Line of sight coordinates data 
-        quadrant_array (list): Quadrant array with respective divided walls
-        walls_by_quadrant (list): Array of walls data divided by quadrants
-       
-    Returns:
-        int: Result value with the wall intersections counter by a line-of-sight
-    """
-    currentLine = []
-
-    for quad in quadrant_array:
-        for wall in walls_by_quadrant[quad]:
-            intersection = line_intersect(line, wall)
-
-            if len(intersection.features) > 0:
-                # if intersection point is not already in currentLine
-                if not intersection in currentLine:
-
-                    # populate array of currentLine
-                    currentLine.append(intersection)
-
-    # count amout of wall Intersections
-    counter = len(currentLine)
-
-    return counter
-
-# Catch the Wall Intersections in Lines Of Sight
-def catch_wall_intersections(lines: list, lines_by_quad: list, walls_by_quad: list) -> list:
-    """
-    Catch the Wall Intersections in Lines Of Sight
-
-    Args:
-        lines (list): Array of lines of sight data
-        lines_by_quad (list): Array of Lines divided by Quadrants
-        walls_by_quad (list): Array of walls divided by Quadrants
-       
-    Returns:
-        list: Intersections results integer divided by lines of sight 
-    """
-    tstart = time.time()
-    num_cores = 8
-
-    # use of Parallel for loop
-    wall_intersections = Parallel(n_jobs=num_cores)(delayed(process_line_segment)(
-        lines.features[line], lines_by_quad[line], walls_by_quad) for line in range(len(lines.features)))
-
-    print("CatchWallIntersections time:", time.time() - tstart, "\n")
-
-    return wall_intersections
-
 # Read csv file and average values of multiple iterations
 # delete irrelevant columns
 def csv_to_avg_list(file: str) -> dict:
@@ -834,25 +778,6 @@ def sigmoid(x: np.ndarray, L: float, x0: float, k: float, b: float) -> np.ndarra
     y = L / (1 + np.exp(-k*(x-x0))) + b
     return y
 
-# inverse sigmoid function
-# source: https://stackoverflow.com/questions/43213069/fit-bipolar-sigmoid-python/43213692#43213692
-def inv_sigmoid(x: np.ndarray, a: float, b: float, c: float, d: float) -> np.ndarray:
-    """
-    Inverse Sigmoid Function source: https://stackoverflow.com/questions/43213069/fit-bipolar-sigmoid-python/43213692#43213692
-
-    Args:
-        x (np.ndarray): Array of data to apply the optimization
-        a (float): adjusts amplitude; 
-        b (float): adjusts y offset; 
-        c (float): adjusts x offset; 
-        d (float): adjusts slope
-    
-    Returns:
-        np.ndarray: The inverse sigmoid function curve.
-    """
-    y = ((a-b) / (1 + np.exp(x-(c/2))**d)) + b
-    return y
-
 # to apply exponential regression from 1 Dimension array
 def exponential_regression_1D_array(value: float, xData: np.ndarray, yDataArray: np.ndarray, dictOfStdsAvgs: dict) -> list:
     """
@@ -983,10 +908,300 @@ def interpolate_extrapolate_1D_array(value: float, xData: np.ndarray, yDataArray
         '''
     return out_noised
 
+########## Map context ##########
+# Compile the walls of a map (stored on the map artifacts)
+def compile_map_walls(map_data: bytes, map_config: dict) -> dict:
+    """
+    Compile the walls of a map: catch the walls from the map (filtered by the walls keywords and levels),
+    compile them into contiguous arrays and create the walls spatial index.
+
+    Args:
+        map_data (bytes): The map file data (GeoJSON)
+        map_config (dict): The "map" section of the config file
+
+    Returns:
+        dict: Arrays of the compiled map (walls array, walls groups, walls properties and walls spatial index)
+    """
+    # load to geojson
+    geojson_map = geojson.loads(map_data.decode('utf-8'))
+
+    # catch walls from the map
+    walls = catch_map_walls(geojson_map, map_config["filter_walls_keywords"], map_config["filter_walls_levels"])
+    # compile walls into a contiguous array (used by the wall intersections kernel)
+    walls_array, walls_groups = compile_walls_array(walls)
+    # create walls spatial index (as set on map config, e.g. uniform grid)
+    walls_index = create_walls_index(walls_array, map_config)
+
+    return {
+        "walls_array": walls_array,
+        "walls_groups": walls_groups,
+        # properties of the map feature (polygon) of each walls group
+        "walls_properties": json_to_array([dict(wall_set[0].properties) for wall_set in walls]),
+        **walls_index.get_arrays(),
+    }
+
+# Build the compiled context of a map (config, walls and experimental dataset tables)
+def build_map_context(map_id: int) -> MapContext:
+    """
+    Build the compiled context of a map: load its config, map and experimental Antenna RF dataset files,
+    compile the map walls (arrays and spatial index) and fit the activations model.
+    The walls of the map are also loaded on the wall intersections worker pool and on the wall crossings rasters.
+
+    Args:
+        map_id (int): The map id
+
+    Returns:
+        MapContext: The compiled context of the map
+    """
+    if map_id not in config_files_by_map_id:
+        raise ValueError(f"Unknown map id: {map_id}")
+
+    # open config file
+    config_file_url = urllib.request.urlopen(
+        f"{host_domain_name_server}/static-files/config_files/{config_files_by_map_id[map_id]}")
+
+    ########## Antenna RF Activations & Average Time of Readings ##########
+    # Get Nr_Activations and AvgTimeReadings of Antenna data from csv file
+    antenna_dataset_name = "antenna_experimental_dataset_10m.csv"
+    antenna_dataset_file_url = urllib.request.urlopen(
+        f"{host_domain_name_server}/static-files/antenna_datasets/{antenna_dataset_name}")
+    # read antenna data file
+    antenna_experimental_data_activations = antenna_dataset_file_url.read().decode('utf-8')
+
+    # read config data file
+    config_data = config_file_url.read().decode('utf-8')
+    # load to geojson
+    config_json = json.loads(str(config_data))
+    # read map_url
+    map_path_name = config_json["map"]["map_url"]
+
+    # open file map
+    static_files_map_path_name = map_path_name.replace("..","")
+    map_file_url = urllib.request.urlopen(f"{host_domain_name_server}/{static_files_map_path_name}") 
+    # read map data file
+    map_data = map_file_url.read()
+
+    # get the compiled walls of the map (from its artifact, keyed by the map data and walls filters, or compiled and stored)
+    artifact_key = map_artifact_key(map_data, config_json["map"])
+    map_artifact = map_artifacts.get(artifact_key, lambda: compile_map_walls(map_data, config_json["map"]))
+    walls_array = map_artifact["walls_array"]
+    walls_groups = map_artifact["walls_groups"]
+    walls_index = load_walls_index(map_artifact)
+    # load the walls of the map on the wall intersections worker pool (the workers memory-map its artifact on their first task of the map)
+    wall_intersections_pool.register_map(map_id, walls_array, walls_groups, walls_index, map_artifacts.get_path(artifact_key))
+    # set the wall crossings rasters of the map (as set on map config)
+    wall_crossings_rasters.register_map(map_id, config_json["map"], walls_array, walls_groups, walls_index)
+    # preload the trajectories of the map animations (precomputed against the antennas in background, as set on map config)
+    if config_json["map"].get("trajectory_precomputation", {}).get("enabled", False):
+        trajectory_tables.register_map(map_id, config_json["map"], load_map_trajectories(config_json["map"]))
+
+    # get dict of csv with average values for iterations
+    # Split a string into a list where each line is a list item
+    antenna_dict = csv_to_dict(antenna_experimental_data_activations.splitlines())
+    # Split a string into a list where each line is a list item
+    antenna_list_avg_values = csv_to_avg_list(antenna_experimental_data_activations.splitlines())
+
+    # get antenna dict data in a list
+    antenna_list_distances = list(antenna_dict.keys())
+    antenna_list_values = list(antenna_list_avg_values.values())
+
+    experimental_tables = {
+        # create a data array with antenna dict data
+        "antenna_experimental_distances": np.array(antenna_list_distances, float),
+        "antenna_experimental_values": np.array(antenna_list_values, float),
+        # get dict of standard deviations means of values of each column in a dict
+        "stdev_mean_dict": dict_mean_std(antenna_dict),
+    }
+
+    # get activations model of the experimental data (loaded from the parameters file of the dataset, or fitted once by dataset)
+    activations_model = load_activations_model(antenna_experimental_data_activations, activations_params_path(antenna_dataset_name))
+
+    return MapContext(map_id, config_json, walls_array, walls_groups, walls_index, activations_model, experimental_tables,
+                      array_to_json(map_artifact["walls_properties"]))
+
+# Load the trajectories of the asset point animations of a map
+def load_map_trajectories(map_config: dict) -> list:
+    """
+    Load the trajectories of the asset point animations of a map (the GeoJSON paths replayed by the frontend).
+
+    Args:
+        map_config (dict): The "map" section of the config file
+
+    Returns:
+        list: List of the trajectories (lists of Longitude and Latitude coordinates)
+    """
+    trajectories = []
+    for animation_path_name in map_config.get("asset_point_animations", []):
+        animation_file_url = urllib.request.urlopen(f"{host_domain_name_server}/{animation_path_name.replace('..', '')}")
+        for feature in json.loads(animation_file_url.read().decode('utf-8'))["features"]:
+            if feature["geometry"]["type"] == "LineString":
+                trajectories.append(feature["geometry"]["coordinates"])
+    return trajectories
+
+# Update the matrices of the anchors or asset points of a session (only the changed pairs of entity and antenna)
+def update_entity_matrices(session_uuid: str, kind: str, matrices: EntityMatrices, entities_signatures: list, antennas_signatures: list,
+                           calculate_cache: CalculateCache, timer: StageTimer = None, quantization_steps: tuple = None) -> int:
+    """
+    Update the distances, wall intersections and lobes visibility matrices of the anchors or asset points of a session.
+    Only the (entity, antenna) pairs of the entities or antennas changed since the last tick are updated: from the calculate_cache
+    (keyed by the geometry of the entity and of the antenna, all the pairs looked up in one batch) or measured in batches
+    (e.g. the moved asset points against all the antennas, or a moved antenna against all the asset points).
+    The geometry arrays are built from the signatures only for the cache misses.
+    With a position quantization, the entities of the same cell share the cached wall intersections and lobes visibility
+    (the distances of the cache hits are measured from the exact positions).
+
+    Args:
+        session_uuid (str): Frontend session UUID
+        kind (str): The kind of entities ("anchor" or "ap")
+        matrices (EntityMatrices): The matrices of the entities of the session
+        entities_signatures (list): Signature of each entity (Longitude and Latitude, and the large and small lobes of the asset points)
+        antennas_signatures (list): Signature of each antenna (Longitude and Latitude, direction and opening of the lobe)
+        calculate_cache (CalculateCache): In-memory cache used upgrade performance calculations
+        timer (StageTimer): Timer of the tick stages (the cache lookups and the geometry of the misses are timed as stages of the kind)
+        quantization_steps (tuple): (Longitude step, Latitude step) in degrees of the position quantization cells (None for exact positions)
+
+    Returns:
+        int: Amount of (entity, antenna) pairs measured (not found in the calculate_cache)
+    """
+    dirty_rows, dirty_cols = matrices.update_signatures(entities_signatures, antennas_signatures)
+
+    # changed (entity, antenna) pairs: the changed entities with all the antennas, and all the entities with the changed antennas
+    dirty_rows_set = set(dirty_rows)
+    all_cols = list(range(len(antennas_signatures)))
+    clean_rows = [row for row in range(len(entities_signatures)) if row not in dirty_rows_set] if len(dirty_cols) > 0 else []
+    if len(dirty_rows) * len(all_cols) + len(clean_rows) * len(dirty_cols) == 0:
+        if timer is not None:
+            timer.lap(f"{kind}_cache")
+        return 0
+    pairs_rows = np.concatenate([np.repeat(np.asarray(dirty_rows, dtype=np.int64), len(all_cols)),
+                                 np.repeat(np.asarray(clean_rows, dtype=np.int64), len(dirty_cols))])
+    pairs_cols = np.concatenate([np.tile(np.asarray(all_cols, dtype=np.int64), len(dirty_rows)),
+                                 np.tile(np.asarray(dirty_cols, dtype=np.int64), len(clean_rows))])
+
+    # digests of the cache keys of the entities (with the cell of the position, if quantized) and of the antennas,
+    # made once by entity and by antenna (the key of a pair joins both digests)
+    key_kind = kind if quantization_steps is None else (kind, quantization_steps)
+    entities_digests = {}
+    for row in list(dirty_rows) + clean_rows:
+        signature = entities_signatures[row]
+        if quantization_steps is not None:
+            signature = quantize_position(signature[0], signature[1], quantization_steps) + tuple(signature[2:])
+        entities_digests[row] = calculate_cache.make_digest(key_kind, signature)
+    antennas_digests = [calculate_cache.make_digest(signature) for signature in antennas_signatures]
+    dirty_antennas_digests = [antennas_digests[col] for col in dirty_cols]
+    memory_cache_keys = [(session_uuid, entities_digests[row] + antenna_digest) for row in dirty_rows for antenna_digest in antennas_digests]
+    memory_cache_keys += [(session_uuid, entities_digests[row] + antenna_digest) for row in clean_rows for antenna_digest in dirty_antennas_digests]
+
+    # get values from the calculate_cache (by the geometry of the entity and of the antenna)
+    cached_values = calculate_cache.get_many(memory_cache_keys)
+    missed = np.fromiter((values is None for values in cached_values), dtype=bool, count=len(cached_values))
+
+    if not np.all(missed):
+        hit_rows, hit_cols = pairs_rows[~missed], pairs_cols[~missed]
+        hit_values = np.array([values for values in cached_values if values is not None], dtype=float).reshape(-1, 3)
+        distances = hit_values[:, 0]
+        if quantization_steps is not None:
+            # distances of the quantized cache hits measured from the exact positions (the cached ones are of a position of the same cell)
+            rows = np.unique(hit_rows)
+            rows_index = np.zeros(len(entities_signatures), dtype=np.int64)
+            rows_index[rows] = np.arange(len(rows))
+            distances = measure_distances_matrix(np.array([entities_signatures[row][:2] for row in rows.tolist()], dtype=float),
+                np.array([signature[:2] for signature in antennas_signatures], dtype=float))[rows_index[hit_rows], hit_cols]
+        matrices.set_pairs(hit_rows, hit_cols, distances, hit_values[:, 1], hit_values[:, 2] != 0)
+
+    missed_cols_by_row = {}
+    for row, col in zip(pairs_rows[missed].tolist(), pairs_cols[missed].tolist()):
+        missed_cols_by_row.setdefault(row, []).append(col)
+
+    if timer is not None:
+        timer.lap(f"{kind}_cache")
+    if len(missed_cols_by_row) == 0:
+        return 0
+
+    # group the entities by their missed antennas, to measure each group in one batch
+    missed_rows_by_cols = {}
+    for row, cols in missed_cols_by_row.items():
+        missed_rows_by_cols.setdefault(tuple(cols), []).append(row)
+    batches = [(rows, list(cols)) for cols, rows in missed_rows_by_cols.items()]
+
+    # time of the geometry sub-stages of the missed pairs (distances, lines of sight and wall intersections, and lobes visibility)
+    t_distances, t_wall_intersections, t_visibility = 0.0, 0.0, 0.0
+    for rows, cols in batches:
+        t_start = time.perf_counter()
+        # geometry of the missed entities and antennas (coordinates and lobes) from their signatures
+        points = np.array([entities_signatures[row] for row in rows], dtype=float).reshape(len(rows), -1)
+        antennas = np.array([antennas_signatures[col] for col in cols], dtype=float).reshape(len(cols), 4)
+        points_coords = np.ascontiguousarray(points[:, :2])
+        antennas_coords = np.ascontiguousarray(antennas[:, :2])
+        # distances and wall intersections of the positions of the map animations trajectories (precomputed in background)
+        distances, wall_intersections = trajectory_tables.lookup(god.getMapId(session_uuid), points_coords, antennas_coords)
+        not_precomputed = wall_intersections < 0
+        if np.any(not_precomputed):
+            # measure distances between the entities and the antennas
+            distances = np.where(not_precomputed, measure_distances_matrix(points_coords, antennas_coords), distances)
+            t_distances += time.perf_counter() - t_start
+            t_start = time.perf_counter()
+            # catch wall Intersections of the lines of sight not precomputed (from the antennas wall crossings rasters, and with the
+            # exact geometry for the lines of sight not served by them)
+            measured_rows = np.nonzero(np.any(not_precomputed, axis=1))[0]
+            measured_wall_intersections = wall_crossings_rasters.count(god.getMapId(session_uuid), points_coords[measured_rows], antennas_coords)
+            wall_intersections[measured_rows] = np.where(not_precomputed[measured_rows], measured_wall_intersections, wall_intersections[measured_rows])
+            t_wall_intersections += time.perf_counter() - t_start
+        else:
+            t_distances += time.perf_counter() - t_start
+        t_start = time.perf_counter()
+        # check antenna directions intersections with the lines of sight (and with the asset points lobes)
+        if points.shape[1] == 2:
+            visibility = measure_lobes_visibility(points_coords, antennas_coords, antennas[:, 2], antennas[:, 3])
+        else:
+            visibility = measure_lobes_visibility(points_coords, antennas_coords, antennas[:, 2], antennas[:, 3],
+                points[:, 2], points[:, 3], points[:, 4], points[:, 5])
+        t_visibility += time.perf_counter() - t_start
+        matrices.set_cells(rows, cols, distances, wall_intersections, visibility)
+
+    # Store the missed pairs to the calculate_cache (by pair of entity and antenna, in one batch)
+    cache_items = []
+    for rows, cols in batches:
+        cells = np.ix_(rows, cols)
+        for row, row_distances, row_wall_intersections, row_visibility in zip(rows, matrices.distances[cells].tolist(),
+                matrices.wall_intersections[cells].tolist(), matrices.visibility[cells].tolist()):
+            cache_items += [((session_uuid, entities_digests[row] + antennas_digests[col]), values)
+                            for col, values in zip(cols, zip(row_distances, row_wall_intersections, row_visibility))]
+    calculate_cache.put_many(cache_items)
+
+    if timer is not None:
+        timer.add(f"{kind}_distances", t_distances)
+        timer.add(f"{kind}_wall_intersections", t_wall_intersections)
+        timer.add(f"{kind}_visibility", t_visibility)
+        timer.lap(f"{kind}_geometry")
+    return sum(len(rows) * len(cols) for rows, cols in batches)
+
+# Build the static anchors of a session (from the anchors matrices, only the changed pairs of anchor and antenna are measured)
+def build_static_anchors(session_uuid: str, anchors_signatures: list, antennas_signatures: list, calculate_cache: CalculateCache,
+                         timer: StageTimer = None) -> StaticAnchors:
+    """
+    Build the precomputed values of the anchors of a session against the antennas (distances, wall intersections and lobes visibility),
+    called only when the anchors or the antennas change.
+
+    Args:
+        session_uuid (str): Frontend session UUID
+        anchors_signatures (list): Signature of each anchor (Longitude and Latitude)
+        antennas_signatures (list): Signature of each antenna (Longitude and Latitude, direction and opening of the lobe)
+        calculate_cache (CalculateCache): In-memory cache used upgrade performance calculations
+        timer (StageTimer): Timer of the tick stages
+
+    Returns:
+        StaticAnchors: The static anchors of the session
+    """
+    anchors_matrices = entity_matrices.get(session_uuid, "anchors")
+    update_entity_matrices(session_uuid, "anchor", anchors_matrices, anchors_signatures, antennas_signatures, calculate_cache, timer)
+    return StaticAnchors((tuple(anchors_signatures), tuple(antennas_signatures)), anchors_matrices.distances,
+        anchors_matrices.wall_intersections, anchors_matrices.visibility)
+
 # 1 Calculate Distances & RSSI & Activations, using in-memory cache to increase process time
 # 2 Get Values from LookUptable (Dictionary) with Experimental Data of Antenna RF
 # 3 Publish Result Messages to the broker in respective defined topics
-def calculate(client: mqtt.Client, session_uuid: str, calculate_cache: dict):
+def calculate(client: mqtt.Client, session_uuid: str, calculate_cache: CalculateCache):
     """
     **Main function of backend caculations process, divided in stages:**
 
@@ -997,457 +1212,293 @@ def calculate(client: mqtt.Client, session_uuid: str, calculate_cache: dict):
     Args:
         client (mqtt.Client): The client Id
         session_uuid (str): The Frontend session uuid
-        calculate_cache (dict): In-memory cache dictionary used upgrade performance calculations
+        calculate_cache (CalculateCache): In-memory cache used upgrade performance calculations
     """
-    # profiler.enable()
     #t_start = time.time()
 
-    global first_msg
-    global geojson_map
-    global featuresType
-    global walls_by_quadrants
-    global stdev_mean_dict
-    global antenna_experimental_distances
-    global antenna_experimental_values
-    global matrix_quadrants_long
-    global matrix_quadrants_lat
     global host_domain_name_server
 
     # verify if status (close) is on message
     if(god.getStatus(session_uuid) == "close"):
         previousValues[session_uuid] = []
+        noise_generators.remove(session_uuid)
+        entity_matrices.remove_session(session_uuid)
+        static_anchors.remove_session(session_uuid)
+        stage_timings.remove_session(session_uuid)
+        # drop the cache entries of the session
+        calculate_cache.remove_session(session_uuid)
         return 
 
-    # verify if current_uuid was not saved previously
-    if(session_uuid not in previousValues):
-        previousValues[session_uuid] = []
+    # profile the tick (if a capture is armed) and time the stages of the tick
+    profile_capture = tick_profiler.start_tick(session_uuid)
+    try:
+        timer = stage_timings.start(session_uuid)
 
-    # verify if is the first message received
-    if(session_uuid not in first_msg):
-        if(god.getMapId(session_uuid) == 0):
-            # open config file
-            config_file_url = urllib.request.urlopen(
-                f"{host_domain_name_server}/static-files/config_files/config-params-library-ua-floor2.json")
-        elif(god.getMapId(session_uuid) == 1):
-            # open config file
-            config_file_url = urllib.request.urlopen(
-                f"{host_domain_name_server}/static-files/config_files/config-params-aveiro-it-building1.json")
-        elif(god.getMapId(session_uuid) == 2):
-            # open config file
-            config_file_url = urllib.request.urlopen(
-                f"{host_domain_name_server}/static-files/config_files/config-params-sjm-policlinica-mario-martins.json")
-
-        ########## Antenna RF Activations & Average Time of Readings ##########
-        # Get Nr_Activations and AvgTimeReadings of Antenna data from csv file
-        antenna_dataset_file_url = urllib.request.urlopen(
-            f"{host_domain_name_server}/static-files/antenna_datasets/antenna_experimental_dataset_10m.csv")
-        # read antenna data file
-        antenna_experimental_data_activations = antenna_dataset_file_url.read().decode('utf-8')
-
-        # read config data file
-        config_data = config_file_url.read().decode('utf-8')
-        # load to geojson
-        config_json = json.loads(str(config_data))
-        # read map_url, Long, Lat values to define a Matrix of Quadrants in the Map
-        matrix_quadrants_long = config_json["map"]["map_center"][0]
-        matrix_quadrants_lat = config_json["map"]["map_center"][1]
-        map_path_name = config_json["map"]["map_url"]
-        map_walls_filter_keywords = config_json["map"]["filter_walls_keywords"]
-        map_walls_filter_levels = config_json["map"]["filter_walls_levels"]
-        featuresType[session_uuid] = config_json["features"]
-
-        # open file map
-        static_files_map_path_name = map_path_name.replace("..","")
-        map_file_url = urllib.request.urlopen(f"{host_domain_name_server}/{static_files_map_path_name}") 
-        # read map data file
-        map_data = map_file_url.read().decode('utf-8')
-        # load to geojson
-        geojson_map = geojson.loads(str(map_data))
-
-        # catch walls from the map
-        walls = catch_map_walls(geojson_map, map_walls_filter_keywords, map_walls_filter_levels)
-        # get walls by quadrants
-        walls_by_quadrants[session_uuid] = get_line_segment_walls_by_quad(walls)
-
-        # get dict of csv with average values for iterations
-        # Split a string into a list where each line is a list item
-        antenna_dict = csv_to_dict(antenna_experimental_data_activations.splitlines())
-        # Split a string into a list where each line is a list item
-        antenna_list_avg_values = csv_to_avg_list(antenna_experimental_data_activations.splitlines())
-        #print("Dictionary from csv: \n",  antenna_dict)
-        #print("List Avg Values from csv: \n",  antenna_list_avg_values)
-
-        # get antenna dict data in a list
-        antenna_list_distances = list(antenna_dict.keys())
-        antenna_list_values = list(antenna_list_avg_values.values())
+        # verify if current_uuid was not saved previously
+        if(session_uuid not in previousValues):
+            previousValues[session_uuid] = []
 
-        # create a data array with antenna dict data
-        antenna_experimental_distances = np.array(antenna_list_distances, float)
-        antenna_experimental_values = np.array(antenna_list_values, float)
+        # get the compiled context of the session map (built once by map, shared by all the sessions of the map)
+        map_context = map_contexts.get(god.getMapId(session_uuid))
+        timer.lap("map_context")
 
-        # get dict of standard deviations means of values of each column in a dict
-        stdev_mean_dict = dict_mean_std(antenna_dict)
-        first_msg.append(session_uuid)
-
-    # vars to list data by asset point or by anchor
-    ap_lines_of_sight = []
-    anchors_lines_of_sight = []
-    ap_lines_by_quadrants = []
-    anchor_lines_by_quadrants = []
-    antennas_dir_ap_intersections = []
-    antennas_dir_anchors_intersections = []
-    ap_wall_intersections = []
-    anchors_wall_intersections = []
-    ap_distances_antennas = []
-    anchors_distances_antennas = []
-    memory_cache_ap_key = []
-    memory_cache_anchors_key = []
-
-    # create ap and anchors distance value lists
-    ap_distance_values = []
-    anchor_distance_values = [] 
-    # create ap and anchor activations value lists
-    ap_activation_values = []
-    anchor_activation_values = []
-
-    # create ap_distances_data list
-    ap_distances_data = []
-    # create ap_rssi_value list 
-    ap_rssi_value = []
-    # create ap_rssi_data list
-    ap_rssi_data = []
-        
-    # create anchor_distances_data list
-    anchor_distances_data = []
-     # create anchor_rssi_value list 
-    anchor_rssi_value = []
-    # create anchor_rssi_data list
-    anchor_rssi_data = []
-
-    # create ap_activations_data list
-    ap_activations_data = []
-    # create anchor_activations_data list
-    anchor_activations_data = []
-    
-    # create antenna direction angles list
-    antenna_dir_angle = []
-    # create antennas_dir_angles_data 
-    antennas_dir_angles_data = []
-    # create antennas_coords_data list
-    antennas_coords_data = []
-
-    # get antennas values from God
-    antennas_data = list(god.getAntennas(session_uuid).values())
-    # get asset point values from God
-    asset_points_data = list(god.getAssetPoints(session_uuid).values())
-    # get algorithms values from God
-    algorithms = god.getAlgorithms(session_uuid)
-    # get rssi parameters from GOD
-    rssi_params = god.getRssiParams(session_uuid)
-
-    # get rssi_parameters to apply calculations
-    txPower = rssi_params["tx"]
-    pathLossExpoent = rssi_params["ple(n)"]
-    constantFading = rssi_params["cf"]
-    skewIndex = rssi_params["skew"]
-    referenceDistance = rssi_params["d0"]
-    attenuationFactor = rssi_params["af"]
-
-    # create processedMsgToPredictor
-    processedMsgToPredictor = {
-        "uuid": session_uuid,
-        "ap-rssi": [],
-        "ap-activ": [],
-        "anch-rssi": [],
-        "anch-activ": [],
-        "ant-angles": [],
-        "ant-coords": [],
-        "algo": algorithms,
-        "features": featuresType[session_uuid]
-    }
-
-    # create processedMsgToFrontend
-    processedMsgToFrontend = {
-        "uuid": session_uuid,
-        "from": "backend",
-        "ap-coords": [],
-        "ap-dist": [],
-        "ap-activ": [],
-        "ap-rssi": [],
-        "ap-wall-inter": [],
-        "ant-dir-ap-inter": [],
-        "anch-dist": [],
-        "anch-activ": [],
-        "anch-rssi": [],
-        "anch-wall-inter": [],
-        "ant-dir-anch-inter": []
-    }
+        # create ap distance value list
+        ap_distance_values = []
+        # create ap activations value list
+        ap_activation_values = []
 
-    # create antenna_data_flat variable to use in memory cache
-    antenna_data_flat = ''
-
-    # iterate over antennas_data
-    for antenna in range(0, len(antennas_data)):
-        # get antenna direction angle
-        antenna_dir_angle = float(antennas_data[antenna].direction)
-        # get antenna coords long lat
-        antenna_coords = [antennas_data[antenna].lng, antennas_data[antenna].lat]
-        # append values to the lists
-        antennas_dir_angles_data.append(antenna_dir_angle)
-        antennas_coords_data.append(antenna_coords)
-        # var to hold antenna_data in flat string
-        antenna_data_flat += ("," + \
-                str((antennas_data[antenna].lng, antennas_data[antenna].lat, antennas_data[antenna].direction, antennas_data[antenna].opening, antennas_data[antenna].txPower)))         
-
-    # append antennas data to processedMsgToPredictor
-    processedMsgToPredictor["ant-angles"] = antennas_dir_angles_data
-    processedMsgToPredictor["ant-coords"] = antennas_coords_data
-
-    # if god has anchors do the respective calculations
-    if(session_uuid in god.anchors):
-        if(len(god.anchors[session_uuid]) > 0):
-            # get anchors values from God
-            anchors_data = list(god.getAnchors(session_uuid).values())
+        # create ap_distances_data list
+        ap_distances_data = []
+        # create ap_rssi_value list 
+        ap_rssi_value = []
+        # create ap_rssi_data list
+        ap_rssi_data = []
             
-            # itereate over anchors_data
-            for anchor_index in range(0, len(anchors_data)):
-                # append empty array by each anchor_index
-                anchors_lines_of_sight.append([])
-                anchor_lines_by_quadrants.append([])
-                anchors_distances_antennas.append([])
-                anchor_distance_values.append([])
-                anchor_rssi_value.append([])
-                anchor_activation_values.append([])
-                anchors_wall_intersections.append([])   
-                antennas_dir_anchors_intersections.append([])
-                memory_cache_anchors_key.append([])
-
-                # catch lines of sight by anchor
-                anchors_lines_of_sight[anchor_index] = catch_lines_of_sight(anchors_data[anchor_index], antennas_data)
-                # catch quadrants where lines pass
-                anchor_lines_by_quadrants[anchor_index] = get_quadrants_of_lines(anchors_lines_of_sight[anchor_index])
-                # catch antenna directions intersections with lines of sight
-                antennas_dir_anchors_intersections[anchor_index] = catch_antenna_directions_intersections_with_anchors(anchors_lines_of_sight[anchor_index], antennas_data)
-                
-                # set a key to store in memory cache (by anchor index)
-                memory_cache_anchors_key[anchor_index] = session_uuid + "," + \
-                    str((anchors_data[anchor_index].lng, anchors_data[anchor_index].lat)) + str(antenna_data_flat)
-
-                # verify if key not exists in the calculate_cache
-                if memory_cache_anchors_key[anchor_index] not in calculate_cache:
-                    # catch wall Intersctions
-                    anchors_wall_intersections[anchor_index] = catch_wall_intersections(
-                        anchors_lines_of_sight[anchor_index], anchor_lines_by_quadrants[anchor_index], walls_by_quadrants[session_uuid])
-    
-                    # measure distances between anchors and antennas
-                    anchors_distances_antennas = measure_distances_to_antennas(anchors_data, antennas_data)
-
-                    # save distances to previousValues
-                    previousValues[session_uuid] = anchors_distances_antennas
-
-                    # Store to calculate_cache
-                    calculate_cache[memory_cache_anchors_key[anchor_index]] = {
-                        'ant_dir_anch_intersections': antennas_dir_anchors_intersections[anchor_index],
-                        'anch_wall_intersections': anchors_wall_intersections[anchor_index],
-                        'anch_distances_antennas': anchors_distances_antennas[anchor_index],
-                        'antennas': antennas_data,
-                    }
-                else:
-                    # Get values from cache
-                    antennas_dir_anchors_intersections[anchor_index] = calculate_cache[memory_cache_anchors_key[anchor_index]]['ant_dir_anch_intersections']
-                    anchors_wall_intersections[anchor_index] = calculate_cache[memory_cache_anchors_key[anchor_index]]['anch_wall_intersections']
-                    anchors_distances_antennas[anchor_index] = calculate_cache[memory_cache_anchors_key[anchor_index]]['anch_distances_antennas']
-                    antennas_data = calculate_cache[memory_cache_anchors_key[anchor_index]]['antennas']
-
-                # iterate over antennas_data
-                for antenna in range(0, len(antennas_data)):
-                    # get distance value from distances array
-                    anchor_distance_values[anchor_index] = round(anchors_distances_antennas[anchor_index][antenna], 3)
-                    # calculate attenuation from intersections array and attenuation_factor
-                    attenuation_value = anchors_wall_intersections[anchor_index][antenna] * float(attenuationFactor)
-
-                    # if directionated to anchor, this is, 'true'
-                    if(antennas_dir_anchors_intersections[anchor_index][antenna] == True):
-                        # measure RSSI after calculated distance
-                        anchor_rssi_value[anchor_index] = round(
-                            measure_RSSI(float(txPower), float(pathLossExpoent), float(constantFading), float(skewIndex), float(referenceDistance), float(anchor_distance_values[anchor_index]), float(attenuation_value)), 2)
-
-                        # if distance of anchor to antenna is smaller than 10 meters
-                        if(float(anchor_distance_values[anchor_index]) <= 10):
-                            # get activations of antennas from experimental data
-                            anchor_activation_values[anchor_index] = exponential_regression_1D_array(
-                                float(anchor_distance_values[anchor_index]), antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict)
-                        else:
-                            # set activations_data = 0 (must be None values)
-                            anchor_activation_values[anchor_index] = [0, 0, 0]
-
-                        '''
-                        # OR introduce some logic here:
-                        # if distance_value is small than maximum of measured distances experimentally -> apply Interpolation (linear) to the data with stdev noise output
-                        # else: distance_value is greater than maximum of measured distances experimentally -> apply Exponential Regression using inverse sigmoid function with stdev noise output
-                        if float(distance_value) <= max(antenna_experimental_distances):
-                            # get look up table values of activations of antennas RF readings
-                            activations_data = interpolate_extrapolate_1D_array(
-                                float(distance_value), antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict, 'linear')
-                        else:
-                            activations_data = exponential_regression_1D_array(
-                                float(distance_value), antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict)
-                        '''
-                    else:
-                        # set rssi = -170 (must be None value)
-                        anchor_rssi_value[anchor_index] = -170 # assumed threshold None value
-
-                        # set activations_data = 0 (must be None values)
-                        anchor_activation_values[anchor_index] = [0, 0, 0]
-
-                    # append values by antenna to lists of data
-                    anchor_distances_data.append(anchor_distance_values[anchor_index])
-                    anchor_activations_data.append(anchor_activation_values[anchor_index])
-                    anchor_rssi_data.append(anchor_rssi_value[anchor_index])
-
-                # populate processedMsgToFrontend with data
-                processedMsgToFrontend["anch-dist"].append(anchor_distances_data)
-                processedMsgToFrontend["anch-activ"].append(anchor_activations_data)
-                processedMsgToFrontend["anch-rssi"].append(anchor_rssi_data)
-
-                processedMsgToFrontend["anch-wall-inter"].append(anchors_wall_intersections[anchor_index])
-                processedMsgToFrontend["ant-dir-anch-inter"].append(antennas_dir_anchors_intersections[anchor_index])
-                
-                # populate processedMsgToPredictor with data
-                processedMsgToPredictor["anch-activ"].append(anchor_activations_data)
-                processedMsgToPredictor["anch-rssi"].append(anchor_rssi_data)
-
-                # empty lists of data
-                anchor_distances_data = []
-                anchor_activations_data = []
-                anchor_rssi_data = []
-
-    # iterate over asset_points_data
-    for asset_point_index in range(0, len(asset_points_data)):
-        # append empty array by each asset_point_index
-        ap_lines_of_sight.append([])
-        ap_lines_by_quadrants.append([])
-        ap_distances_antennas.append([])
-        ap_distance_values.append([])
-        ap_rssi_value.append([])
-        ap_activation_values.append([])
-        ap_wall_intersections.append([])     
-        antennas_dir_ap_intersections.append([])
-        memory_cache_ap_key.append([])
-
-        # catch lines of sight by asset point (use in memory cache)
-        ap_lines_of_sight[asset_point_index] = catch_lines_of_sight(asset_points_data[asset_point_index], antennas_data)
-        # catch quadrants where lines pass
-        ap_lines_by_quadrants[asset_point_index] = get_quadrants_of_lines(ap_lines_of_sight[asset_point_index])
-        # catch antenna directions intersections with lines of sight
-        antennas_dir_ap_intersections[asset_point_index] = catch_antenna_directions_intersections_with_asset_points(ap_lines_of_sight[asset_point_index], asset_points_data[asset_point_index], antennas_data)
-
-        # set a key to store in memory cache (by asset point index)
-        memory_cache_ap_key[asset_point_index] = session_uuid + "," + \
-            str((
-                asset_points_data[asset_point_index].lng, 
-                asset_points_data[asset_point_index].lat, 
-                asset_points_data[asset_point_index].largeDirection,
-                asset_points_data[asset_point_index].largeOpening,
-                asset_points_data[asset_point_index].smallDirection,
-                asset_points_data[asset_point_index].smallOpening
-            )) + str(antenna_data_flat)
-
-        # verify if key not exists in the calculate_cache
-        if memory_cache_ap_key[asset_point_index] not in calculate_cache:
-            # catch wall Intersctions
-            ap_wall_intersections[asset_point_index] = catch_wall_intersections(
-                ap_lines_of_sight[asset_point_index], ap_lines_by_quadrants[asset_point_index], walls_by_quadrants[session_uuid])
-
-            # measure distances between asset point and antennas
-            ap_distances_antennas = measure_distances_to_antennas(asset_points_data, antennas_data)
-
-            # save distances to previousValues
-            previousValues[session_uuid] = ap_distances_antennas
-
-            # Store to calculate_cache
-            calculate_cache[memory_cache_ap_key[asset_point_index]] = {
-                'ant_dir_ap_intersections': antennas_dir_ap_intersections[asset_point_index],
-                'ap_wall_intersections': ap_wall_intersections[asset_point_index],
-                'ap_distances_antennas': ap_distances_antennas[asset_point_index],
-                'antennas': antennas_data,
-            }
-        else:
-            # Get values from cache
-            antennas_dir_ap_intersections[asset_point_index] = calculate_cache[memory_cache_ap_key[asset_point_index]]['ant_dir_ap_intersections']
-            ap_wall_intersections[asset_point_index] = calculate_cache[memory_cache_ap_key[asset_point_index]]['ap_wall_intersections']
-            ap_distances_antennas[asset_point_index] = calculate_cache[memory_cache_ap_key[asset_point_index]]['ap_distances_antennas']
-            antennas_data = calculate_cache[memory_cache_ap_key[asset_point_index]]['antennas']
+        # create ap_activations_data list
+        ap_activations_data = []
+        
+        # create antenna direction angles list
+        antenna_dir_angle = []
+        # create antennas_dir_angles_data 
+        antennas_dir_angles_data = []
+        # create antennas_coords_data list
+        antennas_coords_data = []
+
+        # get antennas values from God
+        antennas_data = list(god.getAntennas(session_uuid).values())
+        # get asset point values from God
+        asset_points_data = list(god.getAssetPoints(session_uuid).values())
+        # get algorithms values from God
+        algorithms = god.getAlgorithms(session_uuid)
+        # get rssi parameters from GOD
+        rssi_params = god.getRssiParams(session_uuid)
+
+        # get rssi_parameters to apply calculations
+        txPower = rssi_params["tx"]
+        pathLossExpoent = rssi_params["ple(n)"]
+        constantFading = rssi_params["cf"]
+        skewIndex = rssi_params["skew"]
+        referenceDistance = rssi_params["d0"]
+        attenuationFactor = rssi_params["af"]
+
+        # create processedMsgToPredictor
+        processedMsgToPredictor = {
+            "uuid": session_uuid,
+            "ap-rssi": [],
+            "ap-activ": [],
+            "anch-rssi": [],
+            "anch-activ": [],
+            "ant-angles": [],
+            "ant-coords": [],
+            "algo": algorithms,
+            "features": map_context.features_type
+        }
+
+        # create processedMsgToFrontend
+        processedMsgToFrontend = {
+            "uuid": session_uuid,
+            "from": "backend",
+            "ap-coords": [],
+            "ap-dist": [],
+            "ap-activ": [],
+            "ap-rssi": [],
+            "ap-wall-inter": [],
+            "ant-dir-ap-inter": [],
+            "anch-dist": [],
+            "anch-activ": [],
+            "anch-rssi": [],
+            "anch-wall-inter": [],
+            "ant-dir-anch-inter": []
+        }
 
         # iterate over antennas_data
         for antenna in range(0, len(antennas_data)):
-            # get distance value from distances array
-            ap_distance_values[asset_point_index] = round(ap_distances_antennas[asset_point_index][antenna], 3)
-            # calculate attenuation from intersections array and attenuation_factor
-            attenuation_value = ap_wall_intersections[asset_point_index][antenna] * float(attenuationFactor)
-
-            # if directionated to asset point, this is, 'true'
-            if(antennas_dir_ap_intersections[asset_point_index][antenna] == True):
-                # measure RSSI after calculated distance
-                ap_rssi_value[asset_point_index] = round(
-                    measure_RSSI(float(txPower), float(pathLossExpoent), float(constantFading), float(skewIndex), float(referenceDistance), float(ap_distance_values[asset_point_index]), float(attenuation_value)), 2)
-
-                # if distance of asset point to antenna is smaller than 10 meters
-                if(float(ap_distance_values[asset_point_index]) <= 10):
-                    # get activations of antennas from experimental data
-                    ap_activation_values[asset_point_index] = exponential_regression_1D_array(
-                        float(ap_distance_values[asset_point_index]), antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict)
+            # get antenna direction angle
+            antenna_dir_angle = float(antennas_data[antenna].direction)
+            # get antenna coords long lat
+            antenna_coords = [antennas_data[antenna].lng, antennas_data[antenna].lat]
+            # append values to the lists
+            antennas_dir_angles_data.append(antenna_dir_angle)
+            antennas_coords_data.append(antenna_coords)
+
+        # append antennas data to processedMsgToPredictor
+        processedMsgToPredictor["ant-angles"] = antennas_dir_angles_data
+        processedMsgToPredictor["ant-coords"] = antennas_coords_data
+
+        # get anchors values from God (if god has anchors do the respective calculations)
+        anchors_data = []
+        if(session_uuid in god.anchors):
+            anchors_data = list(god.getAnchors(session_uuid).values())
+
+        # signatures of the antennas geometry (coordinates and lobe), anchors (coordinates) and asset points (coordinates and lobes):
+        # the cheap cache keys, computed first (the geometry arrays are built from them only for the cache misses)
+        antennas_signatures = [(antenna.lng, antenna.lat, antenna.direction, antenna.opening) for antenna in antennas_data]
+        anchors_signatures = [(anchor.lng, anchor.lat) for anchor in anchors_data]
+        ap_signatures = [(asset_point.lng, asset_point.lat, asset_point.largeDirection, asset_point.largeOpening,
+            asset_point.smallDirection, asset_point.smallOpening) for asset_point in asset_points_data]
+
+        # start the precomputation of the map animations trajectories against the antennas not built yet (if set on the map config)
+        trajectory_tables.prepare(god.getMapId(session_uuid), [signature[:2] for signature in antennas_signatures])
+        timer.lap("entities")
+
+        # static anchors of the session (distances, wall intersections and lobes visibility against the antennas), built only when
+        # the anchors or the antennas change: on the other ticks only the RSSI noise and the activations of the anchors are drawn
+        session_anchors, anchors_changed = static_anchors.get(session_uuid, (tuple(anchors_signatures), tuple(antennas_signatures)),
+            lambda: build_static_anchors(session_uuid, anchors_signatures, antennas_signatures, calculate_cache, timer))
+        timer.lap("anchors")
+
+        # matrices (distances, wall intersections and lobes visibility) of the asset points of the session, kept between ticks:
+        # only the (asset point, antenna) pairs changed since the last tick are recomputed (or got from the calculate_cache, by the cell
+        # of their position if the map sets a position quantization)
+        ap_matrices = entity_matrices.get(session_uuid, "ap")
+        ap_missed_pairs = update_entity_matrices(session_uuid, "ap", ap_matrices, ap_signatures, antennas_signatures, calculate_cache, timer,
+            map_context.quantization_steps)
+
+        # save distances to previousValues
+        if anchors_changed:
+            previousValues[session_uuid] = session_anchors.distances_list
+        if ap_missed_pairs > 0:
+            previousValues[session_uuid] = ap_matrices.distances.tolist()
+
+        # get the rows of all the asset points (recomputed or reused)
+        ap_distances_antennas = ap_matrices.distances.tolist()
+        ap_wall_intersections = ap_matrices.wall_intersections.tolist()
+        antennas_dir_ap_intersections = ap_matrices.visibility.tolist()
+
+        # create the values lists by asset point
+        for asset_point_index in range(0, len(asset_points_data)):
+            ap_distance_values.append([])
+            ap_rssi_value.append([])
+            ap_activation_values.append([])
+
+        # get activations of antennas (from the activations model fitted on experimental data) of the lines of sight
+        # directionated and smaller than 10 meters, for all the anchors (precomputed distances) and asset points in one batch
+        activations_distances = list(session_anchors.activations_distances)
+        for asset_point_index in range(0, len(asset_points_data)):
+            for antenna in range(0, len(antennas_data)):
+                if(antennas_dir_ap_intersections[asset_point_index][antenna] == True and round(ap_distances_antennas[asset_point_index][antenna], 3) <= 10):
+                    activations_distances.append(round(ap_distances_antennas[asset_point_index][antenna], 3))
+        t_activations = time.perf_counter()
+        activations_values = map_context.activations_model.evaluate(activations_distances, noise_generators.get(session_uuid))
+        timer.add("activations", time.perf_counter() - t_activations)
+        activations_index = len(session_anchors.activations_distances)
+
+        # draw the noise of the RSSI measurements of all the directionated lines of sight (anchors and asset points) in one batch
+        rssi_noise_size = session_anchors.nr_directed
+        rssi_noise_size += sum(row.count(True) for row in antennas_dir_ap_intersections[:len(asset_points_data)])
+        rssi_noise_values = noise_generators.get(session_uuid).skewed_gaussian(-float(constantFading), float(constantFading), float(skewIndex), rssi_noise_size).tolist()
+        rssi_noise_index = session_anchors.nr_directed
+
+        # RSSI and activations of the anchors (the noise and the activations drawn on this tick applied to the precomputed values)
+        anchors_rssi = session_anchors.rssi(float(txPower), float(pathLossExpoent), float(referenceDistance), float(attenuationFactor),
+            rssi_noise_values[:session_anchors.nr_directed])
+        anchors_activations = session_anchors.activations(activations_values[:len(session_anchors.activations_distances)])
+
+        # populate processedMsgToFrontend with data
+        processedMsgToFrontend["anch-dist"] = session_anchors.distances_list
+        processedMsgToFrontend["anch-activ"] = anchors_activations
+        processedMsgToFrontend["anch-rssi"] = anchors_rssi
+
+        processedMsgToFrontend["anch-wall-inter"] = session_anchors.wall_intersections_list
+        processedMsgToFrontend["ant-dir-anch-inter"] = session_anchors.visibility_list
+
+        # populate processedMsgToPredictor with data
+        processedMsgToPredictor["anch-activ"] = anchors_activations
+        processedMsgToPredictor["anch-rssi"] = anchors_rssi
+
+        # iterate over asset_points_data
+        for asset_point_index in range(0, len(asset_points_data)):
+            # iterate over antennas_data
+            for antenna in range(0, len(antennas_data)):
+                # get distance value from distances array
+                ap_distance_values[asset_point_index] = round(ap_distances_antennas[asset_point_index][antenna], 3)
+                # calculate attenuation from intersections array and attenuation_factor
+                attenuation_value = ap_wall_intersections[asset_point_index][antenna] * float(attenuationFactor)
+
+                # if directionated to asset point, this is, 'true'
+                if(antennas_dir_ap_intersections[asset_point_index][antenna] == True):
+                    # measure RSSI after calculated distance
+                    ap_rssi_value[asset_point_index] = round(
+                        measure_RSSI(float(txPower), float(pathLossExpoent), float(constantFading), float(skewIndex), float(referenceDistance), float(ap_distance_values[asset_point_index]), float(attenuation_value), rssi_noise_values[rssi_noise_index]), 2)
+                    rssi_noise_index += 1
+
+                    # if distance of asset point to antenna is smaller than 10 meters
+                    if(float(ap_distance_values[asset_point_index]) <= 10):
+                        # get activations of antennas from experimental data
+                        ap_activation_values[asset_point_index] = activations_values[activations_index]
+                        activations_index += 1
+                    else:
+                        # set activations_data = 0 (must be None values)
+                        ap_activation_values[asset_point_index] = [0, 0, 0]
+
+                    '''
+                    # OR introduce some logic here:
+                    # if distance_value is small than maximum of measured distances experimentally -> apply Interpolation (linear) to the data with stdev noise output
+                    # else: distance_value is greater than maximum of measured distances experimentally -> apply Exponential Regression using inverse sigmoid function with stdev noise output
+                    if float(distance_value) <= max(antenna_experimental_distances):
+                        # get look up table values of activations of antennas RF readings
+                        activations_data = interpolate_extrapolate_1D_array(
+                            float(distance_value), antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict, 'linear')
+                    else:
+                        activations_data = exponential_regression_1D_array(
+                            float(distance_value), antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict)
+                    '''
                 else:
+                    # set rssi = -170 (must be None value)
+                    ap_rssi_value[asset_point_index] = -170 # assumed threshold None value
+
                     # set activations_data = 0 (must be None values)
                     ap_activation_values[asset_point_index] = [0, 0, 0]
-            else:
-                # set rssi = -170 (must be None value)
-                ap_rssi_value[asset_point_index] = -170 # assumed threshold None value
 
-                # set activations_data = 0 (must be None values)
-                ap_activation_values[asset_point_index] = [0, 0, 0]
+                # append values by antenna to lists of data
+                ap_distances_data.append(ap_distance_values[asset_point_index])
+                ap_activations_data.append(ap_activation_values[asset_point_index])
+                ap_rssi_data.append(ap_rssi_value[asset_point_index])
 
-            # append values by antenna to lists of data
-            ap_distances_data.append(ap_distance_values[asset_point_index])
-            ap_activations_data.append(ap_activation_values[asset_point_index])
-            ap_rssi_data.append(ap_rssi_value[asset_point_index])
-
-        # populate processedMsgToFrontend with data
-        processedMsgToFrontend["ap-dist"].append(ap_distances_data)
-        processedMsgToFrontend["ap-activ"].append(ap_activations_data)
-        processedMsgToFrontend["ap-rssi"].append(ap_rssi_data)
+            # populate processedMsgToFrontend with data
+            processedMsgToFrontend["ap-dist"].append(ap_distances_data)
+            processedMsgToFrontend["ap-activ"].append(ap_activations_data)
+            processedMsgToFrontend["ap-rssi"].append(ap_rssi_data)
 
-        processedMsgToFrontend["ap-coords"].append([asset_points_data[asset_point_index].getCoords()[0], asset_points_data[asset_point_index].getCoords()[1]])
-        processedMsgToFrontend["ap-wall-inter"].append(ap_wall_intersections[asset_point_index])
-        processedMsgToFrontend["ant-dir-ap-inter"].append(antennas_dir_ap_intersections[asset_point_index])
+            processedMsgToFrontend["ap-coords"].append([asset_points_data[asset_point_index].getCoords()[0], asset_points_data[asset_point_index].getCoords()[1]])
+            processedMsgToFrontend["ap-wall-inter"].append(ap_wall_intersections[asset_point_index])
+            processedMsgToFrontend["ant-dir-ap-inter"].append(antennas_dir_ap_intersections[asset_point_index])
 
-        # populate processedMsgToPredictor with rssi-values and activations_data
-        processedMsgToPredictor["ap-activ"].append(ap_activations_data)
-        processedMsgToPredictor["ap-rssi"].append(ap_rssi_data)
+            # populate processedMsgToPredictor with rssi-values and activations_data
+            processedMsgToPredictor["ap-activ"].append(ap_activations_data)
+            processedMsgToPredictor["ap-rssi"].append(ap_rssi_data)
 
-        # empty lists of data
-        ap_distances_data = []
-        ap_activations_data = []
-        ap_rssi_data = []
+            # empty lists of data
+            ap_distances_data = []
+            ap_activations_data = []
+            ap_rssi_data = []
 
-    # attach dicts with respective msgs
-    return_dict_predictor = json.dumps(processedMsgToPredictor)
-    return_dict_frontend = json.dumps(processedMsgToFrontend)
+        timer.lap("rssi_activations")
 
-    #print("Processed Message to Predictor: \n", return_dict_predictor, "\n")
-    client.publish(publish_topic_predictor, return_dict_predictor)
+        # attach dicts with respective msgs
+        return_dict_predictor = json.dumps(processedMsgToPredictor)
+        return_dict_frontend = json.dumps(processedMsgToFrontend)
+        timer.lap("serialization")
 
-    #print("Processed Message to Frontend: \n", return_dict_frontend, "\n")
-    client.publish(f'{publish_topic_frontend}/{session_uuid}', return_dict_frontend)
+        #print("Processed Message to Predictor: \n", return_dict_predictor, "\n")
+        client.publish(publish_topic_predictor, return_dict_predictor)
 
-    #print("Processed Message to Frontend (to CSV file): \n", return_dict_frontend, "\n")
-    client.publish(publish_topic_to_csv_file, return_dict_frontend) #(used only with rssi, not with activations)
+        #print("Processed Message to Frontend: \n", return_dict_frontend, "\n")
+        client.publish(f'{publish_topic_frontend}/{session_uuid}', return_dict_frontend)
 
-    #t_end = time.time()
-    #print("Calculate Time:", (t_end - t_start), "\n")
+        #print("Processed Message to Frontend (to CSV file): \n", return_dict_frontend, "\n")
+        client.publish(publish_topic_to_csv_file, return_dict_frontend) #(used only with rssi, not with activations)
+        metrics.inc("published_messages_total", topic="predictor")
+        metrics.inc("published_messages_total", topic="frontend")
+        metrics.inc("published_messages_total", topic="csv_file")
+        timer.lap("publish")
+        timer.stop()
 
-    # profiler.disable()
-    # profiler.print_stats()
+        #t_end = time.time()
+        #print("Calculate Time:", (t_end - t_start), "\n")
+    finally:
+        # always close the profiled tick, even when the tick raises
+        tick_profiler.stop_tick(profile_capture)
 
 ########## End of Distances and RSSI calculations ##########
 
@@ -1511,7 +1562,7 @@ def on_message(client: mqtt.Client, obj: mqtt.Client.connect, message: mqtt.MQTT
           "| retain flag =", message.retain,
           "\n")'''
 
-    q.put((client, array_json))
+    scheduler.put(array_json.get("uuid"), (client, array_json))
 
 # Define on_subscribe event function.
 def on_subscribe(client: mqtt.Client, obj: mqtt.Client.connect, mid: int, granted_qos: tuple):
@@ -1587,16 +1638,20 @@ def main():
     Definition of main function.
     """
     global god
-    global q
 
     # Define GOD object
     god = GOD()
 
-    # Define a queue object
-    q = queue.Queue()
+    # Turn-on the session scheduler workers
+    scheduler.start()
 
-    # Turn-on the worker thread
-    threading.Thread(target=queueWorker, daemon=True).start()
+    # Profile the first ticks of calculate (if set by BACKEND_PROFILE_TICKS)
+    tick_profiler.request(default_profile_ticks, default_profile_mode)
+
+    # Serve the metrics on the local HTTP endpoint (Prometheus text format)
+    if default_metrics_port > 0:
+        metrics_port = MetricsServer(metrics).start()
+        print(f"Serving metrics on 'http://{default_metrics_host}:{metrics_port}/metrics'")
 
     # Create a MQTT client with new instance websockets
     print("Creating new client instance using websockets...")
@@ -1616,6 +1671,10 @@ def main():
     # Uncomment to enable debug messages
     #client.on_log = on_log
 
+    # Publish the metrics on the MQTT stats topic (if set)
+    if default_metrics_topic is not None:
+        MetricsPublisher(metrics, mqtt_client).start()
+
     # Connect with MQTT Broker
     print(f"Connecting to broker 'ws://{broker_host}:{broker_port}/mqtt'")
     mqtt_client.connect(broker_host, broker_port, broker_keepalive)  # Connect to the broker
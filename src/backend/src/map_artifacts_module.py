@@ -0,0 +1,226 @@
+# coding: utf-8
+"""
+
+## Map Artifacts Module
+- Compiled map artifacts: the filtered walls line segments of a map, their properties and the walls spatial index,
+  stored on a binary file (uncompressed ```.npz```), so the map does not need to be parsed again on each backend start.
+- Artifacts keyed by a hash of the map file and of the walls filters (and spatial index) config parameters,
+  so any change of the map or of its config invalidates the artifact.
+- MapArtifacts class (artifacts directory, memory-mapped at startup and compiled lazily on demand)
+
+The artifacts directory can be set with the environment variable ```BACKEND_MAP_ARTIFACTS_DIR```.
+
+The artifacts of a map can also be compiled ahead of time from its config file (from repository root):
+```python -m src.backend.src.map_artifacts_module src/static-files/config_files/config-params-library-ua-floor2.json```
+
+"""
+import os
+import sys
+import json
+import struct
+import hashlib
+import zipfile
+import argparse
+import threading
+import numpy as np
+
+# Default directory of the compiled map artifacts
+default_map_artifacts_dir = os.environ.get("BACKEND_MAP_ARTIFACTS_DIR",
+                                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "map_artifacts"))
+
+# Version of the artifacts layout and of the compiled walls (changing it invalidates all the stored artifacts)
+map_artifact_version = 2
+
+# Get the key of the compiled artifact of a map
+def map_artifact_key(map_data: bytes, map_config: dict) -> str:
+    """
+    Get the key of the compiled artifact of a map: hash of the map file and of the config parameters the artifact depends on
+    (walls filters keywords and levels, and walls spatial index).
+
+    Args:
+        map_data (bytes): The map file data (GeoJSON)
+        map_config (dict): The "map" section of the config file
+
+    Returns:
+        str: The artifact key (hexadecimal digest)
+    """
+    params = {
+        "version": map_artifact_version,
+        "filter_walls_keywords": map_config["filter_walls_keywords"],
+        "filter_walls_levels": map_config["filter_walls_levels"],
+        "walls_spatial_index": map_config.get("walls_spatial_index", {}),
+        "map_center": map_config.get("map_center"),
+    }
+    digest = hashlib.sha256(map_data)
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+# Save the arrays of a compiled map on an artifact file
+def save_map_artifact(path: str, arrays: dict):
+    """
+    Save the arrays of a compiled map on an uncompressed .npz file (written on a temporary file and then renamed,
+    so a concurrent load never sees a partial artifact).
+
+    Args:
+        path (str): Path of the artifact file
+        arrays (dict): Arrays of the compiled map (walls arrays, walls properties and walls spatial index)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temp_path, path)
+
+# Load the arrays of a compiled map from an artifact file (memory-mapped)
+def load_map_artifact(path: str) -> dict:
+    """
+    Load the arrays of a compiled map from an uncompressed .npz file. Each array is memory-mapped from the file
+    (read-only, so only the pages used are read from disk).
+
+    Args:
+        path (str): Path of the artifact file
+
+    Returns:
+        dict: Arrays of the compiled map
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as file:
+        for info in archive.infolist():
+            name = info.filename[:-len(".npy")]
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+
+            # skip the zip local header of the member to get to the .npy data
+            file.seek(info.header_offset)
+            local_header = file.read(30)
+            name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+
+            if dtype.hasobject or int(np.prod(shape)) == 0:
+                arrays[name] = np.load(archive.open(info))
+            else:
+                arrays[name] = np.memmap(file.name, dtype=dtype, mode="r", offset=file.tell(), shape=shape,
+                                         order="F" if fortran_order else "C")
+    return arrays
+
+class MapArtifacts:
+    """
+    Compiled map artifacts of a directory, by key. The stored artifacts are memory-mapped at startup,
+    and the missing ones are compiled (and stored) on the first request.
+    """
+    def __init__(self, artifacts_dir: str = default_map_artifacts_dir):
+        """
+        Initialize the MapArtifacts class object (memory-maps the artifacts stored on the directory).
+
+        Args:
+            self: MapArtifacts object itself
+            artifacts_dir (str): Directory of the artifacts files
+        """
+        self.artifacts_dir = os.path.abspath(artifacts_dir)
+        self.artifacts = {}
+        self.lock = threading.Lock()
+
+        if os.path.isdir(self.artifacts_dir):
+            for file_name in sorted(os.listdir(self.artifacts_dir)):
+                if file_name.endswith(".npz"):
+                    try:
+                        self.artifacts[file_name[:-len(".npz")]] = load_map_artifact(os.path.join(self.artifacts_dir, file_name))
+                    except (OSError, ValueError, zipfile.BadZipFile) as error:
+                        print(f"Skipping invalid map artifact '{file_name}': {error}")
+
+    def get_path(self, key: str) -> str:
+        """
+        Get the path of the artifact file of a key.
+
+        Args:
+            self: MapArtifacts object itself
+            key (str): The artifact key (from map_artifact_key)
+
+        Returns:
+            str: Path of the artifact file
+        """
+        return os.path.join(self.artifacts_dir, f"{key}.npz")
+
+    def has_artifact(self, key: str) -> bool:
+        """
+        Check if the artifact of a key is loaded.
+
+        Args:
+            self: MapArtifacts object itself
+            key (str): The artifact key
+
+        Returns:
+            bool: Result of the artifact is or not loaded
+        """
+        return key in self.artifacts
+
+    def get(self, key: str, compile_function: object) -> dict:
+        """
+        Get the arrays of the artifact of a key (loaded from its file, or compiled and stored if there is no artifact yet).
+
+        Args:
+            self: MapArtifacts object itself
+            key (str): The artifact key (from map_artifact_key)
+            compile_function (object): Function (without arguments) that compiles the arrays of the map
+
+        Returns:
+            dict: Arrays of the compiled map
+        """
+        with self.lock:
+            if key in self.artifacts:
+                return self.artifacts[key]
+
+            path = self.get_path(key)
+            if not os.path.isfile(path):
+                save_map_artifact(path, compile_function())
+            self.artifacts[key] = load_map_artifact(path)
+            return self.artifacts[key]
+
+# Encode a JSON serializable value as an array (e.g. the walls properties, stored on the artifacts)
+def json_to_array(value: object) -> np.ndarray:
+    return np.frombuffer(json.dumps(value).encode("utf-8"), dtype=np.uint8)
+
+# Decode a JSON serializable value encoded by json_to_array
+def array_to_json(array: np.ndarray) -> object:
+    return json.loads(np.asarray(array, dtype=np.uint8).tobytes().decode("utf-8"))
+
+# Compile the artifacts of the maps of the config files (command line)
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description="Compile the map artifacts of the config files")
+    parser.add_argument("config_files", nargs="+", help="config files of the maps (the map_url is resolved from the static-files directory)")
+    parser.add_argument("--output-dir", default=default_map_artifacts_dir, help="directory of the map artifacts")
+    parser.add_argument("--force", action="store_true", help="compile again the artifacts already stored")
+    args = parser.parse_args(args)
+
+    # the walls of a map are compiled by the backend agent functions
+    from src.backend.src.main_agent_module import compile_map_walls
+
+    map_artifacts = MapArtifacts(args.output_dir)
+    for config_file in args.config_files:
+        with open(config_file) as file:
+            config_json = json.load(file)
+
+        # map_url is relative to the static-files directory (e.g. "../static-files/geojson_objs/...")
+        static_files_dir = os.path.dirname(os.path.dirname(os.path.abspath(config_file)))
+        map_path = os.path.normpath(os.path.join(static_files_dir, config_json["map"]["map_url"]))
+        with open(map_path, "rb") as file:
+            map_data = file.read()
+
+        key = map_artifact_key(map_data, config_json["map"])
+        path = map_artifacts.get_path(key)
+        if args.force and os.path.isfile(path):
+            os.remove(path)
+            map_artifacts.artifacts.pop(key, None)
+
+        arrays = map_artifacts.get(key, lambda: compile_map_walls(map_data, config_json["map"]))
+        print(f"{config_file}: {len(arrays['walls_array'])} walls -> {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
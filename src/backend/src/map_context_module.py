@@ -0,0 +1,129 @@
+# coding: utf-8
+"""
+
+## Map Context Module
+- MapContext class (compiled data of a map: config, walls arrays and spatial index, fitted experimental dataset tables)
+- MapContexts class (map contexts built once by map id and shared by reference by all the sessions of the map)
+- Optional position quantization of the asset points cache keys, set on the "map" section of the config file, e.g.:
+```"position_quantization": {"enabled": true, "tolerance": 0.5}```
+where tolerance is the size (in meters) of the cells: the asset points of the same cell share the cached wall intersections
+and lobes visibility (their distances are measured from the exact positions), with a position error of at most the cell
+diagonal.
+
+A map context is immutable after its build (its arrays are read-only), so it can be used concurrently by any amount
+of sessions; the builds of different maps run concurrently, and each map is only built once.
+
+"""
+import math
+import threading
+import numpy as np
+from src.backend.src.geometry_module import quantization_steps
+
+# Default size (in meters) of the position quantization cells
+default_quantization_tolerance = 0.5
+
+class MapContext:
+    """
+    Compiled data of a map, shared by all the sessions of the map (read-only).
+    """
+    def __init__(self, map_id: int, config_json: dict, walls_array: np.ndarray, walls_groups: np.ndarray, walls_index: object,
+                 activations_model: object, experimental_tables: dict, walls_properties: list = None):
+        """
+        Initialize the MapContext class object.
+
+        Args:
+            self: MapContext object itself
+            map_id (int): The map id
+            config_json (dict): The config file of the map
+            walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+            walls_groups (np.ndarray): Array of shape (N,) with the map feature index of each wall
+            walls_index (object): Walls spatial index of the map
+            activations_model (object): Activations model fitted on the experimental Antenna RF dataset
+            experimental_tables (dict): Experimental Antenna RF dataset tables (distances, values and standard deviations means)
+            walls_properties (list): Properties of the map feature (polygon) of each walls group
+        """
+        self.map_id = map_id
+        self.config_json = config_json
+        self.map_center = tuple(config_json["map"]["map_center"])
+        self.features_type = config_json["features"]
+        self.walls_array = _read_only(walls_array)
+        self.walls_groups = _read_only(walls_groups)
+        self.walls_properties = walls_properties
+        self.walls_index = walls_index
+        self.activations_model = activations_model
+        self.antenna_experimental_distances = _read_only(experimental_tables["antenna_experimental_distances"])
+        self.antenna_experimental_values = _read_only(experimental_tables["antenna_experimental_values"])
+        self.stdev_mean_dict = experimental_tables["stdev_mean_dict"]
+
+        # position quantization of the asset points cache keys (None steps if disabled), and its position error bound in meters
+        quantization_params = config_json["map"].get("position_quantization", {})
+        self.quantization_tolerance = None
+        self.quantization_steps = None
+        self.quantization_error_bound = 0.0
+        if quantization_params.get("enabled", False):
+            self.quantization_tolerance = float(quantization_params.get("tolerance", default_quantization_tolerance))
+            self.quantization_steps = quantization_steps(self.quantization_tolerance, self.map_center[1])
+            self.quantization_error_bound = self.quantization_tolerance * math.sqrt(2)
+
+class MapContexts:
+    """
+    Map contexts by map id, built on the first request of each map (by the builder function) and then shared.
+    """
+    def __init__(self, builder: object):
+        """
+        Initialize the MapContexts class object.
+
+        Args:
+            self: MapContexts object itself
+            builder (object): Function that builds the MapContext of a map id
+        """
+        self.builder = builder
+        self.contexts = {}
+        self.build_locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, map_id: int) -> MapContext:
+        """
+        Get the context of a map (built on the first call by map id, the concurrent calls of the same map wait for it).
+
+        Args:
+            self: MapContexts object itself
+            map_id (int): The map id
+
+        Returns:
+            MapContext: The context of the map
+        """
+        with self.lock:
+            if map_id in self.contexts:
+                return self.contexts[map_id]
+            build_lock = self.build_locks.setdefault(map_id, threading.Lock())
+
+        with build_lock:
+            with self.lock:
+                if map_id in self.contexts:
+                    return self.contexts[map_id]
+
+            map_context = self.builder(map_id)
+
+            with self.lock:
+                self.contexts[map_id] = map_context
+            return map_context
+
+    def has_map(self, map_id: int) -> bool:
+        """
+        Check if the context of a map is already built.
+
+        Args:
+            self: MapContexts object itself
+            map_id (int): The map id
+
+        Returns:
+            bool: Result of the map context is or not built
+        """
+        return map_id in self.contexts
+
+# Set an array as read-only (shared by the sessions)
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array = np.asarray(array)
+    array.flags.writeable = False
+    return array
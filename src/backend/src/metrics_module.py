@@ -0,0 +1,379 @@
+# coding: utf-8
+"""
+
+## Metrics Module
+- Histogram class (cumulative buckets, count and sum of the observed values, e.g. the time of the calculate stages)
+- Metrics class (registry of counters, histograms and gauges, by name and labels, rendered in the Prometheus text format)
+- MetricsServer class (local HTTP endpoint of the metrics, ```/metrics```)
+- MetricsPublisher class (periodic publication of the metrics snapshot on an MQTT stats topic)
+
+The gauges are functions evaluated on each scrape (e.g. the queue depth of the session scheduler or the calculate cache size).
+The HTTP endpoint is set with the environment variables ```BACKEND_METRICS_HOST``` and ```BACKEND_METRICS_PORT``` (0 to disable it),
+and the MQTT stats topic with ```BACKEND_METRICS_TOPIC``` (disabled if not set) and ```BACKEND_METRICS_INTERVAL``` (in seconds).
+
+"""
+import os
+import json
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default host and port of the metrics HTTP endpoint (port 0 disables the endpoint; the docker-compose backend
+# service binds it on 0.0.0.0 and publishes the port, so the endpoint can be scraped from outside the container)
+default_metrics_host = os.environ.get("BACKEND_METRICS_HOST", "127.0.0.1")
+default_metrics_port = int(os.environ.get("BACKEND_METRICS_PORT", 9464))
+
+# Default MQTT stats topic of the metrics (None disables the publication) and its interval (in seconds)
+default_metrics_topic = os.environ.get("BACKEND_METRICS_TOPIC") or None
+default_metrics_interval = float(os.environ.get("BACKEND_METRICS_INTERVAL", 10))
+
+# Default upper bounds of the histogram buckets (in seconds, from 0.1 ms to 10 s)
+default_histogram_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus name prefix of the backend metrics
+metrics_prefix = "backend_"
+
+class Histogram:
+    """
+    Histogram of observed values (counts by bucket upper bound, count and sum).
+    """
+    def __init__(self, buckets: tuple = default_histogram_buckets):
+        """
+        Initialize the Histogram class object.
+
+        Args:
+            self: Histogram object itself
+            buckets (tuple): Upper bounds of the buckets (sorted, the +Inf bucket is implicit)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Observe a value (counted on the first bucket with an upper bound greater or equal to it).
+
+        Args:
+            self: Histogram object itself
+            value (float): The observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> list:
+        """
+        Get the cumulative counts of the buckets (as the Prometheus "le" buckets, the last one is +Inf).
+
+        Args:
+            self: Histogram object itself
+
+        Returns:
+            list: Cumulative count of each bucket
+        """
+        counts, total = [], 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile of the observed values (upper bound of the bucket of the quantile).
+
+        Args:
+            self: Histogram object itself
+            q (float): The quantile (0 to 1)
+
+        Returns:
+            float: Upper bound of the bucket of the quantile (the last bucket bound for the +Inf bucket, 0 if no observations)
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        for index, total in enumerate(self.cumulative_counts()):
+            if total >= rank:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+# Labels of a metric as a sorted tuple of (name, value) pairs
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+# Labels of a metric in the Prometheus text format
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+# Label value escaped as in the Prometheus text format (backslash, double-quote and line feed)
+def _escape_label_value(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    """
+    Registry of the backend metrics: counters and histograms by name and labels, and gauges (functions evaluated on each read).
+    """
+    def __init__(self, buckets: tuple = default_histogram_buckets):
+        """
+        Initialize the Metrics class object.
+
+        Args:
+            self: Metrics object itself
+            buckets (tuple): Upper bounds of the buckets of the histograms
+        """
+        self.buckets = buckets
+        self.helps = {}
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str):
+        """
+        Set the help text of a metric.
+
+        Args:
+            self: Metrics object itself
+            name (str): The metric name (without the backend prefix)
+            help_text (str): The help text of the metric
+        """
+        self.helps[name] = help_text
+
+    def inc(self, name: str, amount: float = 1, **labels: object):
+        """
+        Increment a counter.
+
+        Args:
+            self: Metrics object itself
+            name (str): The counter name (without the backend prefix)
+            amount (float): The increment
+            labels (object): The labels of the counter
+        """
+        with self.lock:
+            counters = self.counters.setdefault(name, {})
+            key = _labels_key(labels)
+            counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: object):
+        """
+        Observe a value on a histogram (e.g. a time in seconds).
+
+        Args:
+            self: Metrics object itself
+            name (str): The histogram name (without the backend prefix)
+            value (float): The observed value
+            labels (object): The labels of the histogram
+        """
+        with self.lock:
+            histograms = self.histograms.setdefault(name, {})
+            key = _labels_key(labels)
+            if key not in histograms:
+                histograms[key] = Histogram(self.buckets)
+            histograms[key].observe(value)
+
+    def set_gauge(self, name: str, function: object, help_text: str = None, kind: str = "gauge"):
+        """
+        Set a gauge read from a function on each read of the metrics (e.g. the queue depth of the scheduler).
+
+        Args:
+            self: Metrics object itself
+            name (str): The gauge name (without the backend prefix)
+            function (object): Function that gets the current value of the gauge
+            help_text (str): The help text of the gauge
+            kind (str): The Prometheus type of the value ("gauge", or "counter" for totals kept by other objects)
+        """
+        self.gauges[name] = (function, kind)
+        if help_text is not None:
+            self.helps[name] = help_text
+
+    def _read_gauges(self) -> dict:
+        values = {}
+        for name, (function, kind) in list(self.gauges.items()):
+            try:
+                values[name] = (float(function()), kind)
+            except Exception:
+                # gauge not available (e.g. before the first session)
+                continue
+        return values
+
+    def render(self) -> str:
+        """
+        Render the metrics in the Prometheus text format (version 0.0.4).
+
+        Args:
+            self: Metrics object itself
+
+        Returns:
+            str: The metrics in the Prometheus text format
+        """
+        lines = []
+        gauges = self._read_gauges()
+        with self.lock:
+            for name, counters in sorted(self.counters.items()):
+                self._header(lines, name, "counter")
+                for labels, value in sorted(counters.items()):
+                    lines.append(f"{metrics_prefix}{name}{_format_labels(labels)} {value}")
+            for name, histograms in sorted(self.histograms.items()):
+                self._header(lines, name, "histogram")
+                for labels, histogram in sorted(histograms.items()):
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.cumulative_counts()):
+                        lines.append(f"{metrics_prefix}{name}_bucket{_format_labels(labels, (('le', bound),))} {count}")
+                    lines.append(f"{metrics_prefix}{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{metrics_prefix}{name}_count{_format_labels(labels)} {histogram.count}")
+        for name, (value, kind) in sorted(gauges.items()):
+            self._header(lines, name, kind)
+            lines.append(f"{metrics_prefix}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: list, name: str, kind: str):
+        if name in self.helps:
+            lines.append(f"# HELP {metrics_prefix}{name} {self.helps[name]}")
+        lines.append(f"# TYPE {metrics_prefix}{name} {kind}")
+
+    def get_snapshot(self) -> dict:
+        """
+        Get a snapshot of the metrics (e.g. to publish on the MQTT stats topic): the counters and gauges values,
+        and the count, mean and estimated p50 / p90 / p99 (in the histogram units) of the histograms.
+
+        Args:
+            self: Metrics object itself
+
+        Returns:
+            dict: The "counters", "histograms" and "gauges" values (the labels joined as "name=value" strings)
+        """
+        gauges = self._read_gauges()
+        with self.lock:
+            counters = {name: {",".join(f"{label}={value}" for label, value in labels): amount for labels, amount in values.items()}
+                        for name, values in self.counters.items()}
+            histograms = {name: {",".join(f"{label}={value}" for label, value in labels): {
+                                     "count": histogram.count, "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                                     "p50": histogram.quantile(0.5), "p90": histogram.quantile(0.9), "p99": histogram.quantile(0.99)}
+                                 for labels, histogram in values.items()}
+                          for name, values in self.histograms.items()}
+        return {"counters": counters, "histograms": histograms, "gauges": {name: value for name, (value, kind) in gauges.items()}}
+
+class MetricsServer:
+    """
+    Local HTTP endpoint of the metrics (Prometheus text format on ```/metrics```), served by a daemon thread.
+    """
+    def __init__(self, metrics: Metrics, host: str = default_metrics_host, port: int = default_metrics_port):
+        """
+        Initialize the MetricsServer class object.
+
+        Args:
+            self: MetricsServer object itself
+            metrics (Metrics): The metrics to serve
+            host (str): The host of the endpoint
+            port (int): The port of the endpoint (0 for a free port)
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self) -> int:
+        """
+        Start serving the metrics.
+
+        Args:
+            self: MetricsServer object itself
+
+        Returns:
+            int: The port of the endpoint
+        """
+        metrics = self.metrics
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        """
+        Stop serving the metrics.
+
+        Args:
+            self: MetricsServer object itself
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+class MetricsPublisher:
+    """
+    Periodic publication of the metrics snapshot (JSON) on an MQTT stats topic, by a daemon thread.
+    """
+    def __init__(self, metrics: Metrics, client: object, topic: str = default_metrics_topic, interval: float = default_metrics_interval):
+        """
+        Initialize the MetricsPublisher class object.
+
+        Args:
+            self: MetricsPublisher object itself
+            metrics (Metrics): The metrics to publish
+            client (object): The MQTT client (with a publish(topic, payload) method)
+            topic (str): The MQTT stats topic
+            interval (float): Interval between the publications (in seconds)
+        """
+        self.metrics = metrics
+        self.client = client
+        self.topic = topic
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Start the periodic publications.
+
+        Args:
+            self: MetricsPublisher object itself
+        """
+        self.thread = threading.Thread(target=self._run, name="metrics-publisher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the periodic publications.
+
+        Args:
+            self: MetricsPublisher object itself
+        """
+        self.stopped.set()
+
+    def publish(self):
+        """
+        Publish the metrics snapshot on the stats topic.
+
+        Args:
+            self: MetricsPublisher object itself
+        """
+        self.client.publish(self.topic, json.dumps(self.metrics.get_snapshot()))
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.publish()
+            except Exception as error:
+                print("Exception occurred on the metrics publication:", repr(error))
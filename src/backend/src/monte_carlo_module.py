@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+
+## Monte Carlo Module
+- Parallel Monte-Carlo dataset generation: the (trajectory, RSSI path loss parameters, seed) combinations of a map config file
+  are sharded across a process pool, each shard is a headless batch simulation (```batch_simulation_module```) of one
+  asset point on one animation.
+- Each worker process loads the scene and builds the map context (compiled map) once, and keeps one session by animation,
+  so the geometry of the trajectories is calculated once by worker and the shards only draw the noise realizations.
+- The shards are merged (in the order of the combinations, whatever the amount of processes) into a single columnar file
+  (```.npz```, one array by column, or ```.csv```) with the provenance columns of each row.
+- Starting a worker process costs about the time of a few shards (interpreter, imports and map context), so by default
+  the pool has at most one process by CPU and by ```default_min_shards_by_process``` shards, and a single process runs
+  the shards on the calling process (no worker start-up).
+
+The noise of a shard is drawn from its own seed (and the session of its animation), so the rows of each combination
+are the same whichever the worker process that runs it.
+
+Usage (from repository root), e.g.:
+```python -m src.backend.src.monte_carlo_module src/static-files/config_files/config-params-library-ua-floor2.json --animations 1 2 --ple 2.2 2.4 --seeds 50 --processes 8```
+
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from src.backend.src.batch_simulation_module import load_scene, dataset_header, prepare_agent, open_session, simulation_rows
+
+# Provenance columns of the rows (combination of the shard and step of the animation)
+provenance_columns = ["animation", "tx", "ple", "cf", "skew", "seed", "step"]
+
+# Minimum amount of shards by worker process of the default pool (a worker start-up costs about the time of 2 to 3 shards)
+default_min_shards_by_process = 4
+
+# Worker process state: (main agent module, map id, scenes by animation)
+_worker = None
+
+# Worker process initializer: the shards are already parallel (the wall intersections of each worker run on its own process)
+def _init_worker(config_file: str, animations: list):
+    os.environ["BACKEND_NUM_CORES"] = "1"
+    _load_worker(config_file, animations)
+
+# Load the scenes of the animations and build the map context once (on a worker process, or on the calling process)
+def _load_worker(config_file: str, animations: list):
+    global _worker
+    scenes = {animation: load_scene(config_file, [animation]) for animation in animations}
+    agent, map_id = prepare_agent(scenes[animations[0]])
+    for animation, scene in scenes.items():
+        open_session(agent, scene, map_id, f"monte-carlo-anim{animation}")
+    _worker = (agent, map_id, scenes)
+
+# Worker process task: simulate a shard (one combination) and return its rows (with the provenance columns)
+def _simulate_shard(shard: dict) -> np.ndarray:
+    from src.backend.src.noise_module import NoiseGenerators
+
+    agent, map_id, scenes = _worker
+    animation, rssi_params = shard["animation"], shard["rssi_params"]
+    scene = dict(scenes[animation], rssi_params=rssi_params)
+    session_uuid = f"monte-carlo-anim{animation}"
+    agent.noise_generators = NoiseGenerators(shard["seed"])
+    agent.god.setRssiParams(rssi_params, session_uuid)
+
+    provenance = [animation, rssi_params["tx"], rssi_params["ple(n)"], rssi_params["cf"], rssi_params["skew"], shard["seed"]]
+    rows = []
+    for step, step_rows in enumerate(simulation_rows(agent, scene, shard["features"], session_uuid)):
+        if step >= shard["steps"]:
+            break
+        rows += [provenance + [step] + row for row in step_rows]
+    return np.array(rows, dtype=float)
+
+def make_shards(scene: dict, features: str, animations: list, rssi_params_sets: list, seeds: list, steps: int = None) -> list:
+    """
+    Make the shards of the Monte-Carlo generation: one by (animation, RSSI path loss parameters, seed) combination.
+
+    Args:
+        scene (dict): The scene of the config file with all the animations (from load_scene)
+        features (str): The features of the dataset ("rssi" or "activations")
+        animations (list): Numbers (1 to K) of the asset point animations
+        rssi_params_sets (list): The RSSI path loss parameters sets (dicts with tx, ple(n), cf, skew, d0 and af)
+        seeds (list): The seeds of the noise realizations
+        steps (int): Amount of steps of each shard (None for one lap of the animation)
+
+    Returns:
+        list: The shards (dicts with animation, rssi_params, seed, features and steps)
+    """
+    laps = {animation: len(trajectory) for animation, trajectory in zip(scene["animations"], scene["trajectories"])}
+    return [{"animation": animation, "rssi_params": rssi_params, "seed": seed, "features": features, "steps": steps or laps[animation]}
+            for animation, rssi_params, seed in itertools.product(animations, rssi_params_sets, seeds)]
+
+def worker_processes(nr_shards: int, processes: int = None) -> int:
+    """
+    Get the amount of worker processes of a generation.
+
+    Args:
+        nr_shards (int): Amount of shards to simulate
+        processes (int): Amount of worker processes (None for one by CPU, with at least default_min_shards_by_process shards each)
+
+    Returns:
+        int: The amount of worker processes (1 to run the shards on the calling process)
+    """
+    if processes is None:
+        processes = min(os.cpu_count() or 1, nr_shards // default_min_shards_by_process)
+    return max(1, min(processes, nr_shards))
+
+def generate(config_file: str, shards: list, processes: int = None) -> np.ndarray:
+    """
+    Simulate the shards across a process pool and merge their rows (in the order of the shards).
+    With a single process, the shards are simulated on the calling process.
+
+    Args:
+        config_file (str): Path of the config file (in the config_files directory of the static-files)
+        shards (list): The shards to simulate (from make_shards)
+        processes (int): Amount of worker processes (None for the default pool size, see worker_processes)
+
+    Returns:
+        np.ndarray: The rows of all the shards (provenance columns, then the dataset columns)
+    """
+    global _worker
+    animations = sorted({shard["animation"] for shard in shards})
+    processes = worker_processes(len(shards), processes)
+    if processes == 1:
+        _load_worker(config_file, animations)
+        try:
+            return np.concatenate([_simulate_shard(shard) for shard in shards])
+        finally:
+            _worker = None
+
+    # each worker takes the shards in chunks (a few chunks by worker, to balance the shards of different lengths)
+    chunksize = max(1, len(shards) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(config_file, animations)) as executor:
+        return np.concatenate(list(executor.map(_simulate_shard, shards, chunksize=chunksize)))
+
+def write_columns(output_file: str, header: list, rows: np.ndarray):
+    """
+    Write the merged rows into a single columnar file: ```.npz``` (one array by column, named by the header) or ```.csv```.
+
+    Args:
+        output_file (str): Path of the output file
+        header (list): Names of the columns
+        rows (np.ndarray): The rows (one column by name of the header)
+    """
+    if output_file.endswith(".csv"):
+        with open(output_file, 'w', encoding='UTF8', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file, lineterminator='\n')
+            csv_writer.writerow(header)
+            csv_writer.writerows(rows.tolist())
+    else:
+        np.savez_compressed(output_file, **{column: rows[:, index] for index, column in enumerate(header)})
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description="Generate a Monte-Carlo dataset of a map config file across a process pool "
+                                                 "(animations x RSSI path loss parameters x seeds)")
+    parser.add_argument("config_file", help="config file of the map (in the config_files directory of the static-files)")
+    parser.add_argument("--features", choices=("rssi", "activations"), default="rssi", help="features of the dataset")
+    parser.add_argument("--animations", type=int, nargs="+", help="numbers of the asset point animations (default: all)")
+    parser.add_argument("--seeds", type=int, default=10, help="amount of noise realizations (seeds) of each animation and parameters")
+    parser.add_argument("--first-seed", type=int, default=0, help="first seed of the noise realizations")
+    parser.add_argument("--tx", type=float, nargs="+", help="transmission powers (dBm) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--ple", type=float, nargs="+", help="path loss expoents (n) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--cf", type=float, nargs="+", help="constants of fading (Xσ) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--skew", type=float, nargs="+", help="skew indexes (σ) of the RSSI path loss model (default: config file)")
+    parser.add_argument("--steps", type=int, help="steps of each shard (default: one lap of the animation)")
+    parser.add_argument("--processes", type=int, help="amount of worker processes (default: one by CPU, with at least 4 shards each)")
+    parser.add_argument("--output-dir", default=".", help="directory of the dataset file")
+    parser.add_argument("--output", help="path of the dataset file, .npz (columnar) or .csv (default: .npz on output-dir)")
+    args = parser.parse_args(args)
+
+    scene = load_scene(args.config_file, args.animations)
+    default_params = scene["rssi_params"]
+    rssi_params_sets = [dict(default_params, **{"tx": tx, "ple(n)": ple, "cf": cf, "skew": skew}) for tx, ple, cf, skew in itertools.product(
+        args.tx or [default_params["tx"]], args.ple or [default_params["ple(n)"]], args.cf or [default_params["cf"]], args.skew or [default_params["skew"]])]
+    shards = make_shards(scene, args.features, scene["animations"], rssi_params_sets, list(range(args.first_seed, args.first_seed + args.seeds)), args.steps)
+    output_file = args.output or os.path.join(args.output_dir, f"monte_carlo_{args.features}_{datetime.now().strftime('%d-%m-%Y_%H%M%S')}"
+                                                               f"_Ant#{len(scene['antennas'])}_Shards#{len(shards)}.npz")
+
+    t_start = time.perf_counter()
+    rows = generate(args.config_file, shards, args.processes)
+    header = provenance_columns + dataset_header(dict(scene, asset_points=scene["asset_points"][:1]), args.features)
+    write_columns(output_file, header, rows)
+    t_total = time.perf_counter() - t_start
+    print(f"{output_file}: {len(rows)} rows ({len(shards)} shards) in {t_total:.1f} s ({len(rows) / t_total:.0f} rows/s)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
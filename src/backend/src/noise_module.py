@@ -0,0 +1,121 @@
+# coding: utf-8
+"""
+
+## Noise Module
+- NoiseGenerator class (vectorized skewed gaussian noise of the RSSI measurements, from a NumPy random Generator)
+- Noise generators by session, with an optional fixed seed
+
+The skewed gaussian distribution is the same of ```random_gaussian_dist``` (main agent module): a standard gaussian
+sample scaled to ```z / 10 + 0.5```, resampled when out of [0, 1], raised to the skew index and stretched to [min, max].
+
+A fixed seed can be set with the environment variable ```BACKEND_NOISE_SEED```, so the runs are reproducible
+(each session gets its own stream, derived from the seed and the session uuid).
+
+"""
+import os
+import zlib
+import threading
+import numpy as np
+
+# Fixed seed of the noise generators (None for a random seed by session)
+default_noise_seed = int(os.environ["BACKEND_NOISE_SEED"]) if os.environ.get("BACKEND_NOISE_SEED") else None
+
+class NoiseGenerator:
+    """
+    Vectorized noise samples of the RSSI measurements (and of the antennas activations) from a NumPy random Generator.
+    """
+    def __init__(self, seed: object = None):
+        """
+        Initialize the NoiseGenerator class object.
+
+        Args:
+            self: NoiseGenerator object itself
+            seed (object): Seed of the random Generator (int, sequence of ints, or None for a random seed)
+        """
+        self.rng = np.random.default_rng(seed)
+
+    def skewed_gaussian(self, min: float, max: float, skew: float, size: int) -> np.ndarray:
+        """
+        Draw samples of the skewed gaussian distribution (same distribution of random_gaussian_dist) in one call.
+
+        Args:
+            self: NoiseGenerator object itself
+            min (float): minimum value of Gaussian Distribuition
+            max (float): maximum value of Gaussian Distribuition
+            skew (float): skew index value of Gaussian Distribuition
+            size (int): Amount of samples
+
+        Returns:
+            np.ndarray: Array of shape (size,) with the noise samples
+        """
+        num = self.rng.standard_normal(size) / 10.0 + 0.5  # Translate to 0 -> 1
+
+        # resample between 0 and 1 if out of range
+        out_of_range = (num > 1) | (num < 0)
+        while np.any(out_of_range):
+            num[out_of_range] = self.rng.standard_normal(int(np.count_nonzero(out_of_range))) / 10.0 + 0.5
+            out_of_range = (num > 1) | (num < 0)
+
+        num = np.power(num, skew)  # Skew
+        num *= max - min  # Stretch to fill range
+        num += min  # Offset to min
+        return num
+
+    def normal(self, loc: object, scale: object) -> np.ndarray:
+        """
+        Draw samples of a gaussian distribution (numpy normal), e.g. the noise of the antennas activations.
+
+        Args:
+            self: NoiseGenerator object itself
+            loc (object): Mean of the distribution (float or array)
+            scale (object): Standard deviation of the distribution (float or array)
+
+        Returns:
+            np.ndarray: The noise samples, with the broadcasted shape of loc and scale
+        """
+        return self.rng.normal(loc, scale)
+
+class NoiseGenerators:
+    """
+    Noise generators by session (each session has its own random stream).
+    """
+    def __init__(self, seed: int = default_noise_seed):
+        """
+        Initialize the NoiseGenerators class object.
+
+        Args:
+            self: NoiseGenerators object itself
+            seed (int): Fixed seed of the sessions streams (None for a random seed by session)
+        """
+        self.seed = seed
+        self.generators = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_uuid: str) -> NoiseGenerator:
+        """
+        Get the noise generator of a session (created on the first call).
+
+        Args:
+            self: NoiseGenerators object itself
+            session_uuid (str): The session uuid
+
+        Returns:
+            NoiseGenerator: The noise generator of the session
+        """
+        with self.lock:
+            if session_uuid not in self.generators:
+                # stream of the session derived from the fixed seed and the session uuid
+                seed = None if self.seed is None else [self.seed, zlib.crc32(session_uuid.encode("utf-8"))]
+                self.generators[session_uuid] = NoiseGenerator(seed)
+            return self.generators[session_uuid]
+
+    def remove(self, session_uuid: str):
+        """
+        Remove the noise generator of a session (e.g. on the session close).
+
+        Args:
+            self: NoiseGenerators object itself
+            session_uuid (str): The session uuid
+        """
+        with self.lock:
+            self.generators.pop(session_uuid, None)
@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+
+## Pacing Module
+- PacingEngine class (heap of the next due times of the sessions, so each session is fired at its own cadence)
+- The due times are aligned to the engine resolution, so the sessions due at the same instant are fired together (in one batch).
+- Per session jitter (delay of each fire after its due time) and missed deadlines (fires delayed by a whole interval or more).
+
+The resolution of the due times can be set with the environment variable ```BACKEND_PACING_RESOLUTION``` (in seconds).
+
+"""
+import os
+import math
+import heapq
+
+# Default resolution of the due times (in seconds)
+default_pacing_resolution = float(os.environ.get("BACKEND_PACING_RESOLUTION", 0.001))
+
+class PacingEngine:
+    """
+    Next due times of the sessions (heap), fired in batches of the sessions due at the same instant.
+    Not thread-safe (used under the lock of its scheduler).
+    """
+    def __init__(self, resolution: float = default_pacing_resolution):
+        """
+        Initialize the PacingEngine class object.
+
+        Args:
+            self: PacingEngine object itself
+            resolution (float): Resolution of the due times (in seconds)
+        """
+        self.resolution = resolution
+        self.heap = []
+        self.due_times = {}
+        self.sequence = 0
+        self.session_stats = {}
+        self.batches = 0
+        self.fired = 0
+
+    def align(self, due_time: float) -> float:
+        """
+        Align a due time to the engine resolution (rounded up).
+
+        Args:
+            self: PacingEngine object itself
+            due_time (float): The due time (in seconds)
+
+        Returns:
+            float: The aligned due time
+        """
+        if self.resolution <= 0:
+            return due_time
+        return math.ceil(due_time / self.resolution - 1e-9) * self.resolution
+
+    def schedule(self, session_uuid: str, due_time: float):
+        """
+        Schedule the next fire of a session (replaces its scheduled fire, if any).
+
+        Args:
+            self: PacingEngine object itself
+            session_uuid (str): The session uuid
+            due_time (float): The due time of the fire (in seconds)
+        """
+        due_time = self.align(due_time)
+        self.due_times[session_uuid] = due_time
+        self.sequence += 1
+        heapq.heappush(self.heap, (due_time, self.sequence, session_uuid))
+
+    def cancel(self, session_uuid: str):
+        """
+        Cancel the scheduled fire of a session (its heap entry is dropped when it gets to the top).
+
+        Args:
+            self: PacingEngine object itself
+            session_uuid (str): The session uuid
+        """
+        self.due_times.pop(session_uuid, None)
+
+    def is_scheduled(self, session_uuid: str) -> bool:
+        """
+        Check if a session has a scheduled fire.
+
+        Args:
+            self: PacingEngine object itself
+            session_uuid (str): The session uuid
+
+        Returns:
+            bool: Result of the session is or not scheduled
+        """
+        return session_uuid in self.due_times
+
+    def _drop_cancelled(self):
+        # drop the heap entries replaced or cancelled
+        while self.heap and self.due_times.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def next_due_time(self) -> float:
+        """
+        Get the earliest due time of the scheduled sessions.
+
+        Args:
+            self: PacingEngine object itself
+
+        Returns:
+            float: The earliest due time (or None, if there are no scheduled sessions)
+        """
+        self._drop_cancelled()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: float) -> list:
+        """
+        Get the batch of the sessions due (the due time of the earliest one, and of the others due until now).
+
+        Args:
+            self: PacingEngine object itself
+            now (float): The current time (in seconds)
+
+        Returns:
+            list: List of (session uuid, due time) of the sessions due, ordered by due time
+        """
+        batch = []
+        self._drop_cancelled()
+        while self.heap and self.heap[0][0] <= now:
+            due_time, _, session_uuid = heapq.heappop(self.heap)
+            del self.due_times[session_uuid]
+            batch.append((session_uuid, due_time))
+            self._drop_cancelled()
+
+        if batch:
+            self.batches += 1
+            self.fired += len(batch)
+        return batch
+
+    def record_fire(self, session_uuid: str, due_time: float, fired_time: float, interval: float) -> bool:
+        """
+        Record the jitter of a session fire (and if its deadline was missed).
+
+        Args:
+            self: PacingEngine object itself
+            session_uuid (str): The session uuid
+            due_time (float): The due time of the fire (in seconds)
+            fired_time (float): The time the session was fired (in seconds)
+            interval (float): The pacing interval of the session (in seconds)
+
+        Returns:
+            bool: Result of the deadline was or not missed (fired after the next due time)
+        """
+        jitter = max(0.0, fired_time - due_time)
+        missed = interval > 0 and jitter >= interval
+
+        stats = self.session_stats.setdefault(session_uuid, {"fires": 0, "jitter_sum": 0.0, "jitter_max": 0.0, "missed": 0})
+        stats["fires"] += 1
+        stats["jitter_sum"] += jitter
+        stats["jitter_max"] = max(stats["jitter_max"], jitter)
+        stats["missed"] += missed
+        return missed
+
+    def remove_session(self, session_uuid: str):
+        """
+        Remove the scheduled fire and the stats of a session.
+
+        Args:
+            self: PacingEngine object itself
+            session_uuid (str): The session uuid
+        """
+        self.cancel(session_uuid)
+        self.session_stats.pop(session_uuid, None)
+
+    def get_stats(self, session_uuid: str = None) -> dict:
+        """
+        Get the pacing stats of a session (or of all the sessions, with the batches of fires).
+
+        Args:
+            self: PacingEngine object itself
+            session_uuid (str): The session uuid (None for all the sessions)
+
+        Returns:
+            dict: Amount of fires, mean and max jitter (in seconds) and missed deadlines
+        """
+        sessions_stats = [self.session_stats.get(session_uuid, {})] if session_uuid is not None else list(self.session_stats.values())
+        fires = sum(stats.get("fires", 0) for stats in sessions_stats)
+        stats = {
+            "fires": fires,
+            "jitter_mean": sum(stats.get("jitter_sum", 0.0) for stats in sessions_stats) / fires if fires else 0.0,
+            "jitter_max": max([stats.get("jitter_max", 0.0) for stats in sessions_stats], default=0.0),
+            "missed": sum(stats.get("missed", 0) for stats in sessions_stats),
+        }
+        if session_uuid is None:
+            stats["batches"] = self.batches
+            stats["batch_size_mean"] = self.fired / self.batches if self.batches else 0.0
+        return stats
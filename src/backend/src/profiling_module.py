@@ -0,0 +1,239 @@
+# coding: utf-8
+"""
+
+## Profiling Module
+- TickProfiler class (on-demand profiling of the next N ticks of calculate, armed at runtime)
+- Deterministic profiling (```cprofile```: one cProfile profiler by tick, merged and dumped as a pstats file with a text summary)
+  or sampling profiling (```sampling```: the stacks of the threads running the profiled ticks are sampled at a fixed interval,
+  and dumped as a collapsed-stack file, e.g. for flame graphs)
+- The capture is armed by a control message of a session (```"profile": {"ticks": N, "mode": "cprofile"}```, only the ticks of
+  the session are profiled), or at the backend start with the environment variables ```BACKEND_PROFILE_TICKS``` and
+  ```BACKEND_PROFILE_MODE``` (the ticks of all the sessions are profiled).
+
+The files are saved on the directory set with the environment variable ```BACKEND_PROFILE_DIR``` (e.g. a mounted volume),
+and the sampling interval is set with ```BACKEND_PROFILE_SAMPLING_INTERVAL``` (in seconds).
+When no capture is armed, the hooks of calculate only check that no capture is armed.
+
+"""
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from datetime import datetime
+from collections import Counter
+
+# Default directory of the profile files
+default_profile_dir = os.environ.get("BACKEND_PROFILE_DIR", "profiles")
+
+# Default amount of ticks profiled at the backend start (0 for none) and profiling mode
+default_profile_ticks = int(os.environ.get("BACKEND_PROFILE_TICKS", 0))
+default_profile_mode = os.environ.get("BACKEND_PROFILE_MODE", "cprofile")
+
+# Default interval of the stacks samples (in seconds)
+default_sampling_interval = float(os.environ.get("BACKEND_PROFILE_SAMPLING_INTERVAL", 0.001))
+
+# Profiling modes
+profile_modes = ("cprofile", "sampling")
+
+# Amount of functions of the text summary of the deterministic profiles
+summary_functions = 40
+
+# Marker of a thread without a running profiled tick
+_not_running = object()
+
+class ProfileCapture:
+    """
+    Capture of the profiles of N ticks (of a session, or of all the sessions).
+    """
+    def __init__(self, ticks: int, mode: str, session_uuid: str = None):
+        """
+        Initialize the ProfileCapture class object.
+
+        Args:
+            self: ProfileCapture object itself
+            ticks (int): Amount of ticks to profile
+            mode (str): The profiling mode ("cprofile" or "sampling")
+            session_uuid (str): The session uuid of the profiled ticks (None for all the sessions)
+        """
+        self.ticks = ticks
+        self.mode = mode
+        self.session_uuid = session_uuid
+        self.remaining = ticks
+        self.completed = 0
+        # running ticks by thread id (the cProfile profiler of the tick, or None for the sampling mode)
+        self.running = {}
+        self.profiles = []
+        self.stacks = Counter()
+        self.started = time.time()
+
+class TickProfiler:
+    """
+    On-demand profiler of the ticks of calculate: a capture of the next N ticks is armed at runtime, then dumped to files.
+    """
+    def __init__(self, profile_dir: str = default_profile_dir, sampling_interval: float = default_sampling_interval):
+        """
+        Initialize the TickProfiler class object.
+
+        Args:
+            self: TickProfiler object itself
+            profile_dir (str): Directory of the profile files
+            sampling_interval (float): Interval of the stacks samples (in seconds)
+        """
+        self.profile_dir = profile_dir
+        self.sampling_interval = sampling_interval
+        self.capture = None
+        self.saved_files = []
+        self.lock = threading.Lock()
+
+    def request(self, ticks: int, mode: str = default_profile_mode, session_uuid: str = None) -> bool:
+        """
+        Arm a capture of the next ticks (ignored while another capture is running).
+
+        Args:
+            self: TickProfiler object itself
+            ticks (int): Amount of ticks to profile
+            mode (str): The profiling mode ("cprofile" or "sampling")
+            session_uuid (str): The session uuid of the profiled ticks (None for all the sessions)
+
+        Returns:
+            bool: Result of the capture is or not armed (not armed for an unknown mode)
+        """
+        try:
+            ticks = int(ticks)
+        except (TypeError, ValueError):
+            # e.g. a control message with {"ticks": "many"} (the session message is still processed)
+            print(f"Invalid amount of ticks to profile: {ticks!r}")
+            return False
+        if ticks <= 0:
+            return False
+        if mode not in profile_modes:
+            # e.g. a control message with an unknown mode (the session message is still processed)
+            print(f"Unknown profiling mode: {mode} (modes: {', '.join(profile_modes)})")
+            return False
+
+        with self.lock:
+            if self.capture is not None:
+                return False
+            capture = ProfileCapture(ticks, mode, session_uuid)
+            self.capture = capture
+
+        if mode == "sampling":
+            threading.Thread(target=self._sample, args=(capture,), name="profile-sampler", daemon=True).start()
+        print(f"Profiling the next {ticks} ticks of calculate ({mode})" + (f" of the session '{session_uuid}'" if session_uuid else ""))
+        return True
+
+    def start_tick(self, session_uuid: str) -> object:
+        """
+        Start the profile of a tick of a session, if a capture is armed for it.
+
+        Args:
+            self: TickProfiler object itself
+            session_uuid (str): The session uuid of the tick
+
+        Returns:
+            object: The capture of the profiled tick (None if the tick is not profiled)
+        """
+        capture = self.capture
+        if capture is None or (capture.session_uuid is not None and capture.session_uuid != session_uuid):
+            return None
+
+        thread_id = threading.get_ident()
+        with self.lock:
+            # tick of the thread not stopped (e.g. an exception on calculate): its profile is dropped
+            if thread_id in capture.running:
+                stale_profiler = capture.running.pop(thread_id)
+                if stale_profiler is not None:
+                    stale_profiler.disable()
+                capture.remaining += 1
+            if self.capture is not capture or capture.remaining == 0:
+                return None
+            capture.remaining -= 1
+            profiler = cProfile.Profile() if capture.mode == "cprofile" else None
+            capture.running[thread_id] = profiler
+
+        if profiler is not None:
+            profiler.enable()
+        return capture
+
+    def stop_tick(self, capture: ProfileCapture):
+        """
+        Stop the profile of a tick (the capture is saved after its last tick).
+
+        Args:
+            self: TickProfiler object itself
+            capture (ProfileCapture): The capture of the profiled tick (from start_tick, None for a tick not profiled)
+        """
+        if capture is None:
+            return
+
+        thread_id = threading.get_ident()
+        with self.lock:
+            profiler = capture.running.pop(thread_id, _not_running)
+            if profiler is _not_running:
+                return
+            if profiler is not None:
+                profiler.disable()
+                capture.profiles.append(profiler)
+            capture.completed += 1
+            finished = capture.completed == capture.ticks
+            if finished:
+                self.capture = None
+
+        if finished:
+            self._save(capture)
+
+    def get_status(self) -> dict:
+        """
+        Get the status of the profiler: the armed capture (if any) and the saved files.
+
+        Args:
+            self: TickProfiler object itself
+
+        Returns:
+            dict: The mode, session and remaining ticks of the armed capture, and the saved files
+        """
+        with self.lock:
+            capture = self.capture
+            status = {"saved_files": list(self.saved_files)}
+            if capture is not None:
+                status.update({"mode": capture.mode, "session_uuid": capture.session_uuid, "remaining_ticks": capture.ticks - capture.completed})
+            return status
+
+    def _sample(self, capture: ProfileCapture):
+        # sample the stacks of the threads running the profiled ticks, until the capture is finished
+        while self.capture is capture:
+            frames = sys._current_frames()
+            for thread_id in list(capture.running):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                if len(stack) > 0:
+                    capture.stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.sampling_interval)
+
+    def _save(self, capture: ProfileCapture):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        file_name = os.path.join(self.profile_dir, f"calculate_{capture.mode}_{datetime.now().strftime('%d-%m-%Y_%H%M%S')}_{capture.ticks}ticks"
+                                                   + (f"_{capture.session_uuid}" if capture.session_uuid else ""))
+        files = []
+        if capture.mode == "cprofile":
+            stats = pstats.Stats(capture.profiles[0])
+            for profile in capture.profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(file_name + ".prof")
+            with open(file_name + ".txt", "w") as summary_file:
+                pstats.Stats(file_name + ".prof", stream=summary_file).sort_stats("cumulative").print_stats(summary_functions)
+            files += [file_name + ".prof", file_name + ".txt"]
+        else:
+            with open(file_name + ".collapsed", "w") as collapsed_file:
+                for stack, count in capture.stacks.most_common():
+                    collapsed_file.write(f"{stack} {count}\n")
+            files.append(file_name + ".collapsed")
+
+        with self.lock:
+            self.saved_files += files
+        print(f"Profile of {capture.ticks} ticks of calculate ({capture.mode}) saved in {time.time() - capture.started:.1f} s:", ", ".join(files))
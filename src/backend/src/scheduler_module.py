@@ -0,0 +1,324 @@
+# coding: utf-8
+"""
+
+## Scheduler Module
+- SessionScheduler class (per session mailboxes of the received messages, processed by a pool of worker threads)
+- Each session is processed by one worker at a time (its messages keep their order), and the sessions are paced
+  independently by a pacing engine (see pacing_module): each session is fired at its own read rate cadence,
+  the sessions due at the same instant are fired in one batch, and no thread sleeps on the hot path.
+- Scheduling policies of the sessions due: ```round_robin``` (fair turns between the sessions)
+  or ```deadline``` (the session with the earliest due time first).
+- Optional coalescing of the pending messages of a session: a new message can be merged into the last pending message
+  (e.g. latest-wins partial updates), so a session falling behind does not process stale messages. The merged messages are counted.
+- Optional periodic fires: a session without new messages is still fired at its cadence (recalculation of its current state),
+  until it is idle (no messages) for the idle timeout.
+
+The amount of workers, the policy, the periodic fires and the idle timeout can be set with the environment variables
+```BACKEND_NUM_WORKERS```, ```BACKEND_SCHEDULER_POLICY```, ```BACKEND_PERIODIC_TICKS``` and ```BACKEND_SESSION_IDLE_TIMEOUT``` (in seconds).
+
+"""
+import os
+import time
+import threading
+from collections import deque
+from src.backend.src.pacing_module import PacingEngine, default_pacing_resolution
+
+# Default amount of worker threads
+default_num_workers = int(os.environ.get("BACKEND_NUM_WORKERS", 4))
+
+# Default scheduling policy of the sessions (round_robin or deadline)
+default_scheduler_policy = os.environ.get("BACKEND_SCHEDULER_POLICY", "round_robin")
+
+# Default periodic fires of the sessions without new messages (opt-in: by default, the sessions are fired only by new messages)
+default_periodic_ticks = os.environ.get("BACKEND_PERIODIC_TICKS", "0") != "0"
+
+# Default time without messages after which a session is no longer fired periodically (in seconds)
+default_session_idle_timeout = float(os.environ.get("BACKEND_SESSION_IDLE_TIMEOUT", 30))
+
+# Scheduling policies of the sessions
+scheduler_policies = ("round_robin", "deadline")
+
+class SessionMailbox:
+    """
+    Pending messages of a session, and its pacing state.
+    """
+    def __init__(self, session_uuid: str):
+        """
+        Initialize the SessionMailbox class object.
+
+        Args:
+            self: SessionMailbox object itself
+            session_uuid (str): The session uuid
+        """
+        self.session_uuid = session_uuid
+        self.messages = deque()
+        self.next_due = 0.0
+        self.due_time = 0.0
+        self.last_message_time = 0.0
+        self.turn = 0
+        self.running = False
+        self.removed = False
+        self.coalesced = 0
+
+class SessionScheduler:
+    """
+    Per session mailboxes of messages, processed by a pool of worker threads with per session pacing.
+    """
+    def __init__(self, process_function: object, interval_function: object, num_workers: int = default_num_workers,
+                 policy: str = default_scheduler_policy, clock: object = time.monotonic, coalesce_function: object = None,
+                 periodic: bool = False, idle_timeout: float = default_session_idle_timeout,
+                 resolution: float = default_pacing_resolution):
+        """
+        Initialize the SessionScheduler class object.
+
+        Args:
+            self: SessionScheduler object itself
+            process_function (object): Function that processes a message of a session, called as process_function(session_uuid, message)
+                (message is None on the periodic fires without new messages)
+            interval_function (object): Function that gets the pacing interval (in seconds) of a session, called as interval_function(session_uuid)
+            num_workers (int): Amount of worker threads
+            policy (str): Scheduling policy of the sessions (round_robin or deadline)
+            clock (object): Function that gets the current time (in seconds)
+            coalesce_function (object): Function that merges a new message into the last pending message of its session,
+                called as coalesce_function(pending_message, message), returns the merged message (or None to keep both)
+            periodic (bool): Fire the sessions at their cadence also without new messages
+            idle_timeout (float): Time without messages after which a session is no longer fired periodically (in seconds)
+            resolution (float): Resolution of the due times of the pacing engine (in seconds)
+        """
+        if policy not in scheduler_policies:
+            raise ValueError(f"Unknown scheduler policy: {policy}")
+
+        self.process_function = process_function
+        self.interval_function = interval_function
+        self.num_workers = max(1, int(num_workers))
+        self.policy = policy
+        self.clock = clock
+        self.coalesce_function = coalesce_function
+        self.coalesced_total = 0
+        self.periodic = periodic
+        self.idle_timeout = idle_timeout
+        self.mailboxes = {}
+        self.engine = PacingEngine(resolution)
+        self.turns = 0
+        # sessions fired, waiting for a worker
+        self.work = deque()
+        self.lock = threading.Lock()
+        self.pacer_condition = threading.Condition(self.lock)
+        self.work_condition = threading.Condition(self.lock)
+        self.threads = []
+        self.stopped = False
+
+    def start(self):
+        """
+        Start the pacing thread and the worker threads.
+
+        Args:
+            self: SessionScheduler object itself
+        """
+        self.threads.append(threading.Thread(target=self._pacer, name="session-pacer", daemon=True))
+        for worker_index in range(self.num_workers):
+            self.threads.append(threading.Thread(target=self._worker, name=f"session-worker-{worker_index}", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stop the pacing and worker threads (the messages being processed are finished).
+
+        Args:
+            self: SessionScheduler object itself
+        """
+        with self.lock:
+            self.stopped = True
+            self.pacer_condition.notify_all()
+            self.work_condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def put(self, session_uuid: str, message: object):
+        """
+        Put a received message on the mailbox of its session.
+
+        Args:
+            self: SessionScheduler object itself
+            session_uuid (str): The session uuid
+            message (object): The received message
+        """
+        with self.lock:
+            now = self.clock()
+            mailbox = self.mailboxes.get(session_uuid)
+            if mailbox is None:
+                mailbox = self.mailboxes[session_uuid] = SessionMailbox(session_uuid)
+            mailbox.removed = False
+            mailbox.last_message_time = now
+
+            # merge the message into the last pending message of the session (if they can be coalesced)
+            if self.coalesce_function is not None and len(mailbox.messages) > 0:
+                merged_message = self.coalesce_function(mailbox.messages[-1], message)
+                if merged_message is not None:
+                    mailbox.messages[-1] = merged_message
+                    mailbox.coalesced += 1
+                    self.coalesced_total += 1
+                    return
+
+            mailbox.messages.append(message)
+            if not mailbox.running and not self.engine.is_scheduled(session_uuid):
+                self._schedule(mailbox, max(now, mailbox.next_due))
+
+    def _schedule(self, mailbox: SessionMailbox, due_time: float):
+        # schedule the next fire of a session (the pacing thread waits for the earliest due time)
+        self.engine.schedule(mailbox.session_uuid, due_time)
+        self.pacer_condition.notify()
+
+    def get_queue_depth(self, session_uuid: str = None) -> int:
+        """
+        Get the amount of pending messages of a session (or of all the sessions).
+
+        Args:
+            self: SessionScheduler object itself
+            session_uuid (str): The session uuid (None for all the sessions)
+
+        Returns:
+            int: Amount of pending messages
+        """
+        with self.lock:
+            if session_uuid is not None:
+                mailbox = self.mailboxes.get(session_uuid)
+                return 0 if mailbox is None else len(mailbox.messages)
+            return sum(len(mailbox.messages) for mailbox in self.mailboxes.values())
+
+    def get_sessions_count(self) -> int:
+        """
+        Get the amount of active sessions (sessions with a mailbox, e.g. not closed).
+
+        Args:
+            self: SessionScheduler object itself
+
+        Returns:
+            int: Amount of active sessions
+        """
+        with self.lock:
+            return len(self.mailboxes)
+
+    def get_coalesced_count(self, session_uuid: str = None) -> int:
+        """
+        Get the amount of messages merged into pending messages of a session (or of all the sessions, since the start).
+
+        Args:
+            self: SessionScheduler object itself
+            session_uuid (str): The session uuid (None for all the sessions)
+
+        Returns:
+            int: Amount of coalesced messages
+        """
+        with self.lock:
+            if session_uuid is not None:
+                mailbox = self.mailboxes.get(session_uuid)
+                return 0 if mailbox is None else mailbox.coalesced
+            return self.coalesced_total
+
+    def get_pacing_stats(self, session_uuid: str = None) -> dict:
+        """
+        Get the pacing stats of a session (or of all the sessions): fires, jitter and missed deadlines.
+
+        Args:
+            self: SessionScheduler object itself
+            session_uuid (str): The session uuid (None for all the sessions)
+
+        Returns:
+            dict: Amount of fires, mean and max jitter (in seconds) and missed deadlines (and batches of fires, for all the sessions)
+        """
+        with self.lock:
+            return self.engine.get_stats(session_uuid)
+
+    def remove_session(self, session_uuid: str):
+        """
+        Remove the mailbox of a session (e.g. on the session close), once it has no pending messages
+        (if the session is running, the mailbox is removed at the end of its processing).
+
+        Args:
+            self: SessionScheduler object itself
+            session_uuid (str): The session uuid
+        """
+        with self.lock:
+            mailbox = self.mailboxes.get(session_uuid)
+            if mailbox is None:
+                return
+            if not mailbox.running and len(mailbox.messages) == 0:
+                self._remove_mailbox(mailbox)
+            else:
+                mailbox.removed = True
+
+    def _remove_mailbox(self, mailbox: SessionMailbox):
+        del self.mailboxes[mailbox.session_uuid]
+        self.engine.remove_session(mailbox.session_uuid)
+
+    def _pacer(self):
+        with self.lock:
+            while not self.stopped:
+                now = self.clock()
+                batch = [(self.mailboxes[session_uuid], due_time) for session_uuid, due_time in self.engine.pop_due(now)
+                         if session_uuid in self.mailboxes]
+                if len(batch) == 0:
+                    # wait for a new due time or for the earliest session due
+                    next_due_time = self.engine.next_due_time()
+                    self.pacer_condition.wait(None if next_due_time is None else max(0.0, next_due_time - now))
+                    continue
+
+                for mailbox, due_time in batch:
+                    mailbox.running = True
+                    mailbox.due_time = due_time
+                mailboxes = [mailbox for mailbox, _ in batch]
+                if self.policy == "round_robin":
+                    # the sessions served longer ago first
+                    mailboxes.sort(key=lambda mailbox: mailbox.turn)
+
+                # hand the sessions fired at the same instant to the workers
+                self.work.extend(mailboxes)
+                self.work_condition.notify(len(mailboxes))
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                while len(self.work) == 0:
+                    if self.stopped:
+                        return
+                    self.work_condition.wait()
+                mailbox = self.work.popleft()
+
+            self._fire(mailbox)
+
+    def _fire(self, mailbox: SessionMailbox):
+        # process the next message of a session (or recalculate its current state, on a periodic fire)
+        with self.lock:
+            message = mailbox.messages.popleft() if len(mailbox.messages) > 0 else None
+            self.turns += 1
+            mailbox.turn = self.turns
+
+        started = self.clock()
+        if message is not None or self.periodic:
+            try:
+                self.process_function(mailbox.session_uuid, message)
+            except Exception as error:
+                print(f"Exception occurred on session '{mailbox.session_uuid}':", repr(error))
+
+        try:
+            interval = float(self.interval_function(mailbox.session_uuid))
+            known_interval = True
+        except Exception:
+            # session without pacing interval (e.g. before its full update), only fired by new messages
+            interval = 0.0
+            known_interval = False
+
+        with self.lock:
+            mailbox.running = False
+            missed = self.engine.record_fire(mailbox.session_uuid, mailbox.due_time, started, interval)
+            # keep the cadence of the session (restarted from now, if the deadline was missed)
+            mailbox.next_due = (started if missed else mailbox.due_time) + interval
+
+            if mailbox.removed and len(mailbox.messages) == 0:
+                self._remove_mailbox(mailbox)
+            elif len(mailbox.messages) > 0 or (self.periodic and known_interval and interval > 0 and
+                                               self.clock() - mailbox.last_message_time < self.idle_timeout):
+                self._schedule(mailbox, mailbox.next_due)
@@ -0,0 +1,415 @@
+# coding: utf-8
+"""
+
+## Spatial Index Module
+- Walls spatial indexes, used to select the walls a line of sight must be tested against.
+- QuadrantIndex class (the four quadrants split of the map walls around the map center)
+- GridIndex class (uniform grid over the map walls, traversed by each line of sight)
+- Indexes stored as arrays (get_arrays / load_walls_index), e.g. on the compiled map artifacts
+
+The walls spatial index of a map is set on the config file ("map" section), e.g.:
+```"walls_spatial_index": {"type": "grid", "grid_resolution": 2}```
+where grid_resolution is the size (in meters) of the grid cells.
+
+"""
+import math
+import numpy as np
+
+# Default walls spatial index type and grid cells size (in meters)
+default_walls_index_type = "grid"
+default_grid_resolution = 2.0
+
+# Meters by degree of latitude (Earth mean radius of 6371008.8 meters)
+meters_by_degree_lat = 6371008.8 * math.pi / 180
+
+class QuadrantIndex:
+    """
+    Walls spatial index that splits the map walls in four quadrants around the map center.
+
+    Quadrants order:
+    #Q0 Q1
+    #Q3 Q2
+    """
+    def __init__(self, walls_array: np.ndarray, map_center: list):
+        """
+        Initialize the QuadrantIndex class object.
+
+        Args:
+            self: QuadrantIndex object itself
+            walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+            map_center (list): Longitude and Latitude coordinates of the map center
+        """
+        self.center_long = float(map_center[0])
+        self.center_lat = float(map_center[1])
+
+        quadrants = self.get_quadrants_of_segments(walls_array)
+        self.nr_walls = len(walls_array)
+        self.walls_by_quadrant = [np.nonzero(quadrants[:, quad])[0] for quad in range(4)]
+
+    def get_points_quadrants(self, points: np.ndarray) -> np.ndarray:
+        """
+        Get the Quadrant where each point is.
+
+        Args:
+            self: QuadrantIndex object itself
+            points (np.ndarray): Array of shape (N, 2) with points coordinates
+
+        Returns:
+            np.ndarray: Array of shape (N,) with the Quadrant of each point
+        """
+        right = points[:, 0] >= self.center_long
+        top = points[:, 1] >= self.center_lat
+        return np.where(right, np.where(top, 1, 2), np.where(top, 0, 3))
+
+    def get_quadrants_of_segments(self, segments: np.ndarray) -> np.ndarray:
+        """
+        Get the Quadrants where each line segment passes (the quadrants of its points, or all the four for opposite quadrants).
+
+        Args:
+            self: QuadrantIndex object itself
+            segments (np.ndarray): Array of shape (N, 4) with line segments
+
+        Returns:
+            np.ndarray: Boolean array of shape (N, 4) with the Quadrants of each line segment
+        """
+        segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        quad_point1 = self.get_points_quadrants(segments[:, 0:2])
+        quad_point2 = self.get_points_quadrants(segments[:, 2:4])
+        dif_abs = np.abs(quad_point1 - quad_point2)
+
+        quadrants = np.zeros((len(segments), 4), dtype=bool)
+        rows = np.arange(len(segments))
+        quadrants[rows, quad_point1] = True
+        quadrants[rows, quad_point2] = True
+        # opposite quadrants, the line segment can pass in all of them
+        quadrants[dif_abs == 2] = True
+
+        return quadrants
+
+    def query_pairs(self, lines_array: np.ndarray) -> tuple:
+        """
+        Get the (line, wall) candidate pairs to test for intersections.
+
+        Args:
+            self: QuadrantIndex object itself
+            lines_array (np.ndarray): Array of shape (L, 4) with the lines of sight line segments
+
+        Returns:
+            tuple: (np.ndarray lines indexes, np.ndarray walls indexes) of the candidate pairs
+        """
+        lines_quadrants = self.get_quadrants_of_segments(lines_array)
+        line_index = []
+        wall_index = []
+
+        for quad in range(4):
+            lines_in_quad = np.nonzero(lines_quadrants[:, quad])[0]
+            walls_in_quad = self.walls_by_quadrant[quad]
+            line_index.append(np.repeat(lines_in_quad, len(walls_in_quad)))
+            wall_index.append(np.tile(walls_in_quad, len(lines_in_quad)))
+
+        return _unique_pairs(np.concatenate(line_index), np.concatenate(wall_index), self.nr_walls)
+
+    def get_arrays(self) -> dict:
+        """
+        Get the data of the index as arrays (to be stored on a compiled map artifact).
+
+        Args:
+            self: QuadrantIndex object itself
+
+        Returns:
+            dict: Arrays of the index data (restored by from_arrays)
+        """
+        return {
+            "index_type": np.array("quadrants"),
+            "index_center": np.array([self.center_long, self.center_lat]),
+            "index_nr_walls": np.array(self.nr_walls),
+            "index_quadrant_walls": np.concatenate(self.walls_by_quadrant).astype(np.int64),
+            "index_quadrant_start": np.cumsum([0] + [len(walls) for walls in self.walls_by_quadrant]),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "QuadrantIndex":
+        """
+        Restore an index from its arrays (as returned by get_arrays), without rebuilding it.
+
+        Args:
+            arrays (dict): Arrays of the index data
+
+        Returns:
+            QuadrantIndex: The restored index
+        """
+        index = cls.__new__(cls)
+        index.center_long, index.center_lat = (float(value) for value in arrays["index_center"])
+        index.nr_walls = int(arrays["index_nr_walls"])
+        start = arrays["index_quadrant_start"]
+        index.walls_by_quadrant = [arrays["index_quadrant_walls"][start[quad]:start[quad + 1]] for quad in range(4)]
+        return index
+
+class GridIndex:
+    """
+    Walls spatial index that registers the map walls in a uniform grid of cells.
+
+    Each line of sight only tests the walls registered in the cells it passes through (grid ray traversal).
+    """
+    def __init__(self, walls_array: np.ndarray, grid_resolution: float = default_grid_resolution, bounds: tuple = None):
+        """
+        Initialize the GridIndex class object.
+
+        Args:
+            self: GridIndex object itself
+            walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+            grid_resolution (float): Size of the grid cells (in meters)
+            bounds (tuple): Grid bounds as (min_long, min_lat, max_long, max_lat) (by default, the walls extent)
+        """
+        walls_array = np.asarray(walls_array, dtype=float).reshape(-1, 4)
+        self.nr_walls = len(walls_array)
+        points = np.concatenate((walls_array[:, 0:2], walls_array[:, 2:4])) if len(walls_array) > 0 else np.zeros((1, 2))
+
+        # grid bounds (walls extent, if not set) and cells size in degrees
+        if bounds is None:
+            self.min_long, self.min_lat = points.min(axis=0)
+            self.max_long, self.max_lat = points.max(axis=0)
+        else:
+            self.min_long, self.min_lat, self.max_long, self.max_lat = (float(bound) for bound in bounds)
+        center_lat = (self.min_lat + self.max_lat) / 2
+        self.cell_lat = float(grid_resolution) / meters_by_degree_lat
+        self.cell_long = float(grid_resolution) / (meters_by_degree_lat * math.cos(math.radians(center_lat)))
+        self.nr_cols = max(1, int(math.ceil((self.max_long - self.min_long) / self.cell_long)))
+        self.nr_rows = max(1, int(math.ceil((self.max_lat - self.min_lat) / self.cell_lat)))
+
+        # tolerance to register walls also in the cells they only touch on the boundaries
+        eps_long = self.cell_long * 1e-6
+        eps_lat = self.cell_lat * 1e-6
+
+        cells = []
+        walls = []
+        for wall in range(len(walls_array)):
+            col_min, row_min = self.get_cell(min(walls_array[wall, 0], walls_array[wall, 2]) - eps_long, min(walls_array[wall, 1], walls_array[wall, 3]) - eps_lat)
+            col_max, row_max = self.get_cell(max(walls_array[wall, 0], walls_array[wall, 2]) + eps_long, max(walls_array[wall, 1], walls_array[wall, 3]) + eps_lat)
+            cols, rows = np.meshgrid(np.arange(col_min, col_max + 1), np.arange(row_min, row_max + 1))
+            wall_cells = (rows * self.nr_cols + cols).ravel()
+            wall_cells = wall_cells[self._segment_crosses_cells(walls_array[wall], wall_cells, eps_long, eps_lat)]
+            cells.append(wall_cells)
+            walls.append(np.full(len(wall_cells), wall, dtype=np.int64))
+
+        cells = np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+        walls = np.concatenate(walls) if walls else np.zeros(0, dtype=np.int64)
+
+        # compressed cells -> walls lists (walls of cell c are cell_walls[cell_start[c]:cell_start[c + 1]])
+        order = np.argsort(cells, kind="stable")
+        self.cell_walls = walls[order]
+        self.cell_start = np.concatenate(([0], np.cumsum(np.bincount(cells, minlength=self.nr_cols * self.nr_rows))))
+
+    def get_cell(self, long: float, lat: float) -> tuple:
+        """
+        Get the grid cell (column, row) of a point, clipped to the grid bounds.
+
+        Args:
+            self: GridIndex object itself
+            long (float): Longitude coordinate of the point
+            lat (float): Latitude coordinate of the point
+
+        Returns:
+            tuple: Column and Row of the grid cell
+        """
+        col = min(max(int(math.floor((long - self.min_long) / self.cell_long)), 0), self.nr_cols - 1)
+        row = min(max(int(math.floor((lat - self.min_lat) / self.cell_lat)), 0), self.nr_rows - 1)
+        return col, row
+
+    def _segment_crosses_cells(self, segment: np.ndarray, cells: np.ndarray, eps_long: float, eps_lat: float) -> np.ndarray:
+        # slab test of the segment against the (slightly expanded) cells boxes
+        cols = cells % self.nr_cols
+        rows = cells // self.nr_cols
+        box_min_long = self.min_long + cols * self.cell_long - eps_long
+        box_max_long = box_min_long + self.cell_long + 2 * eps_long
+        box_min_lat = self.min_lat + rows * self.cell_lat - eps_lat
+        box_max_lat = box_min_lat + self.cell_lat + 2 * eps_lat
+
+        t_enter = np.zeros(len(cells))
+        t_exit = np.ones(len(cells))
+        for start, delta, box_min, box_max in ((segment[0], segment[2] - segment[0], box_min_long, box_max_long),
+                                               (segment[1], segment[3] - segment[1], box_min_lat, box_max_lat)):
+            if delta == 0:
+                inside = (start >= box_min) & (start <= box_max)
+                t_exit = np.where(inside, t_exit, -1)
+            else:
+                t1 = (box_min - start) / delta
+                t2 = (box_max - start) / delta
+                t_enter = np.maximum(t_enter, np.minimum(t1, t2))
+                t_exit = np.minimum(t_exit, np.maximum(t1, t2))
+
+        return t_enter <= t_exit
+
+    def traverse_cells(self, line: np.ndarray) -> list:
+        """
+        Get the grid cells a line segment passes through (grid ray traversal).
+
+        Args:
+            self: GridIndex object itself
+            line (np.ndarray): Line segment as [start_long, start_lat, end_long, end_lat]
+
+        Returns:
+            list: Indexes of the grid cells the line segment passes through
+        """
+        x0 = (line[0] - self.min_long) / self.cell_long
+        y0 = (line[1] - self.min_lat) / self.cell_lat
+        x1 = (line[2] - self.min_long) / self.cell_long
+        y1 = (line[3] - self.min_lat) / self.cell_lat
+
+        # clip the line segment to the grid bounds (Liang-Barsky)
+        t_enter, t_exit = 0.0, 1.0
+        for start, delta, bound_max in ((x0, x1 - x0, self.nr_cols), (y0, y1 - y0, self.nr_rows)):
+            if delta == 0:
+                if start < 0 or start > bound_max:
+                    return []
+            else:
+                t1 = (0 - start) / delta
+                t2 = (bound_max - start) / delta
+                t_enter = max(t_enter, min(t1, t2))
+                t_exit = min(t_exit, max(t1, t2))
+        if t_enter > t_exit:
+            return []
+
+        dx = x1 - x0
+        dy = y1 - y0
+        x = x0 + t_enter * dx
+        y = y0 + t_enter * dy
+        col = min(max(int(math.floor(x)), 0), self.nr_cols - 1)
+        row = min(max(int(math.floor(y)), 0), self.nr_rows - 1)
+        end_col = min(max(int(math.floor(x0 + t_exit * dx)), 0), self.nr_cols - 1)
+        end_row = min(max(int(math.floor(y0 + t_exit * dy)), 0), self.nr_rows - 1)
+
+        step_col = 1 if dx > 0 else -1
+        step_row = 1 if dy > 0 else -1
+        # parametric distance to the next vertical / horizontal cell boundary
+        t_max_col = ((col + (step_col > 0)) - x0) / dx if dx != 0 else math.inf
+        t_max_row = ((row + (step_row > 0)) - y0) / dy if dy != 0 else math.inf
+        t_delta_col = abs(1 / dx) if dx != 0 else math.inf
+        t_delta_row = abs(1 / dy) if dy != 0 else math.inf
+
+        cells = [row * self.nr_cols + col]
+        while (col, row) != (end_col, end_row):
+            if t_max_col < t_max_row:
+                col += step_col
+                t_max_col += t_delta_col
+            else:
+                row += step_row
+                t_max_row += t_delta_row
+            if col < 0 or col >= self.nr_cols or row < 0 or row >= self.nr_rows:
+                break
+            cells.append(row * self.nr_cols + col)
+
+        return cells
+
+    def query_pairs(self, lines_array: np.ndarray) -> tuple:
+        """
+        Get the (line, wall) candidate pairs to test for intersections.
+
+        Args:
+            self: GridIndex object itself
+            lines_array (np.ndarray): Array of shape (L, 4) with the lines of sight line segments
+
+        Returns:
+            tuple: (np.ndarray lines indexes, np.ndarray walls indexes) of the candidate pairs
+        """
+        cells = []
+        cells_lines = []
+
+        for line in range(len(lines_array)):
+            line_cells = self.traverse_cells(lines_array[line])
+            cells.extend(line_cells)
+            cells_lines.extend([line] * len(line_cells))
+
+        cells = np.array(cells, dtype=np.int64)
+        cells_lines = np.array(cells_lines, dtype=np.int64)
+
+        # expand each (line, cell) into the (line, wall) pairs of the walls registered in the cell
+        counts = self.cell_start[cells + 1] - self.cell_start[cells]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        wall_index = self.cell_walls[np.repeat(self.cell_start[cells], counts) + offsets]
+        line_index = np.repeat(cells_lines, counts)
+
+        return _unique_pairs(line_index, wall_index, self.nr_walls)
+
+    def get_arrays(self) -> dict:
+        """
+        Get the data of the index as arrays (to be stored on a compiled map artifact).
+
+        Args:
+            self: GridIndex object itself
+
+        Returns:
+            dict: Arrays of the index data (restored by from_arrays)
+        """
+        return {
+            "index_type": np.array("grid"),
+            "index_grid": np.array([self.min_long, self.min_lat, self.max_long, self.max_lat, self.cell_long, self.cell_lat]),
+            "index_grid_shape": np.array([self.nr_walls, self.nr_cols, self.nr_rows]),
+            "index_cell_walls": self.cell_walls,
+            "index_cell_start": self.cell_start,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "GridIndex":
+        """
+        Restore an index from its arrays (as returned by get_arrays), without rebuilding it.
+
+        Args:
+            arrays (dict): Arrays of the index data
+
+        Returns:
+            GridIndex: The restored index
+        """
+        index = cls.__new__(cls)
+        index.min_long, index.min_lat, index.max_long, index.max_lat, index.cell_long, index.cell_lat = (float(value) for value in arrays["index_grid"])
+        index.nr_walls, index.nr_cols, index.nr_rows = (int(value) for value in arrays["index_grid_shape"])
+        index.cell_walls = arrays["index_cell_walls"]
+        index.cell_start = arrays["index_cell_start"]
+        return index
+
+# Remove repeated (line, wall) candidate pairs
+def _unique_pairs(line_index: np.ndarray, wall_index: np.ndarray, nr_walls: int) -> tuple:
+    keys = np.unique(line_index.astype(np.int64) * max(nr_walls, 1) + wall_index.astype(np.int64))
+    return keys // max(nr_walls, 1), keys % max(nr_walls, 1)
+
+# Create the walls spatial index of a map from its config parameters
+def create_walls_index(walls_array: np.ndarray, map_config: dict) -> object:
+    """
+    Create the walls spatial index of a map, as set on the "walls_spatial_index" config parameters of the map.
+
+    Args:
+        walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+        map_config (dict): The "map" section of the config file
+
+    Returns:
+        object: The walls spatial index (QuadrantIndex or GridIndex)
+    """
+    index_params = map_config.get("walls_spatial_index", {})
+    index_type = index_params.get("type", default_walls_index_type)
+
+    if index_type == "quadrants":
+        return QuadrantIndex(walls_array, map_config["map_center"])
+    elif index_type == "grid":
+        return GridIndex(walls_array, index_params.get("grid_resolution", default_grid_resolution))
+    else:
+        raise ValueError(f"Unknown walls spatial index type: {index_type}")
+
+# Restore a walls spatial index from its arrays (e.g. loaded from a compiled map artifact)
+def load_walls_index(arrays: dict) -> object:
+    """
+    Restore a walls spatial index from its arrays (as returned by the get_arrays method of the index).
+
+    Args:
+        arrays (dict): Arrays of the index data
+
+    Returns:
+        object: The walls spatial index (QuadrantIndex or GridIndex)
+    """
+    index_type = str(arrays["index_type"])
+
+    if index_type == "quadrants":
+        return QuadrantIndex.from_arrays(arrays)
+    elif index_type == "grid":
+        return GridIndex.from_arrays(arrays)
+    else:
+        raise ValueError(f"Unknown walls spatial index type: {index_type}")
@@ -0,0 +1,151 @@
+# coding: utf-8
+"""
+
+## Stage Timings Module
+- StageTimer class (laps of the stages of one calculate tick: each lap records the time since the previous one)
+- StageTimings class (count, total, max and last time of each stage by session, e.g. to compare the cache hit path
+  with the geometry stages run only on the cache misses), with an optional listener of the recorded times (e.g. the
+  stage histograms of the metrics module)
+
+"""
+import time
+import threading
+
+class StageTimer:
+    """
+    Timer of the stages of one calculate tick of a session (the stages are timed one after the other, by laps).
+    """
+    def __init__(self, timings: object, session_uuid: str):
+        """
+        Initialize the StageTimer class object.
+
+        Args:
+            self: StageTimer object itself
+            timings (object): The StageTimings that record the laps
+            session_uuid (str): The session uuid
+        """
+        self.timings = timings
+        self.session_uuid = session_uuid
+        self.start_time = time.perf_counter()
+        self.lap_time = self.start_time
+
+    def lap(self, stage: str):
+        """
+        Record the time of a stage (since the previous lap, or since the timer start).
+
+        Args:
+            self: StageTimer object itself
+            stage (str): The stage name
+        """
+        now = time.perf_counter()
+        self.timings.record(self.session_uuid, stage, now - self.lap_time)
+        self.lap_time = now
+
+    def stop(self, stage: str = "tick"):
+        """
+        Record the total time of the tick (since the timer start).
+
+        Args:
+            self: StageTimer object itself
+            stage (str): The stage name of the total time
+        """
+        self.timings.record(self.session_uuid, stage, time.perf_counter() - self.start_time)
+
+    def add(self, stage: str, seconds: float):
+        """
+        Record the time of a sub-stage measured apart (e.g. the sum of its parts inside a stage), without a lap.
+
+        Args:
+            self: StageTimer object itself
+            stage (str): The sub-stage name
+            seconds (float): The time of the sub-stage in seconds
+        """
+        self.timings.record(self.session_uuid, stage, seconds)
+
+class StageTimings:
+    """
+    Time spent by stage of calculate, by session (count, total, max and last time of each stage).
+    """
+    def __init__(self, listener: object = None):
+        """
+        Initialize the StageTimings class object.
+
+        Args:
+            self: StageTimings object itself
+            listener (object): Function called with each recorded time, as listener(stage, seconds) (optional)
+        """
+        self.listener = listener
+        self.session_stats = {}
+        self.lock = threading.Lock()
+
+    def start(self, session_uuid: str) -> StageTimer:
+        """
+        Start the timer of a tick of a session.
+
+        Args:
+            self: StageTimings object itself
+            session_uuid (str): The session uuid
+
+        Returns:
+            StageTimer: The timer of the stages of the tick
+        """
+        return StageTimer(self, session_uuid)
+
+    def record(self, session_uuid: str, stage: str, seconds: float):
+        """
+        Record a time of a stage of a session.
+
+        Args:
+            self: StageTimings object itself
+            session_uuid (str): The session uuid
+            stage (str): The stage name
+            seconds (float): The time of the stage in seconds
+        """
+        with self.lock:
+            stats = self.session_stats.setdefault(session_uuid, {}).setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["last"] = seconds
+        if self.listener is not None:
+            self.listener(stage, seconds)
+
+    def remove_session(self, session_uuid: str):
+        """
+        Remove the timings of a session (e.g. on the session close).
+
+        Args:
+            self: StageTimings object itself
+            session_uuid (str): The session uuid
+        """
+        with self.lock:
+            self.session_stats.pop(session_uuid, None)
+
+    def get_stats(self, session_uuid: str = None) -> dict:
+        """
+        Get the timings by stage of a session (or of all the sessions), in milliseconds.
+
+        Args:
+            self: StageTimings object itself
+            session_uuid (str): The session uuid (None for all the sessions)
+
+        Returns:
+            dict: Count, mean, max and last time (ms) by stage (last only for a session)
+        """
+        with self.lock:
+            sessions_stats = [self.session_stats.get(session_uuid, {})] if session_uuid is not None else list(self.session_stats.values())
+            stages = {}
+            for session_stats in sessions_stats:
+                for stage, stats in session_stats.items():
+                    totals = stages.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0, "last": stats["last"]})
+                    totals["count"] += stats["count"]
+                    totals["total"] += stats["total"]
+                    totals["max"] = max(totals["max"], stats["max"])
+
+            result = {}
+            for stage, totals in stages.items():
+                result[stage] = {"count": totals["count"], "mean_ms": round(totals["total"] / totals["count"] * 1000, 3),
+                                 "max_ms": round(totals["max"] * 1000, 3)}
+                if session_uuid is not None:
+                    result[stage]["last_ms"] = round(totals["last"] * 1000, 3)
+            return result
@@ -0,0 +1,164 @@
+# coding: utf-8
+"""
+
+## Static Anchors Module
+- StaticAnchors class (values of the anchors of a session that only change with the anchors or the antennas: rounded
+  distances, wall intersections, lobes visibility, directionated lines of sight and distances of the activations)
+- StaticAnchorsStore class (static anchors by session, rebuilt only when the anchors or the antennas signature changes)
+
+The anchors are fixed reference tags, so their geometry is precomputed once: on each tick only the stochastic part of
+their RSSI (noise samples) and of their activations is drawn.
+
+"""
+import threading
+import numpy as np
+
+# Maximum distance (in meters) of the lines of sight with antennas activations
+activations_max_distance = 10
+
+class StaticAnchors:
+    """
+    Precomputed values of the anchors of a session against the antennas (read-only between the changes of the anchors or antennas).
+    """
+    def __init__(self, signature: object, distances: np.ndarray, wall_intersections: np.ndarray, visibility: np.ndarray):
+        """
+        Initialize the StaticAnchors class object.
+
+        Args:
+            self: StaticAnchors object itself
+            signature (object): Signature of the anchors and of the antennas (coordinates and lobes)
+            distances (np.ndarray): Array of shape (N, M) with the distances (in meters) between the anchors and the antennas
+            wall_intersections (np.ndarray): Array of shape (N, M) with the wall intersections of the lines of sight
+            visibility (np.ndarray): Boolean array of shape (N, M) with the lobes visibility of the lines of sight
+        """
+        self.signature = signature
+        self.shape = np.shape(distances)
+        # lists of the published messages (distances rounded to 3 decimal places)
+        self.distances_list = [[round(distance, 3) for distance in row] for row in np.asarray(distances, dtype=float).tolist()]
+        self.distances = np.array(self.distances_list, dtype=float).reshape(self.shape)
+        self.wall_intersections = np.array(wall_intersections, dtype=np.int64)
+        self.visibility = np.array(visibility, dtype=bool)
+
+        # directionated lines of sight (in row major order, the order of the RSSI noise samples)
+        self.directed = np.nonzero(self.visibility)
+        self.nr_directed = len(self.directed[0])
+        # directionated lines of sight smaller than 10 meters (in row major order, the order of the activations)
+        self.activated = np.nonzero(self.visibility & (self.distances <= activations_max_distance))
+        self.activations_distances = self.distances[self.activated].tolist()
+
+        self.wall_intersections_list = self.wall_intersections.tolist()
+        self.visibility_list = self.visibility.tolist()
+
+        # RSSI without noise of the directionated lines of sight (by RSSI parameters)
+        self.mean_rssi_params = None
+        self.mean_rssi_values = None
+
+    def mean_rssi(self, txPower: float, pathLossExpoent: float, referenceDistance: float, attenuationFactor: float) -> np.ndarray:
+        """
+        Get the RSSI without noise of the directionated lines of sight (computed again only when the RSSI parameters change).
+
+        Args:
+            self: StaticAnchors object itself
+            txPower (float): Transmission Power of the Radio Frequency Signal Propagation
+            pathLossExpoent (float): Path Loss Expoent of the Radio Frequency Signal Propagation
+            referenceDistance (float): Reference Distance of the Radio Frequency Signal Propagation
+            attenuationFactor (float): Attenuation Factor (dBm) by each wall of the lines of sight
+
+        Returns:
+            np.ndarray: Array of shape (nr_directed,) with the RSSI without noise
+        """
+        params = (txPower, pathLossExpoent, referenceDistance, attenuationFactor)
+        if params != self.mean_rssi_params:
+            distances = self.distances[self.directed]
+            attenuations = self.wall_intersections[self.directed] * attenuationFactor
+            with np.errstate(divide="ignore"):
+                self.mean_rssi_values = - (10 * pathLossExpoent * np.log10(distances / referenceDistance)) + txPower - attenuations
+            self.mean_rssi_params = params
+        return self.mean_rssi_values
+
+    def rssi(self, txPower: float, pathLossExpoent: float, referenceDistance: float, attenuationFactor: float, noise: list) -> list:
+        """
+        Get the RSSI of the anchors (same values of measure_RSSI for the directionated lines of sight, -170 for the others).
+
+        Args:
+            self: StaticAnchors object itself
+            txPower (float): Transmission Power of the Radio Frequency Signal Propagation
+            pathLossExpoent (float): Path Loss Expoent of the Radio Frequency Signal Propagation
+            referenceDistance (float): Reference Distance of the Radio Frequency Signal Propagation
+            attenuationFactor (float): Attenuation Factor (dBm) by each wall of the lines of sight
+            noise (list): The nr_directed noise samples of the RSSI measurements
+
+        Returns:
+            list: List of N lists with the RSSI of each antenna
+        """
+        rssi_values = self.mean_rssi(txPower, pathLossExpoent, referenceDistance, attenuationFactor) + np.asarray(noise, dtype=float)
+        rssi_values[rssi_values > 0] = -0.99
+
+        rssi = [[-170] * self.shape[1] for _ in range(self.shape[0])] # assumed threshold None value
+        for row, col, value in zip(self.directed[0].tolist(), self.directed[1].tolist(), rssi_values.tolist()):
+            rssi[row][col] = round(value, 2)
+        return rssi
+
+    def activations(self, activations_values: list) -> list:
+        """
+        Get the activations of the anchors ([0, 0, 0] for the lines of sight not directionated or greater than 10 meters).
+
+        Args:
+            self: StaticAnchors object itself
+            activations_values (list): The activations of the activations_distances (in the same order)
+
+        Returns:
+            list: List of N lists with the activations of each antenna
+        """
+        activations = [[[0, 0, 0] for _ in range(self.shape[1])] for _ in range(self.shape[0])]
+        for row, col, value in zip(self.activated[0].tolist(), self.activated[1].tolist(), activations_values):
+            activations[row][col] = value
+        return activations
+
+class StaticAnchorsStore:
+    """
+    Static anchors by session, rebuilt only when the signature of the anchors and antennas changes.
+    """
+    def __init__(self):
+        """
+        Initialize the StaticAnchorsStore class object.
+
+        Args:
+            self: StaticAnchorsStore object itself
+        """
+        self.anchors = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_uuid: str, signature: object, builder: object) -> tuple:
+        """
+        Get the static anchors of a session (built by the builder function on the first call and on the signature changes).
+
+        Args:
+            self: StaticAnchorsStore object itself
+            session_uuid (str): The session uuid
+            signature (object): Signature of the anchors and of the antennas (coordinates and lobes)
+            builder (object): Function that builds the StaticAnchors of the signature
+
+        Returns:
+            tuple: (StaticAnchors of the session, bool if it was built on this call)
+        """
+        with self.lock:
+            static_anchors = self.anchors.get(session_uuid)
+        if static_anchors is not None and static_anchors.signature == signature:
+            return static_anchors, False
+
+        static_anchors = builder()
+        with self.lock:
+            self.anchors[session_uuid] = static_anchors
+        return static_anchors, True
+
+    def remove_session(self, session_uuid: str):
+        """
+        Remove the static anchors of a session (e.g. on the session close).
+
+        Args:
+            self: StaticAnchorsStore object itself
+            session_uuid (str): The session uuid
+        """
+        with self.lock:
+            self.anchors.pop(session_uuid, None)
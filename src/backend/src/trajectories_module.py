@@ -0,0 +1,211 @@
+# coding: utf-8
+"""
+
+## Trajectories Module
+- TrajectoryTable class (precomputed distances and wall intersections between the positions of the known asset point
+  animations of a map and one static antenna)
+- TrajectoryTables class (tables of the antennas by map, built in background as soon as the antennas are known)
+
+The asset point animations of the config file (```asset_point_animations```) are replayed by the frontend position by position,
+so the deterministic geometry of each position against each antenna can be computed before the playback. It is set on the
+"map" section of the config file, e.g.:
+```"trajectory_precomputation": {"enabled": true}```
+
+The lobes visibility is not precomputed: the lobes of an animated asset point follow its bearing (set by the frontend on each step).
+
+"""
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.backend.src.geometry_module import coordinates_precision, measure_distances_matrix
+
+# Maximum amount of tables kept in memory (the least recently used are dropped)
+default_max_tables = 64
+
+class TrajectoryTable:
+    """
+    Precomputed distances and wall intersections between the trajectories positions of a map and one static antenna.
+    """
+    def __init__(self, antenna_coords: tuple, positions: np.ndarray, count_function: object):
+        """
+        Initialize the TrajectoryTable class object (the wall intersections of all the positions are counted in one batch).
+
+        Args:
+            self: TrajectoryTable object itself
+            antenna_coords (tuple): Longitude and Latitude coordinates of the antenna
+            positions (np.ndarray): Array of shape (K, 2) with the Longitude and Latitude of the trajectories positions (rounded)
+            count_function (object): Function that counts the wall intersections of a (L, 4) lines array
+        """
+        self.antenna_coords = tuple(antenna_coords)
+        antenna = np.asarray(antenna_coords, dtype=float).reshape(1, 2)
+        self.distances = measure_distances_matrix(positions, antenna)[:, 0]
+        lines_array = np.round(np.column_stack((positions, np.repeat(antenna, len(positions), axis=0))), coordinates_precision)
+        self.wall_intersections = np.asarray(count_function(lines_array), dtype=np.int64)
+        self.index = {position: row for row, position in enumerate(map(tuple, positions.tolist()))}
+
+    def lookup(self, points_coords: np.ndarray) -> tuple:
+        """
+        Get the precomputed values of a set of points (-1 wall intersections for the points out of the trajectories).
+
+        Args:
+            self: TrajectoryTable object itself
+            points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points
+
+        Returns:
+            tuple: (array of shape (N,) with the distances, array of shape (N,) with the wall intersections)
+        """
+        points = np.round(np.asarray(points_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+        rows = np.array([self.index.get(position, -1) for position in map(tuple, points.tolist())], dtype=np.int64)
+        found = rows >= 0
+        distances = np.zeros(len(rows))
+        wall_intersections = np.full(len(rows), -1, dtype=np.int64)
+        distances[found] = self.distances[rows[found]]
+        wall_intersections[found] = self.wall_intersections[rows[found]]
+        return distances, wall_intersections
+
+class TrajectoryTables:
+    """
+    Trajectory tables of the antennas by map.
+
+    The table of an antenna (new or moved) is built in background, and meanwhile its lines of sight are measured as usual.
+    """
+    def __init__(self, wall_intersections_pool: object, max_tables: int = default_max_tables, background: bool = True):
+        """
+        Initialize the TrajectoryTables class object.
+
+        Args:
+            self: TrajectoryTables object itself
+            wall_intersections_pool (object): WallIntersectionsPool used to count the wall intersections of the tables
+            max_tables (int): Maximum amount of tables kept in memory
+            background (bool): Build the tables in a background thread (or on the calling thread)
+        """
+        self.pool = wall_intersections_pool
+        self.max_tables = max_tables
+        self.background = background
+        self.maps = {}
+        self.tables = OrderedDict()
+        self.building = set()
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def register_map(self, map_key: object, map_config: dict, trajectories: list):
+        """
+        Register the trajectories of a map, as set on the "trajectory_precomputation" config parameters of the map
+        (disabled by default).
+
+        Args:
+            self: TrajectoryTables object itself
+            map_key (object): The key of the map (the same key of the map on the WallIntersectionsPool)
+            map_config (dict): The "map" section of the config file
+            trajectories (list): List of the trajectories (lists of Longitude and Latitude coordinates) of the map animations
+        """
+        if not map_config.get("trajectory_precomputation", {}).get("enabled", False) or len(trajectories) == 0:
+            return
+
+        positions = np.round(np.concatenate([np.asarray(trajectory, dtype=float).reshape(-1, 2) for trajectory in trajectories]), coordinates_precision)
+        with self.lock:
+            self.maps[map_key] = np.unique(positions, axis=0)
+
+    def has_map(self, map_key: object) -> bool:
+        """
+        Check if the trajectories of a map are registered.
+
+        Args:
+            self: TrajectoryTables object itself
+            map_key (object): The key of the map
+
+        Returns:
+            bool: Result of the map is or not registered
+        """
+        return map_key in self.maps
+
+    def prepare(self, map_key: object, antennas_coords: list):
+        """
+        Start the builds of the tables of the antennas not built yet (e.g. on each tick, with the current antennas of a session).
+
+        Args:
+            self: TrajectoryTables object itself
+            map_key (object): The key of the map
+            antennas_coords (list): Longitude and Latitude coordinates of the antennas
+        """
+        if map_key not in self.maps:
+            return
+        for antenna_coords in antennas_coords:
+            self.get_table(map_key, antenna_coords)
+
+    def get_table(self, map_key: object, antenna_coords: object) -> TrajectoryTable:
+        """
+        Get the table of an antenna on a map (if not ready, its build is started and None is returned).
+
+        Args:
+            self: TrajectoryTables object itself
+            map_key (object): The key of the map
+            antenna_coords (object): Longitude and Latitude coordinates of the antenna
+
+        Returns:
+            TrajectoryTable: The table of the antenna (or None, if not ready or the map is not registered)
+        """
+        if map_key not in self.maps:
+            return None
+
+        table_key = (map_key,) + tuple(np.round(np.asarray(antenna_coords, dtype=float), coordinates_precision).tolist())
+        with self.lock:
+            if table_key in self.tables:
+                self.tables.move_to_end(table_key)
+                return self.tables[table_key]
+            if table_key in self.building:
+                return None
+            self.building.add(table_key)
+
+        if not self.background:
+            return self._build_table(table_key)
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1)
+        self.executor.submit(self._build_table, table_key)
+        return None
+
+    def _build_table(self, table_key: tuple) -> TrajectoryTable:
+        map_key = table_key[0]
+        try:
+            table = TrajectoryTable(table_key[1:], self.maps[map_key], lambda lines: self.pool.count(map_key, lines))
+        except Exception as e:
+            print(f"Error on build of the trajectory table {table_key}:", e)
+            with self.lock:
+                self.building.discard(table_key)
+            return None
+
+        with self.lock:
+            self.tables[table_key] = table
+            self.building.discard(table_key)
+            while len(self.tables) > self.max_tables:
+                self.tables.popitem(last=False)
+        return table
+
+    def lookup(self, map_key: object, points_coords: np.ndarray, antennas_coords: np.ndarray) -> tuple:
+        """
+        Get the precomputed values of the lines of sight between all the points and all the antennas (from the ready tables).
+
+        Args:
+            self: TrajectoryTables object itself
+            map_key (object): The key of the map
+            points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points (Asset Points)
+            antennas_coords (np.ndarray): Array of shape (M, 2) with Longitude and Latitude of the Antennas
+
+        Returns:
+            tuple: (array of shape (N, M) with the distances, array of shape (N, M) with the wall intersections,
+                    -1 for the lines of sight not precomputed)
+        """
+        points = np.asarray(points_coords, dtype=float).reshape(-1, 2)
+        antennas = np.asarray(antennas_coords, dtype=float).reshape(-1, 2)
+        distances = np.zeros((len(points), len(antennas)))
+        wall_intersections = np.full((len(points), len(antennas)), -1, dtype=np.int64)
+
+        for antenna_index in range(len(antennas)):
+            table = self.get_table(map_key, antennas[antenna_index])
+            if table is not None:
+                distances[:, antenna_index], wall_intersections[:, antenna_index] = table.lookup(points)
+
+        return distances, wall_intersections
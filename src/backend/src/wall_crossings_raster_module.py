@@ -0,0 +1,311 @@
+# coding: utf-8
+"""
+
+## Wall Crossings Raster Module
+- WallCrossingsRaster class (precomputed wall crossings counter between the cells of the map and one static antenna)
+- WallCrossingsRasters class (rasters of the antennas by map, built in background, with an exact geometry fallback)
+
+The raster covers the map bounds of the config file (```map_min_long```, ```map_max_long```, ```map_min_lat```, ```map_max_lat```)
+and is set on the "map" section of the config file, e.g.:
+```"wall_crossings_raster": {"enabled": true, "resolution": 0.5}```
+where resolution is the size (in meters) of the raster cells.
+
+A raster cell is only served from the raster when the wall crossings counter is the same for every point of the cell
+(no wall passes through the cell, no wall end point lies between the cell and the antenna, no close intersections of
+the same map feature, and the counters of the cell corners and center match). The remaining cells (and the points out of the map bounds) use the exact geometry.
+
+The rasters are built one at a time in a background thread, the most recently requested first. A pending build not requested again
+since the previous build started (e.g. the previous positions of an antenna dragged on the map) is dropped.
+
+"""
+import math
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.backend.src.geometry_module import coordinates_precision, intersections_precision, build_lines_array, find_close_intersections
+from src.backend.src.spatial_index_module import GridIndex
+
+# Default size of the raster cells (in meters)
+default_raster_resolution = 0.5
+
+# Maximum amount of rasters kept in memory (the least recently used are dropped)
+default_max_rasters = 64
+
+# Distance (in degrees) between intersections of the same map feature that may merge (or split) on the rounding of the points,
+# for the positions of the lines of sight inside a cell
+close_intersections_tolerance = 2 * 10 ** -intersections_precision
+
+# Angular tolerance (in radians) of the wall end points test
+wedge_angle_tolerance = 1e-9
+
+class WallCrossingsRaster:
+    """
+    Raster with the wall crossings counter of the lines of sight between the center of each map cell and one antenna.
+    """
+    def __init__(self, antenna_coords: np.ndarray, map_bounds: tuple, walls_array: np.ndarray, walls_groups: np.ndarray, walls_index: object,
+                 count_function: object, raster_resolution: float = default_raster_resolution):
+        """
+        Initialize the WallCrossingsRaster class object (the raster is built on the initialization).
+
+        Args:
+            self: WallCrossingsRaster object itself
+            antenna_coords (np.ndarray): Longitude and Latitude coordinates of the antenna
+            map_bounds (tuple): Map bounds as (min_long, min_lat, max_long, max_lat)
+            walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+            walls_groups (np.ndarray): Array of shape (N,) with the map feature index of each wall
+            walls_index (object): Walls spatial index of the map (optional)
+            count_function (object): Function that counts the wall intersections of an array of lines of sight of shape (L, 4)
+            raster_resolution (float): Size of the raster cells (in meters)
+        """
+        self.antenna = np.round(np.asarray(antenna_coords, dtype=float).reshape(2), coordinates_precision)
+        walls_array = np.asarray(walls_array, dtype=float).reshape(-1, 4)
+
+        # raster cells are the cells of a walls grid index over the map bounds (cells crossed by walls are registered on it)
+        grid = GridIndex(walls_array, raster_resolution, map_bounds)
+        self.min_long, self.min_lat = grid.min_long, grid.min_lat
+        self.cell_long, self.cell_lat = grid.cell_long, grid.cell_lat
+        self.nr_cols, self.nr_rows = grid.nr_cols, grid.nr_rows
+        cells_with_walls = (np.diff(grid.cell_start) > 0).reshape(self.nr_rows, self.nr_cols)
+
+        # wall crossings counters of the cells corners and centers
+        corners_long = self.min_long + np.arange(self.nr_cols + 1) * self.cell_long
+        corners_lat = self.min_lat + np.arange(self.nr_rows + 1) * self.cell_lat
+        corners = np.stack(np.meshgrid(corners_long, corners_lat), axis=-1).reshape(-1, 2)
+        centers = np.stack(np.meshgrid(corners_long[:-1] + self.cell_long / 2, corners_lat[:-1] + self.cell_lat / 2), axis=-1).reshape(-1, 2)
+
+        lines_array = build_lines_array(np.concatenate((corners, centers)), self.antenna[None, :])
+        counters = np.asarray(count_function(lines_array))
+        corners_counters = counters[:len(corners)].reshape(self.nr_rows + 1, self.nr_cols + 1)
+        self.crossings = counters[len(corners):].reshape(self.nr_rows, self.nr_cols)
+
+        # lines of sight with intersections of the same map feature close enough to merge (or split) inside a cell
+        close = find_close_intersections(lines_array, walls_array, walls_groups, close_intersections_tolerance, walls_index)
+        corners_close = close[:len(corners)].reshape(self.nr_rows + 1, self.nr_cols + 1)
+
+        corners_match = ~close[len(corners):].reshape(self.nr_rows, self.nr_cols)
+        for row_offset, col_offset in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            corners_match &= corners_counters[row_offset:row_offset + self.nr_rows, col_offset:col_offset + self.nr_cols] == self.crossings
+            corners_match &= ~corners_close[row_offset:row_offset + self.nr_rows, col_offset:col_offset + self.nr_cols]
+
+        # cells served from the raster (the others use the exact geometry)
+        self.valid = corners_match & ~cells_with_walls & ~self._wall_ends_between(walls_array, corners_long, corners_lat)
+
+    def _wall_ends_between(self, walls_array: np.ndarray, corners_long: np.ndarray, corners_lat: np.ndarray) -> np.ndarray:
+        # cells with wall end points inside the wedge from the antenna to the cell (conservative angular and range test)
+        rows, cols = np.meshgrid(np.arange(self.nr_rows), np.arange(self.nr_cols), indexing="ij")
+        cell_corners = [np.stack((corners_long[cols + dc] - self.antenna[0], corners_lat[rows + dr] - self.antenna[1]), axis=-1)
+                        for dr, dc in ((0, 0), (0, 1), (1, 0), (1, 1))]
+        cell_corners = np.stack(cell_corners, axis=-2).reshape(-1, 4, 2)
+
+        # cells containing the antenna (wedge of all the directions)
+        contains_antenna = (cell_corners[:, 0, 0] <= 0) & (cell_corners[:, 3, 0] >= 0) & (cell_corners[:, 0, 1] <= 0) & (cell_corners[:, 3, 1] >= 0)
+
+        ends = np.unique(np.concatenate((walls_array[:, 0:2], walls_array[:, 2:4])), axis=0) - self.antenna
+        if len(ends) == 0:
+            return contains_antenna.reshape(self.nr_rows, self.nr_cols)
+        ends_angles = np.arctan2(ends[:, 1], ends[:, 0])
+        ends_ranges = np.hypot(ends[:, 0], ends[:, 1])
+        order = np.argsort(ends_angles)
+        # angles repeated over a second turn (wedges crossing the -pi/pi direction), range sentinel at the end
+        angles = np.concatenate((ends_angles[order], ends_angles[order] + 2 * math.pi))
+        ranges = np.concatenate((ends_ranges[order], ends_ranges[order], [math.inf]))
+
+        # angular interval and maximum range of each cell, seen from the antenna
+        center = cell_corners.mean(axis=1)
+        center_angle = np.arctan2(center[:, 1], center[:, 0])
+        corners_angles = np.arctan2(cell_corners[:, :, 1], cell_corners[:, :, 0]) - center_angle[:, None]
+        corners_angles = (corners_angles + math.pi) % (2 * math.pi) - math.pi
+        angle_start = center_angle + corners_angles.min(axis=1) - wedge_angle_tolerance
+        angle_end = center_angle + corners_angles.max(axis=1) + wedge_angle_tolerance
+        turns = np.floor((angle_start + math.pi) / (2 * math.pi))
+        angle_start -= turns * 2 * math.pi
+        angle_end -= turns * 2 * math.pi
+        max_range = np.hypot(cell_corners[:, :, 0], cell_corners[:, :, 1]).max(axis=1)
+
+        # minimum range of the wall end points inside the angular interval of each cell
+        start = np.searchsorted(angles, angle_start, side="left")
+        end = np.searchsorted(angles, angle_end, side="right")
+        min_range = np.minimum.reduceat(ranges, np.column_stack((start, end)).ravel())[::2]
+        min_range = np.where(end > start, min_range, math.inf)
+
+        return (contains_antenna | (min_range <= max_range)).reshape(self.nr_rows, self.nr_cols)
+
+    def lookup(self, points_coords: np.ndarray) -> np.ndarray:
+        """
+        Get the wall crossings counters of a set of points from the raster.
+
+        Args:
+            self: WallCrossingsRaster object itself
+            points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points
+
+        Returns:
+            np.ndarray: Array of shape (N,) with the wall crossings counters (-1 for the points that need the exact geometry)
+        """
+        points = np.round(np.asarray(points_coords, dtype=float).reshape(-1, 2), coordinates_precision)
+        cols = np.floor((points[:, 0] - self.min_long) / self.cell_long).astype(np.int64)
+        rows = np.floor((points[:, 1] - self.min_lat) / self.cell_lat).astype(np.int64)
+        inside = (cols >= 0) & (cols < self.nr_cols) & (rows >= 0) & (rows < self.nr_rows)
+
+        counters = np.full(len(points), -1, dtype=np.int64)
+        cols, rows = cols[inside], rows[inside]
+        counters[inside] = np.where(self.valid[rows, cols], self.crossings[rows, cols], -1)
+
+        return counters
+
+class WallCrossingsRasters:
+    """
+    Wall crossings rasters of the antennas by map.
+
+    The raster of an antenna (new or moved) is built in background, and meanwhile its lines of sight use the exact geometry.
+    The pending builds of the positions no longer requested (e.g. of a moving antenna) are dropped.
+    """
+    def __init__(self, wall_intersections_pool: object, max_rasters: int = default_max_rasters, background: bool = True):
+        """
+        Initialize the WallCrossingsRasters class object.
+
+        Args:
+            self: WallCrossingsRasters object itself
+            wall_intersections_pool (object): WallIntersectionsPool used for the exact geometry (and to build the rasters)
+            max_rasters (int): Maximum amount of rasters kept in memory
+            background (bool): Build the rasters in a background thread (or on the calling thread)
+        """
+        self.pool = wall_intersections_pool
+        self.max_rasters = max_rasters
+        self.background = background
+        self.maps = {}
+        self.rasters = OrderedDict()
+        self.pending = OrderedDict()
+        self.builder = None
+        self.lock = threading.Lock()
+
+    def register_map(self, map_key: object, map_config: dict, walls_array: np.ndarray, walls_groups: np.ndarray, walls_index: object = None):
+        """
+        Register a map, as set on the "wall_crossings_raster" config parameters of the map (disabled by default: the maps without the
+        parameters, or without the map bounds, always use the exact geometry).
+
+        Args:
+            self: WallCrossingsRasters object itself
+            map_key (object): The key of the map (the same key of the map on the WallIntersectionsPool)
+            map_config (dict): The "map" section of the config file
+            walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+            walls_groups (np.ndarray): Array of shape (N,) with the map feature index of each wall
+            walls_index (object): Walls spatial index of the map (optional)
+        """
+        raster_params = map_config.get("wall_crossings_raster", {})
+        if not raster_params.get("enabled", False):
+            return
+        missing_bounds = [key for key in ("map_min_long", "map_min_lat", "map_max_long", "map_max_lat") if key not in map_config]
+        if len(missing_bounds) > 0:
+            print(f"Wall crossings rasters disabled on map {map_key}: missing map bounds {', '.join(missing_bounds)} (exact geometry is used)")
+            return
+
+        map_bounds = (map_config["map_min_long"], map_config["map_min_lat"], map_config["map_max_long"], map_config["map_max_lat"])
+        with self.lock:
+            self.maps[map_key] = (map_bounds, walls_array, walls_groups, walls_index, raster_params.get("resolution", default_raster_resolution))
+
+    def has_map(self, map_key: object) -> bool:
+        """
+        Check if a map is already registered.
+
+        Args:
+            self: WallCrossingsRasters object itself
+            map_key (object): The key of the map
+
+        Returns:
+            bool: Result of the map is or not registered
+        """
+        return map_key in self.maps
+
+    def get_raster(self, map_key: object, antenna_coords: np.ndarray) -> WallCrossingsRaster:
+        """
+        Get the raster of an antenna on a map (if not ready, its build is started and None is returned).
+
+        Args:
+            self: WallCrossingsRasters object itself
+            map_key (object): The key of the map
+            antenna_coords (np.ndarray): Longitude and Latitude coordinates of the antenna
+
+        Returns:
+            WallCrossingsRaster: The raster of the antenna (or None, if not ready or the map is not registered)
+        """
+        if map_key not in self.maps:
+            return None
+
+        raster_key = (map_key,) + tuple(np.round(np.asarray(antenna_coords, dtype=float), coordinates_precision).tolist())
+        with self.lock:
+            if raster_key in self.rasters:
+                self.rasters.move_to_end(raster_key)
+                return self.rasters[raster_key]
+            if self.background:
+                # (re)queue the build as the most recently requested one
+                self.pending[raster_key] = time.monotonic()
+                self.pending.move_to_end(raster_key)
+                if self.builder is None:
+                    self.builder = threading.Thread(target=self._build_pending, daemon=True)
+                    self.builder.start()
+                return None
+
+        return self._build_raster(raster_key)
+
+    def _build_pending(self):
+        # build the pending rasters (the most recently requested first), dropping the ones not requested again since the previous build
+        last_build_start = -math.inf
+        while True:
+            with self.lock:
+                for raster_key in [key for key, requested in self.pending.items() if requested < last_build_start]:
+                    del self.pending[raster_key]
+                if len(self.pending) == 0:
+                    self.builder = None
+                    return
+                raster_key, _ = self.pending.popitem(last=True)
+            last_build_start = time.monotonic()
+            self._build_raster(raster_key)
+
+    def _build_raster(self, raster_key: tuple) -> WallCrossingsRaster:
+        map_key = raster_key[0]
+        map_bounds, walls_array, walls_groups, walls_index, raster_resolution = self.maps[map_key]
+        try:
+            raster = WallCrossingsRaster(raster_key[1:], map_bounds, walls_array, walls_groups, walls_index,
+                                         lambda lines: self.pool.count(map_key, lines), raster_resolution)
+        except Exception as e:
+            print(f"Error on build of the wall crossings raster {raster_key}:", e)
+            return None
+
+        with self.lock:
+            self.rasters[raster_key] = raster
+            self.pending.pop(raster_key, None)
+            while len(self.rasters) > self.max_rasters:
+                self.rasters.popitem(last=False)
+        return raster
+
+    def count(self, map_key: object, points_coords: np.ndarray, antennas_coords: np.ndarray) -> np.ndarray:
+        """
+        Count the wall intersections of the lines of sight between all the points and all the antennas,
+        from the antennas rasters (when ready) and with the exact geometry for the remaining lines of sight.
+
+        Args:
+            self: WallCrossingsRasters object itself
+            map_key (object): The key of the map
+            points_coords (np.ndarray): Array of shape (N, 2) with Longitude and Latitude of the points (Asset Points or Anchors)
+            antennas_coords (np.ndarray): Array of shape (M, 2) with Longitude and Latitude of the Antennas
+
+        Returns:
+            np.ndarray: Array of shape (N, M) with the wall intersections counter by line of sight
+        """
+        points = np.asarray(points_coords, dtype=float).reshape(-1, 2)
+        antennas = np.asarray(antennas_coords, dtype=float).reshape(-1, 2)
+        counters = np.full((len(points), len(antennas)), -1, dtype=np.int64)
+
+        for antenna_index in range(len(antennas)):
+            raster = self.get_raster(map_key, antennas[antenna_index])
+            if raster is not None:
+                counters[:, antenna_index] = raster.lookup(points)
+
+        # exact geometry for the lines of sight not served by the rasters
+        points_index, antennas_index = np.nonzero(counters < 0)
+        if len(points_index) > 0:
+            lines_array = np.round(np.column_stack((points[points_index], antennas[antennas_index])), coordinates_precision)
+            counters[points_index, antennas_index] = self.pool.count(map_key, lines_array)
+
+        return counters
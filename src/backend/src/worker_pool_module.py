@@ -0,0 +1,145 @@
+# coding: utf-8
+"""
+
+## Worker Pool Module
+- WallIntersectionsPool class (long-lived process pool that counts the wall intersections of the lines of sight)
+
+The walls geometry of each map is loaded by each worker process on its first task of the map (memory-mapped from the
+compiled map artifact), so the tasks only carry the artifact path and the lines of sight of the tick, and a new map
+is registered without restarting the worker processes.
+The amount of worker processes can be set with the environment variable ```BACKEND_NUM_CORES```
+(by default, the number of CPUs of the machine).
+
+"""
+import os
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.backend.src.geometry_module import count_wall_intersections
+from src.backend.src.map_artifacts_module import load_map_artifact
+from src.backend.src.spatial_index_module import load_walls_index
+
+# Default amount of worker processes
+default_num_cores = int(os.environ.get("BACKEND_NUM_CORES", os.cpu_count() or 1))
+
+# Minimum amount of lines of sight in a batch to split it by the worker processes (smaller batches run serially)
+default_parallel_min_lines = int(os.environ.get("BACKEND_PARALLEL_MIN_LINES", 2000))
+
+# Walls geometry of the maps loaded in a worker process by artifact path {artifact_path: (walls_array, walls_groups, walls_index)}
+_worker_maps = {}
+
+# Get the walls geometry of a map in a worker process (loaded from its artifact on the first task of the map)
+def _load_worker_map(map_source: object) -> tuple:
+    # maps registered without an artifact carry their walls geometry on the tasks
+    if not isinstance(map_source, str):
+        return map_source
+    if map_source not in _worker_maps:
+        arrays = load_map_artifact(map_source)
+        _worker_maps[map_source] = (arrays["walls_array"], arrays["walls_groups"], load_walls_index(arrays))
+    return _worker_maps[map_source]
+
+# Worker process task: count the wall intersections of a chunk of lines of sight
+def _count_chunk(map_source: object, lines_array: np.ndarray) -> np.ndarray:
+    walls_array, walls_groups, walls_index = _load_worker_map(map_source)
+    return count_wall_intersections(lines_array, walls_array, walls_groups, walls_index)
+
+class WallIntersectionsPool:
+    """
+    Long-lived process pool to count the wall intersections of all the lines of sight of a tick in one batch.
+    """
+    def __init__(self, num_cores: int = default_num_cores, parallel_min_lines: int = default_parallel_min_lines):
+        """
+        Initialize the WallIntersectionsPool class object (worker processes are started on the first parallel batch).
+
+        Args:
+            self: WallIntersectionsPool object itself
+            num_cores (int): Amount of worker processes
+            parallel_min_lines (int): Minimum amount of lines of sight in a batch to split it by the worker processes
+        """
+        self.num_cores = max(1, int(num_cores))
+        self.parallel_min_lines = parallel_min_lines
+        self.maps = {}
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def register_map(self, map_key: object, walls_array: np.ndarray, walls_groups: np.ndarray, walls_index: object = None,
+                     artifact_path: str = None):
+        """
+        Register the walls geometry of a map (the running worker processes load it on their first task of the map).
+
+        Args:
+            self: WallIntersectionsPool object itself
+            map_key (object): The key of the map (e.g. the map id)
+            walls_array (np.ndarray): Array of shape (N, 4) with the walls line segments
+            walls_groups (np.ndarray): Array of shape (N,) with the map feature index of each wall
+            walls_index (object): Walls spatial index of the map (optional)
+            artifact_path (str): Path of the compiled map artifact the walls geometry was loaded from
+                                 (without an artifact, the walls geometry is sent on each task of the worker processes)
+        """
+        with self.lock:
+            self.maps[map_key] = (walls_array, walls_groups, walls_index, artifact_path)
+
+    def has_map(self, map_key: object) -> bool:
+        """
+        Check if the walls geometry of a map is already registered.
+
+        Args:
+            self: WallIntersectionsPool object itself
+            map_key (object): The key of the map
+
+        Returns:
+            bool: Result of the map is or not registered
+        """
+        with self.lock:
+            return map_key in self.maps
+
+    # Get the worker processes (started on the first parallel batch), called with the lock held
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.num_cores, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def count(self, map_key: object, lines_array: np.ndarray) -> np.ndarray:
+        """
+        Count the wall intersections of a batch of lines of sight on a map.
+
+        Small batches (or a pool with a single core) run serially on the calling thread,
+        larger batches are split in chunks by the worker processes.
+
+        Args:
+            self: WallIntersectionsPool object itself
+            map_key (object): The key of the map
+            lines_array (np.ndarray): Array of shape (L, 4) with the lines of sight line segments
+
+        Returns:
+            np.ndarray: Array of shape (L,) with the wall intersections counter by line of sight
+        """
+        with self.lock:
+            walls_array, walls_groups, walls_index, artifact_path = self.maps[map_key]
+
+            # the chunks are submitted with the lock held, so a shutdown can not stop the executor between its get and the submits
+            if self.num_cores > 1 and len(lines_array) >= self.parallel_min_lines:
+                executor = self._get_executor()
+                map_source = artifact_path if artifact_path is not None else (walls_array, walls_groups, walls_index)
+                chunks = np.array_split(lines_array, self.num_cores)
+                futures = [executor.submit(_count_chunk, map_source, chunk) for chunk in chunks if len(chunk) > 0]
+            else:
+                futures = None
+
+        if futures is None:
+            return count_wall_intersections(lines_array, walls_array, walls_groups, walls_index)
+
+        return np.concatenate([future.result() for future in futures])
+
+    def shutdown(self):
+        """
+        Stop the worker processes.
+
+        Args:
+            self: WallIntersectionsPool object itself
+        """
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
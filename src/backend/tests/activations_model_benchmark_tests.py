@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src import activations_module
+from src.backend.src.activations_module import ActivationsModel, load_activations_model
+
+# check the fitted activations model reproduces exponential_regression_1D_array (same noise seed), and compare timings,
+# and check the round trip of the parameters file (saved on the first load of a dataset, and loaded without fitting again)
+# run from the repository root: python -m src.backend.tests.activations_model_benchmark_tests
+
+if __name__ == "__main__":
+    with open("src/static-files/antenna_datasets/antenna_experimental_dataset_10m.csv") as file:
+        dataset = file.read()
+
+    # experimental data structures of the first message on calculate
+    antenna_dict = agent.csv_to_dict(dataset.splitlines())
+    antenna_list_avg_values = agent.csv_to_avg_list(dataset.splitlines())
+    antenna_experimental_distances = np.array(list(antenna_dict.keys()), float)
+    antenna_experimental_values = np.array(list(antenna_list_avg_values.values()), float)
+    stdev_mean_dict = agent.dict_mean_std(antenna_dict)
+
+    t_start = time.perf_counter()
+    model = ActivationsModel.fit(dataset)
+    t_fit = time.perf_counter() - t_start
+
+    # distances of the lines of sight (rounded to 2 decimal places), plus some not on the lookup table steps
+    rng = np.random.default_rng(0)
+    distances = np.round(rng.uniform(0, 10, 1000), 2).tolist() + [0.0, 0.5, 10.0, 0.123, 3.4567]
+
+    np.random.seed(0)
+    t_start = time.perf_counter()
+    expected = [agent.exponential_regression_1D_array(distance, antenna_experimental_distances, antenna_experimental_values, stdev_mean_dict)
+                for distance in distances]
+    t_regression = time.perf_counter() - t_start
+
+    np.random.seed(0)
+    t_start = time.perf_counter()
+    result = model.evaluate(distances)
+    t_model = time.perf_counter() - t_start
+
+    mismatches = [i for i in range(len(distances)) if expected[i] != result[i]]
+    print(f"distances: {len(distances)} | fit: {t_fit * 1000:.2f} ms | regression by distance: {t_regression:.3f} s | "
+          f"model: {t_model * 1000:.3f} ms | speedup: {t_regression / t_model:.1f}x | mismatches: {len(mismatches)}")
+    for i in mismatches:
+        print("distance:", distances[i], "| regression:", expected[i], "| model:", result[i])
+
+    with tempfile.TemporaryDirectory() as params_dir:
+        params_path = os.path.join(params_dir, "dataset.activations.npz")
+        activations_module._activations_models.clear()
+        saved = load_activations_model(dataset, params_path)
+
+        # a new process: the model is loaded from the parameters file (not fitted again)
+        activations_module._activations_models.clear()
+        t_start = time.perf_counter()
+        loaded = load_activations_model(dataset, params_path)
+        t_load = time.perf_counter() - t_start
+
+        np.random.seed(0)
+        saved_result = saved.evaluate(distances)
+        np.random.seed(0)
+        loaded_result = loaded.evaluate(distances)
+        same_model = (loaded is not saved and loaded.dataset_key == saved.dataset_key and np.array_equal(loaded.params, saved.params) and
+                      np.array_equal(loaded.lookup_means, saved.lookup_means) and loaded_result == saved_result)
+
+        # a changed dataset is fitted again (the parameters file is of the previous dataset)
+        activations_module._activations_models.clear()
+        changed = load_activations_model(dataset + "\n", params_path)
+        refitted = changed.dataset_key != saved.dataset_key and ActivationsModel.load(params_path).dataset_key == changed.dataset_key
+
+    print(f"parameters file: load {t_load * 1000:.2f} ms (fit {t_fit * 1000:.2f} ms) | same model: {same_model} | refitted on dataset change: {refitted}")
+
+    if len(mismatches) > 0 or not same_model or not refitted:
+        sys.exit(1)
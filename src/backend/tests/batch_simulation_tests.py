@@ -0,0 +1,41 @@
+import os
+import sys
+import csv
+import time
+import tempfile
+from src.backend.src import main_agent_module as agent
+from src.backend.src import batch_simulation_module as batch
+
+# check of the headless batch simulation (datasets with the columns of the csv listener clients, same rows with a fixed seed)
+# and throughput of the dataset generation (rows by second, time estimation of a 100k rows dataset)
+# run from the repository root: python -m src.backend.tests.batch_simulation_tests [nr_rows]
+
+config_file = "src/static-files/config_files/config-params-library-ua-floor2.json"
+
+# rows of a csv file
+def read_rows(file_name: str) -> list:
+    with open(file_name) as file:
+        return list(csv.reader(file))
+
+if __name__ == "__main__":
+    nr_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    scene = batch.load_scene(config_file, [1])
+    output_dir = tempfile.mkdtemp()
+
+    results = {}
+    for features in ("rssi", "activations", "rssi"):
+        output_file = os.path.join(output_dir, f"{features}_{len(results)}.csv")
+        t_start = time.perf_counter()
+        batch.simulate(batch.load_scene(config_file, [1]), features, nr_rows, output_file, seed=42)
+        t_total = time.perf_counter() - t_start
+        rows = read_rows(output_file)
+        widths = {len(row) for row in rows}
+        print(f"{features}: {len(rows) - 1} rows | columns: {len(rows[0])} (same columns of the rows: {widths == {len(rows[0])}}) | "
+              f"{(len(rows) - 1) / t_total:.0f} rows/s (100k rows: {100000 / ((len(rows) - 1) / t_total) / 60:.1f} min)")
+        results[len(results)] = rows
+
+    print(f"rssi header: {results[0][0] == batch.rssi_header(len(scene['antennas']))} | "
+          f"activations header: {results[1][0] == batch.activations_header(1, len(scene['anchors']), len(scene['antennas']))} | "
+          f"same rows with a fixed seed: {results[0] == results[2]}")
+
+    agent.wall_intersections_pool.shutdown()
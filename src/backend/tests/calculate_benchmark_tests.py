@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import itertools
+import subprocess
+import tempfile
+import numpy as np
+from datetime import datetime
+from src.backend.src import main_agent_module as agent
+from src.backend.src.map_artifacts_module import MapArtifacts
+
+# benchmark suite of the calculate pipeline with synthetic scenes: floorplans of rooms (by amount of walls) and random
+# antennas, anchors and asset points, in rssi or activations features; calculate is driven through a fake MQTT client
+# and the latency percentiles by stage and the ticks per second of each scene can be saved as JSON (to compare versions)
+# run from the repository root: python -m src.backend.tests.calculate_benchmark_tests [--walls 200 2000] [--output results.json] [--baseline old.json]
+
+# center and size (meters) of the synthetic floorplans
+map_center = (-8.659912, 40.631228)
+map_size = 80.0
+# walls filters of the synthetic floorplans
+walls_keyword, walls_level = "wall", 0
+# first map id of the synthetic floorplans
+first_map_id = 100
+# latency percentiles of the stages
+percentiles = (50, 90, 99)
+# ratio of the tick latency (p50) to a baseline reported as a regression
+regression_ratio = 1.2
+
+class BenchmarkClient:
+    def publish(self, topic: str, payload: str):
+        pass
+
+# meters to degrees of longitude and latitude (at the map center)
+def meters_to_degrees(meters: float) -> tuple:
+    return meters / (111320.0 * math.cos(math.radians(map_center[1]))), meters / 110574.0
+
+# random coordinates inside the synthetic floorplan
+def random_coords(rng: np.random.Generator, size: int) -> np.ndarray:
+    dlng, dlat = meters_to_degrees(map_size / 2)
+    return np.column_stack((rng.uniform(map_center[0] - dlng, map_center[0] + dlng, size), rng.uniform(map_center[1] - dlat, map_center[1] + dlat, size)))
+
+# synthetic floorplan: grid of rooms (4 walls by room) with a gap between the rooms
+def synthetic_floorplan(nr_walls: int) -> dict:
+    nr_rooms = max(1, math.ceil(nr_walls / 4))
+    nr_cols = math.ceil(math.sqrt(nr_rooms))
+    cell_lng, cell_lat = meters_to_degrees(map_size / nr_cols)
+    min_lng, min_lat = map_center[0] - cell_lng * nr_cols / 2, map_center[1] - cell_lat * nr_cols / 2
+    features = []
+    for room in range(nr_rooms):
+        lng, lat = min_lng + (room % nr_cols) * cell_lng, min_lat + (room // nr_cols) * cell_lat
+        ring = [[lng + cell_lng * x, lat + cell_lat * y] for x, y in ((0.1, 0.1), (0.9, 0.1), (0.9, 0.9), (0.1, 0.9), (0.1, 0.1))]
+        features.append({"type": "Feature", "properties": {"id": room + 1, "name": f"room-{walls_keyword}", "type": "polygon", "level": str(walls_level)},
+                         "geometry": {"type": "Polygon", "coordinates": [ring]}})
+    return {"type": "FeatureCollection", "features": features}
+
+# synthetic config file of a floorplan (exact walls geometry: no wall crossings rasters, trajectories or quantization)
+def synthetic_config(map_path: str, features: str) -> dict:
+    dlng, dlat = meters_to_degrees(map_size / 2)
+    return {"map": {"map_url": f"../static-files/{map_path}", "filter_walls_keywords": [walls_keyword], "filter_walls_levels": [walls_level],
+                    "walls_spatial_index": {"type": "grid", "grid_resolution": 2}, "wall_crossings_raster": {"enabled": False},
+                    "position_quantization": {"enabled": False}, "trajectory_precomputation": {"enabled": False},
+                    "map_center": list(map_center), "map_min_long": map_center[0] - dlng, "map_max_long": map_center[0] + dlng,
+                    "map_min_lat": map_center[1] - dlat, "map_max_lat": map_center[1] + dlat},
+            "features": features}
+
+# static files of the synthetic floorplans (config files and maps), with the map id of each (walls, features) floorplan
+def write_static_files(static_files_dir: str, walls_counts: list, features_types: list) -> dict:
+    os.makedirs(os.path.join(static_files_dir, "config_files"))
+    os.makedirs(os.path.join(static_files_dir, "geojson_objs"))
+    shutil.copytree("src/static-files/antenna_datasets", os.path.join(static_files_dir, "antenna_datasets"))
+    map_ids = {}
+    for nr_walls, features in itertools.product(walls_counts, features_types):
+        map_path = f"geojson_objs/synthetic_{nr_walls}_walls.geojson"
+        with open(os.path.join(static_files_dir, map_path), "w") as file:
+            json.dump(synthetic_floorplan(nr_walls), file)
+        config_file = f"config-params-synthetic-{nr_walls}-walls-{features}.json"
+        with open(os.path.join(static_files_dir, "config_files", config_file), "w") as file:
+            json.dump(synthetic_config(map_path, features), file)
+        map_ids[(nr_walls, features)] = first_map_id + len(map_ids)
+        agent.config_files_by_map_id[map_ids[(nr_walls, features)]] = config_file
+    return map_ids
+
+# run a scene: first tick (map context and all the entities), then ticks with a fraction of the asset points moved (random walk)
+def run_scene(scene: dict, map_id: int, nr_ticks: int, moved_fraction: float, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    session_uuid = "benchmark-" + "-".join(f"{key}{value}" for key, value in scene.items())
+    client = BenchmarkClient()
+    antennas = [{"LongLat": coords.tolist(), "DirOpen": [float(direction), 120], "TxPower": 300}
+                for coords, direction in zip(random_coords(rng, scene["antennas"]), rng.uniform(-180, 180, scene["antennas"]))]
+    anchors = [{"LongLat": coords.tolist()} for coords in random_coords(rng, scene["anchors"])]
+    ap_coords = random_coords(rng, scene["asset_points"])
+
+    agent.god.setStatus("open", session_uuid)
+    agent.god.setMapId(map_id, session_uuid)
+    agent.god.updateAntenna(antennas, session_uuid)
+    agent.god.updateAnchor(anchors, session_uuid)
+    agent.god.setAlgorithms(["all"], session_uuid)
+    agent.god.setRssiParams({"tx": -20, "ple(n)": 2.4, "cf": 3, "skew": 9.6, "d0": 1, "af": 1}, session_uuid)
+
+    step_lng, step_lat = meters_to_degrees(0.5)
+    samples, counts = {}, {}
+    t_first, t_ticks = 0.0, 0.0
+    for tick in range(nr_ticks + 1):
+        if tick > 0:
+            moved = rng.random(len(ap_coords)) < moved_fraction
+            ap_coords[moved] += rng.normal(0, 1, (int(moved.sum()), 2)) * (step_lng, step_lat)
+        agent.god.updateAssetPoint([{"LongLat": [round(float(lng), 8), round(float(lat), 8)], "LargeDirOpen": [0, 360], "SmallDirOpen": [0, 0]}
+                                    for lng, lat in ap_coords], session_uuid)
+        t_start = time.perf_counter()
+        agent.calculate(client, session_uuid, agent.calculate_cache)
+        t_tick = time.perf_counter() - t_start
+        # samples of the stages run on the tick (the first tick is reported apart)
+        for stage, stats in agent.stage_timings.get_stats(session_uuid).items():
+            if stats["count"] > counts.get(stage, 0) and tick > 0:
+                samples.setdefault(stage, []).append(stats["last_ms"])
+            counts[stage] = stats["count"]
+        if tick == 0:
+            t_first = t_tick
+        else:
+            t_ticks += t_tick
+
+    agent.god.setStatus("close", session_uuid)
+    agent.calculate(client, session_uuid, agent.calculate_cache)
+
+    return {"scene": scene, "compiled_walls": len(agent.map_contexts.get(map_id).walls_array), "first_tick_ms": round(t_first * 1000, 3), "ticks": nr_ticks, "ticks_per_second": round(nr_ticks / t_ticks, 2),
+            "stages": {stage: dict({f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in percentiles},
+                                   mean_ms=round(float(np.mean(values)), 3), max_ms=round(float(np.max(values)), 3)) for stage, values in samples.items()}}
+
+# metadata of the run (to compare the results of different versions)
+def run_metadata(args: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"date": datetime.now().isoformat(timespec="seconds"), "commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "num_cores": agent.wall_intersections_pool.num_cores,
+            "ticks": args.ticks, "moved_fraction": args.moved_fraction, "seed": args.seed}
+
+# tick latency (p50) of the scenes compared with a baseline results file
+def compare_with_baseline(results: list, baseline_file: str):
+    with open(baseline_file) as file:
+        baseline = {json.dumps(result["scene"], sort_keys=True): result for result in json.load(file)["results"]}
+    for result in results:
+        base = baseline.get(json.dumps(result["scene"], sort_keys=True))
+        if base is None or "tick" not in base["stages"]:
+            continue
+        ratio = result["stages"]["tick"]["p50_ms"] / base["stages"]["tick"]["p50_ms"]
+        print(f"{result['scene']}: tick p50 {base['stages']['tick']['p50_ms']:.2f} -> {result['stages']['tick']['p50_ms']:.2f} ms ({ratio:.2f}x)"
+              + (" REGRESSION" if ratio > regression_ratio else ""))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite of the calculate pipeline with synthetic scenes")
+    parser.add_argument("--walls", type=int, nargs="+", default=[200, 2000], help="amounts of walls of the floorplans")
+    parser.add_argument("--antennas", type=int, nargs="+", default=[4, 16], help="amounts of antennas")
+    parser.add_argument("--asset-points", type=int, nargs="+", default=[10, 200], help="amounts of asset points")
+    parser.add_argument("--anchors", type=int, nargs="+", default=[10], help="amounts of anchors")
+    parser.add_argument("--features", choices=("rssi", "activations"), nargs="+", default=["rssi", "activations"], help="features of the floorplans")
+    parser.add_argument("--ticks", type=int, default=20, help="measured ticks by scene (after the first tick)")
+    parser.add_argument("--moved-fraction", type=float, default=0.1, help="fraction of the asset points moved on each tick")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the scenes and of the noise")
+    parser.add_argument("--output", help="JSON file of the results (not saved by default)")
+    parser.add_argument("--baseline", help="JSON results file of a previous version to compare with")
+    args = parser.parse_args()
+
+    # static files of the synthetic floorplans (and their map artifacts) on a temporary directory
+    tmp_dir = tempfile.mkdtemp()
+    map_ids = write_static_files(os.path.join(tmp_dir, "static-files"), args.walls, args.features)
+    agent.host_domain_name_server = "file://" + tmp_dir
+    agent.map_artifacts = MapArtifacts(os.path.join(tmp_dir, "map_artifacts"))
+    agent.noise_generators = agent.NoiseGenerators(args.seed)
+    agent.god = agent.GOD()
+
+    results = []
+    for nr_walls, features, nr_antennas, nr_asset_points, nr_anchors in itertools.product(args.walls, args.features, args.antennas, args.asset_points, args.anchors):
+        scene = {"walls": nr_walls, "features": features, "antennas": nr_antennas, "asset_points": nr_asset_points, "anchors": nr_anchors}
+        result = run_scene(scene, map_ids[(nr_walls, features)], args.ticks, args.moved_fraction, args.seed)
+        results.append(result)
+        tick = result["stages"]["tick"]
+        print(f"walls: {nr_walls:5d} | {features:11s} | antennas: {nr_antennas:3d} | asset points: {nr_asset_points:5d} | anchors: {nr_anchors:3d} | "
+              f"first tick: {result['first_tick_ms']:8.1f} ms | tick p50 / p90 / p99: {tick['p50_ms']:7.2f} / {tick['p90_ms']:7.2f} / {tick['p99_ms']:7.2f} ms | "
+              f"{result['ticks_per_second']:7.1f} ticks/s")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"metadata": run_metadata(args), "results": results}, file, indent=2)
+        print(f"results: {args.output}")
+    if args.baseline:
+        compare_with_baseline(results, args.baseline)
+
+    agent.wall_intersections_pool.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,55 @@
+import time
+import threading
+from src.backend.src import main_agent_module as agent
+from src.backend.src.scheduler_module import SessionScheduler
+
+# check the coalescing of the pending partial updates of a session falling behind: the full updates and the status
+# transitions are all processed, in order, and the final state is the same of processing every message
+# run from the repository root: python -m src.backend.tests.coalescing_tests
+
+nr_partial_updates = 200
+process_time = 0.005
+
+# messages of a session: full update, partial updates (asset points and sometimes antennas), full update, ..., close
+def session_messages() -> list:
+    messages = []
+    for index in range(nr_partial_updates):
+        if index % 50 == 0:
+            messages.append({"uuid": "s1", "status": "open", "map": 0, "ant": [index], "ap": [index], "read_rate": 1000})
+        messages.append({"uuid": "s1", "status": "open", "ap": [index]})
+        if index % 7 == 0:
+            messages.append({"uuid": "s1", "status": "open", "ant": [index]})
+    messages.append({"uuid": "s1", "status": "close"})
+    return messages
+
+if __name__ == "__main__":
+    for coalesce_function in (None, agent.coalescePartialUpdates):
+        processed = []
+        state = {}
+
+        def process(session_uuid: str, item: tuple):
+            processed.append(item[1])
+            state.update(item[1])
+            time.sleep(process_time)
+
+        scheduler = SessionScheduler(process, lambda session_uuid: 0, num_workers=2, coalesce_function=coalesce_function)
+        messages = session_messages()
+        expected_state = {}
+        for message in messages:
+            expected_state.update(message)
+
+        t_start = time.monotonic()
+        scheduler.start()
+        for message in messages:
+            scheduler.put("s1", (None, message))
+        while scheduler.get_queue_depth() > 0 or len(processed) + scheduler.get_coalesced_count() < len(messages):
+            time.sleep(0.001)
+        scheduler.stop()
+        t_total = time.monotonic() - t_start
+
+        full_updates = [message for message in messages if "map" in message]
+        kept_full_updates = [message for message in processed if "map" in message] == full_updates
+        kept_close = processed[-1] == messages[-1]
+        print(f"coalescing: {coalesce_function is not None!s:5} | messages: {len(messages)} | processed: {len(processed)} | "
+              f"coalesced: {scheduler.get_coalesced_count()} | full updates kept: {kept_full_updates} | close kept: {kept_close} | "
+              f"same final state: {state == expected_state} | time: {t_total:.2f} s")
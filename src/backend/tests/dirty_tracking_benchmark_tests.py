@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+from src.backend.src import main_agent_module as agent
+
+# benchmark of the per entity dirty tracking of calculate with 1k animated asset points: time by tick as a function
+# of the fraction of asset points moved on each tick (only the moved asset points are recomputed), and with one antenna
+# moved on each tick (only the column of the moved antenna is recomputed), with the mean time of the calculate stages
+# (the cache lookups of the hit path, and the geometry run only on the cache misses), and checks that a moved antenna misses
+# only its column of the calculate_cache (exits with an error otherwise)
+# run from the repository root: python -m src.backend.tests.dirty_tracking_benchmark_tests
+
+nr_asset_points = 1000
+nr_ticks = 5
+moved_fractions = (0.0, 0.01, 0.1, 1.0)
+geojson_objs = "src/static-files/geojson_objs/library_ua_floor2"
+
+# mean time (ms) of the main calculate stages of the session
+def stages_summary(session_uuid: str) -> str:
+    stats = agent.stage_timings.get_stats(session_uuid)
+    return " | ".join(f"{stage}: {stats[stage]['mean_ms']:7.2f} ms" for stage in ("ap_cache", "ap_geometry", "rssi_activations") if stage in stats)
+
+class BenchmarkClient:
+    def publish(self, topic: str, payload: str):
+        pass
+
+# features of a geojson file
+def read_features(file_name: str) -> list:
+    with open(os.path.join(geojson_objs, file_name)) as file:
+        return json.load(file)["features"]
+
+# asset points message data at random coordinates
+def random_asset_points(rng: np.random.Generator, size: int) -> list:
+    coords = np.column_stack((rng.uniform(-8.66032, -8.65949, size), rng.uniform(40.63087, 40.63157, size)))
+    return [{"LongLat": [round(float(lng), 8), round(float(lat), 8)], "LargeDirOpen": [0, 360], "SmallDirOpen": [0, 0]} for lng, lat in coords]
+
+if __name__ == "__main__":
+    # read the static files from the local repository
+    agent.host_domain_name_server = "file://" + os.path.abspath("src")
+    agent.god = agent.GOD()
+    session_uuid = "benchmark"
+    rng = np.random.default_rng(0)
+    client = BenchmarkClient()
+
+    antennas = [{"LongLat": feature["geometry"]["coordinates"], "DirOpen": [feature["properties"]["angle_direction"], feature["properties"]["angle_opening"]],
+                 "TxPower": feature["properties"]["tx_power"]} for feature in read_features("library_ua_floor2_antennas.geojson")]
+    anchors = [{"LongLat": feature["geometry"]["coordinates"]} for feature in read_features("library_ua_floor2_anchors.geojson")]
+    asset_points = random_asset_points(rng, nr_asset_points)
+
+    agent.god.setStatus("open", session_uuid)
+    agent.god.setMapId(0, session_uuid)
+    agent.god.updateAntenna(antennas, session_uuid)
+    agent.god.updateAnchor(anchors, session_uuid)
+    agent.god.setAlgorithms(["all"], session_uuid)
+    agent.god.setRssiParams({"tx": -20, "ple(n)": 2.4, "cf": 3, "skew": 9.6, "d0": 1, "af": 1}, session_uuid)
+    agent.god.updateAssetPoint(asset_points, session_uuid)
+
+    # first tick (map context and all the asset points), and wait for the wall crossings rasters of the antennas (if enabled on the map)
+    agent.calculate(client, session_uuid, agent.calculate_cache)
+    for antenna in agent.coords_to_array(list(agent.god.getAntennas(session_uuid).values())) if agent.wall_crossings_rasters.has_map(0) else []:
+        while agent.wall_crossings_rasters.get_raster(0, antenna) is None:
+            time.sleep(0.05)
+
+    for moved_fraction in moved_fractions:
+        timings = []
+        agent.stage_timings.remove_session(session_uuid)
+        for tick in range(nr_ticks):
+            moved = rng.choice(nr_asset_points, int(nr_asset_points * moved_fraction), replace=False)
+            for index, asset_point in zip(moved, random_asset_points(rng, len(moved))):
+                asset_points[index] = asset_point
+            agent.god.updateAssetPoint(asset_points, session_uuid)
+
+            t_start = time.perf_counter()
+            agent.calculate(client, session_uuid, agent.calculate_cache)
+            timings.append(time.perf_counter() - t_start)
+
+        print(f"asset points: {nr_asset_points} | moved by tick: {moved_fraction * 100:5.1f}% ({int(nr_asset_points * moved_fraction):4}) | "
+              f"tick: {np.median(timings) * 1000:8.2f} ms (median of {nr_ticks}) | {stages_summary(session_uuid)}")
+
+    # all the asset points served by the calculate_cache (matrices of the session dropped, the geometry is not built on the hits)
+    timings = []
+    agent.stage_timings.remove_session(session_uuid)
+    for tick in range(nr_ticks):
+        agent.entity_matrices.remove_session(session_uuid)
+
+        t_start = time.perf_counter()
+        agent.calculate(client, session_uuid, agent.calculate_cache)
+        timings.append(time.perf_counter() - t_start)
+
+    print(f"asset points: {nr_asset_points} | cache hits by tick: 100.0% | "
+          f"tick: {np.median(timings) * 1000:8.2f} ms (median of {nr_ticks}) | {stages_summary(session_uuid)}")
+
+    # one antenna moved on each tick (only its column of the asset points and anchors matrices is recomputed)
+    timings = []
+    agent.stage_timings.remove_session(session_uuid)
+    for tick in range(nr_ticks):
+        antenna = antennas[tick % len(antennas)]
+        antenna["LongLat"] = [round(antenna["LongLat"][0] + 0.000001, 8), antenna["LongLat"][1]]
+        agent.god.updateAntenna(antennas, session_uuid)
+
+        t_start = time.perf_counter()
+        agent.calculate(client, session_uuid, agent.calculate_cache)
+        timings.append(time.perf_counter() - t_start)
+
+    print(f"asset points: {nr_asset_points} | moved by tick: 1 antenna of {len(antennas)} | "
+          f"tick: {np.median(timings) * 1000:8.2f} ms (median of {nr_ticks}) | {stages_summary(session_uuid)}")
+
+    # the cache entries of a moved antenna: only its column is missed, and moving it back is served by the calculate_cache
+    antenna = antennas[0]
+    misses = []
+    for step in (0.000001, -0.000001):
+        antenna["LongLat"] = [round(antenna["LongLat"][0] + step, 8), antenna["LongLat"][1]]
+        agent.god.updateAntenna(antennas, session_uuid)
+        previous_misses = agent.calculate_cache.get_stats(session_uuid)["misses"]
+        agent.calculate(client, session_uuid, agent.calculate_cache)
+        misses.append(agent.calculate_cache.get_stats(session_uuid)["misses"] - previous_misses)
+
+    print(f"cache misses of a moved antenna: {misses[0]} (expected {nr_asset_points + len(anchors)}) | moved back: {misses[1]} (expected 0)")
+
+    agent.wall_intersections_pool.shutdown()
+    if misses != [nr_asset_points + len(anchors), 0]:
+        sys.exit(1)
@@ -0,0 +1,60 @@
+import sys
+import time
+import random
+import numpy as np
+import geojson
+from turfpy import measurement
+from geojson import Point, Feature
+from src.backend.src.geometry_module import measure_distances_matrix
+
+# micro-benchmark of the distances matrix engine against the per-pair turfpy path (exits with an error on mismatches)
+# run from the repository root: python -m src.backend.tests.distances_benchmark_tests
+
+# Set decimal places in geojson messages (same as backend agent)
+geojson.geometry.Geometry.__init__.__defaults__ = (None, False, 8)
+
+# library_ua_floor2 map bounds (from config-params-library-ua-floor2.json)
+map_min_long, map_max_long = -8.66032114707275, -8.659491455996772
+map_min_lat, map_max_lat = 40.63086610101465, 40.631571318320454
+
+# previous per-pair turfpy implementation of measure_distances_to_antennas
+def turfpy_distances(points_coords, antennas_coords):
+    distances = []
+    for point in points_coords:
+        dists_by_point = []
+        for antenna in antennas_coords:
+            start = Feature(geometry=Point((float(point[0]), float(point[1]))))
+            end = Feature(geometry=Point((float(antenna[0]), float(antenna[1]))))
+            line = measurement.distance(start, end)
+            distance_value = round((line * 1000 * 100) / 100, 20)
+            dists_by_point.append(round(distance_value, 2))
+        distances.append(dists_by_point)
+    return distances
+
+def random_coords(n, rng):
+    return [(rng.uniform(map_min_long, map_max_long), rng.uniform(map_min_lat, map_max_lat)) for _ in range(n)]
+
+def benchmark(nr_points, nr_antennas, repeat=3):
+    rng = random.Random(nr_points * nr_antennas)
+    points_coords = random_coords(nr_points, rng)
+    antennas_coords = random_coords(nr_antennas, rng)
+
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        expected = turfpy_distances(points_coords, antennas_coords)
+    t_turfpy = (time.perf_counter() - t_start) / repeat
+
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        result = measure_distances_matrix(np.array(points_coords), np.array(antennas_coords))
+    t_numpy = (time.perf_counter() - t_start) / repeat
+
+    mismatches = int(np.sum(np.array(expected) != result))
+    print(f"points: {nr_points:4d} | antennas: {nr_antennas:3d} | turfpy: {t_turfpy * 1000:9.3f} ms | "
+          f"numpy: {t_numpy * 1000:7.3f} ms | speedup: {t_turfpy / t_numpy:8.1f}x | mismatches: {mismatches}")
+    return mismatches
+
+if __name__ == "__main__":
+    mismatches = sum(benchmark(nr_points, nr_antennas) for nr_points, nr_antennas in [(1, 10), (10, 10), (100, 10), (300, 30), (1000, 50)])
+    if mismatches > 0:
+        sys.exit(1)
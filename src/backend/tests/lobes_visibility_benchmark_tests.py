@@ -0,0 +1,41 @@
+import time
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.asset_classes_module import Antenna, AssetPoint
+from src.backend.src.geometry_module import measure_lobes_visibility
+
+# check the vectorized lobes visibility matrix reproduces the per line of sight checks, and compare timings
+# run from the repository root: python -m src.backend.tests.lobes_visibility_benchmark_tests
+
+nr_points = 1000
+nr_antennas = 10
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    points_coords = np.column_stack((rng.uniform(-8.66032, -8.65949, nr_points), rng.uniform(40.63087, 40.63157, nr_points)))
+    antennas_coords = np.column_stack((rng.uniform(-8.66032, -8.65949, nr_antennas), rng.uniform(40.63087, 40.63157, nr_antennas)))
+    antennas_lobes = np.column_stack((rng.uniform(-180, 180, nr_antennas), rng.uniform(30, 180, nr_antennas)))
+    ap_lobes = np.column_stack((rng.uniform(-180, 180, nr_points), rng.uniform(30, 270, nr_points),
+                                rng.uniform(-180, 180, nr_points), rng.uniform(10, 90, nr_points)))
+
+    antennas_data = [Antenna(*antennas_coords[i], *antennas_lobes[i], 0) for i in range(nr_antennas)]
+    asset_points_data = [AssetPoint(*points_coords[i], *ap_lobes[i]) for i in range(nr_points)]
+
+    t_start = time.perf_counter()
+    expected_anchors = []
+    expected_ap = []
+    for asset_point in asset_points_data:
+        lines = agent.catch_lines_of_sight(asset_point, antennas_data)
+        expected_anchors.append(agent.catch_antenna_directions_intersections_with_anchors(lines, antennas_data))
+        expected_ap.append(agent.catch_antenna_directions_intersections_with_asset_points(lines, asset_point, antennas_data))
+    t_features = time.perf_counter() - t_start
+
+    t_start = time.perf_counter()
+    result_anchors = measure_lobes_visibility(points_coords, antennas_coords, antennas_lobes[:, 0], antennas_lobes[:, 1])
+    result_ap = measure_lobes_visibility(points_coords, antennas_coords, antennas_lobes[:, 0], antennas_lobes[:, 1],
+                                         ap_lobes[:, 0], ap_lobes[:, 1], ap_lobes[:, 2], ap_lobes[:, 3])
+    t_matrix = time.perf_counter() - t_start
+
+    mismatches = int(np.sum(result_anchors != np.array(expected_anchors)) + np.sum(result_ap != np.array(expected_ap)))
+    print(f"lines: {2 * nr_points * nr_antennas} | visible: {int(result_anchors.sum() + result_ap.sum())} | features: {t_features:.3f} s | "
+          f"matrix: {t_matrix * 1000:.3f} ms | speedup: {t_features / t_matrix:.1f}x | mismatches: {mismatches}")
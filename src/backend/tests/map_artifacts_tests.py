@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.map_artifacts_module import MapArtifacts, map_artifact_key
+from src.backend.src.spatial_index_module import load_walls_index
+
+# check the compiled map artifacts reproduce the parsed map walls (and spatial index), their key invalidation,
+# and compare the compile / memory-mapped load timings
+# run from the repository root: python -m src.backend.tests.map_artifacts_tests
+
+config_file = "src/static-files/config_files/config-params-library-ua-floor2.json"
+map_file = "src/static-files/geojson_objs/library_ua_floor2/library_ua_floor2_custom_map_2d.geojson"
+nr_lines = 2000
+
+if __name__ == "__main__":
+    with open(config_file) as file:
+        map_config = json.load(file)["map"]
+    with open(map_file, "rb") as file:
+        map_data = file.read()
+
+    with tempfile.TemporaryDirectory() as artifacts_dir:
+        key = map_artifact_key(map_data, map_config)
+
+        t_start = time.perf_counter()
+        expected = agent.compile_map_walls(map_data, map_config)
+        t_compile = time.perf_counter() - t_start
+
+        MapArtifacts(artifacts_dir).get(key, lambda: expected)
+
+        # new backend start: the artifact is memory-mapped from the directory
+        t_start = time.perf_counter()
+        result = MapArtifacts(artifacts_dir).get(key, None)
+        result_index = load_walls_index(result)
+        t_load = time.perf_counter() - t_start
+
+        mismatches = sum(not np.array_equal(np.asarray(expected[name]), np.asarray(result[name])) for name in expected)
+
+        rng = np.random.default_rng(0)
+        lines = np.column_stack((rng.uniform(-8.66032, -8.65949, (nr_lines, 2)), rng.uniform(40.63087, 40.63157, (nr_lines, 2))))[:, [0, 2, 1, 3]]
+        expected_count = agent.count_wall_intersections(lines, expected["walls_array"], expected["walls_groups"],
+                                                        agent.create_walls_index(expected["walls_array"], map_config))
+        result_count = agent.count_wall_intersections(lines, result["walls_array"], result["walls_groups"], result_index)
+        mismatches += int(np.sum(expected_count != result_count))
+
+        # any change of the walls filters (or of the map) gets another key
+        other_filters = dict(map_config, filter_walls_levels=[0])
+        invalidated = (map_artifact_key(map_data, other_filters) != key and map_artifact_key(map_data + b" ", map_config) != key)
+
+        size = os.path.getsize(os.path.join(artifacts_dir, f"{key}.npz"))
+        print(f"walls: {len(result['walls_array'])} | artifact: {size / 1024:.1f} KB | compile: {t_compile * 1000:.2f} ms | "
+              f"load: {t_load * 1000:.3f} ms | speedup: {t_compile / t_load:.1f}x | mismatches: {mismatches} | invalidated: {invalidated}")
+
+    if mismatches > 0 or not invalidated:
+        sys.exit(1)
@@ -0,0 +1,44 @@
+import time
+import threading
+import numpy as np
+from src.backend.src.map_context_module import MapContext, MapContexts
+
+# check the map contexts are built once by map id (also with concurrent sessions) and shared read-only
+# run from the repository root: python -m src.backend.tests.map_contexts_tests
+
+nr_sessions = 32
+nr_maps = 3
+
+builds = []
+
+# slow builder of a synthetic map context (counts the builds by map id)
+def build_map_context(map_id: int) -> MapContext:
+    builds.append(map_id)
+    time.sleep(0.2)
+    config_json = {"map": {"map_center": [-8.6599, 40.6312]}, "features": ["rssi"]}
+    experimental_tables = {
+        "antenna_experimental_distances": np.arange(10, dtype=float),
+        "antenna_experimental_values": np.ones((10, 3)),
+        "stdev_mean_dict": {},
+    }
+    return MapContext(map_id, config_json, np.zeros((4, 4)), np.zeros(4, int), None, None, experimental_tables)
+
+if __name__ == "__main__":
+    map_contexts = MapContexts(build_map_context)
+    results = [None] * nr_sessions
+
+    def session(index: int):
+        results[index] = map_contexts.get(index % nr_maps)
+
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(nr_sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    t_total = time.perf_counter() - t_start
+
+    shared = all(results[index] is results[index % nr_maps] for index in range(nr_sessions))
+    read_only = not any(results[index].walls_array.flags.writeable for index in range(nr_maps))
+    print(f"sessions: {nr_sessions} | maps: {nr_maps} | builds: {len(builds)} | shared: {shared} | read-only: {read_only} | "
+          f"time: {t_total:.3f} s")
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import urllib.request
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.metrics_module import Histogram, MetricsServer, MetricsPublisher
+
+# check of the backend metrics: histogram buckets, stage histograms of calculate and gauges of the scheduler and of the cache
+# served on the local HTTP endpoint (Prometheus text format), snapshot published on the MQTT stats topic, and overhead of the
+# metrics on the calculate ticks
+# run from the repository root: python -m src.backend.tests.metrics_tests
+
+nr_ticks = 50
+geojson_objs = "src/static-files/geojson_objs/library_ua_floor2"
+
+class StatsClient:
+    def __init__(self):
+        self.messages = {}
+
+    def publish(self, topic: str, payload: str):
+        self.messages[topic] = payload
+
+# features of a geojson file
+def read_features(file_name: str) -> list:
+    with open(os.path.join(geojson_objs, file_name)) as file:
+        return json.load(file)["features"]
+
+if __name__ == "__main__":
+    # histogram buckets (upper bounds included, cumulative counts) and quantiles
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for value in (0.0005, 0.001, 0.002, 0.05, 0.5):
+        histogram.observe(value)
+    print(f"histogram buckets: {histogram.cumulative_counts() == [2, 3, 4, 5]} | quantiles: {histogram.quantile(0.5) == 0.01 and histogram.quantile(0.99) == 0.1}")
+
+    # read the static files from the local repository
+    agent.host_domain_name_server = "file://" + os.path.abspath("src")
+    agent.god = agent.GOD()
+    session_uuid = "metrics"
+    client = StatsClient()
+    antennas = [{"LongLat": feature["geometry"]["coordinates"], "DirOpen": [feature["properties"]["angle_direction"], feature["properties"]["angle_opening"]],
+                 "TxPower": feature["properties"]["tx_power"]} for feature in read_features("library_ua_floor2_antennas.geojson")]
+    anchors = [{"LongLat": feature["geometry"]["coordinates"]} for feature in read_features("library_ua_floor2_anchors.geojson")]
+    path = read_features("library_ua_floor2_custom_move1.geojson")[0]["geometry"]["coordinates"]
+
+    # full update and partial updates of the session, processed as by the scheduler workers
+    agent.processSessionMessage(session_uuid, (client, {"uuid": session_uuid, "map": 0, "ant": antennas, "anchors": anchors, "algs": ["all"], "read_rate": 1,
+        "rp": {"tx": -20, "ple(n)": 2.4, "cf": 3, "skew": 9.6, "d0": 1, "af": 1}, "status": "open",
+        "ap": [{"LongLat": path[0], "LargeDirOpen": [0, 360], "SmallDirOpen": [0, 0]}]}))
+    # ticks along the animation path (the first run measures the positions, the next runs hit the calculate cache), timed with and
+    # without the stage histograms (listener of the stage timings)
+    def run_ticks() -> float:
+        t_start = time.perf_counter()
+        for step in range(1, nr_ticks + 1):
+            agent.god.updateAssetPoint([{"LongLat": path[step * 7 % len(path)], "LargeDirOpen": [0, 360], "SmallDirOpen": [0, 0]}], session_uuid)
+            agent.calculate(client, session_uuid, agent.calculate_cache)
+        return (time.perf_counter() - t_start) / nr_ticks
+
+    run_ticks()
+    t_metrics = run_ticks()
+    listener, agent.stage_timings.listener = agent.stage_timings.listener, None
+    t_plain = run_ticks()
+    agent.stage_timings.listener = listener
+
+    # scrape of the HTTP endpoint (on a free port)
+    server = MetricsServer(agent.metrics, port=0)
+    port = server.start()
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode("utf-8")
+    server.stop()
+    stages = ("map_context", "entities", "anchors", "ap_cache", "ap_geometry", "ap_distances", "ap_wall_intersections", "ap_visibility",
+              "activations", "rssi_activations", "serialization", "publish", "tick")
+    missing_stages = [stage for stage in stages if f'backend_calculate_stage_seconds_count{{stage="{stage}"}}' not in body]
+    gauges = ("queue_depth", "active_sessions", "cache_entries", "cache_bytes", "cache_hit_rate", "pacing_missed_deadlines_total")
+    missing_gauges = [gauge for gauge in gauges if f"\nbackend_{gauge} " not in body]
+    published = f'backend_published_messages_total{{topic="frontend"}} {3 * nr_ticks + 1}' in body
+    print(f"endpoint: {len(body.splitlines())} lines | stage histograms: {len(missing_stages) == 0} {missing_stages or ''} | "
+          f"gauges: {len(missing_gauges) == 0} {missing_gauges or ''} | publish counts: {published}")
+
+    # snapshot on the MQTT stats topic
+    publisher = MetricsPublisher(agent.metrics, client, "/topic_backend_stats")
+    publisher.publish()
+    snapshot = json.loads(client.messages["/topic_backend_stats"])
+    print(f"stats topic: {sorted(snapshot)} | tick p50: {snapshot['histograms']['calculate_stage_seconds']['stage=tick']['p50'] * 1000:.2f} ms (bucket bound) | "
+          f"tick with metrics: {t_metrics * 1000:.2f} ms vs {t_plain * 1000:.2f} ms without the stage histograms")
+
+    agent.wall_intersections_pool.shutdown()
@@ -0,0 +1,41 @@
+import os
+import sys
+import time
+import numpy as np
+from src.backend.src import monte_carlo_module as monte_carlo
+from src.backend.src.batch_simulation_module import load_scene
+
+# check of the parallel Monte-Carlo generation (same rows whichever the amount of processes, same paths and different noise
+# by seed, provenance columns of the shards) and throughput of the generation on the calling process, on a pool of processes
+# and on the default pool size (the speedup of the pool needs as many CPUs as processes)
+# run from the repository root: python -m src.backend.tests.monte_carlo_tests [nr_processes]
+
+config_file = "src/static-files/config_files/config-params-library-ua-floor2.json"
+nr_steps = 300
+nr_seeds = 8
+
+if __name__ == "__main__":
+    nr_processes = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    scene = load_scene(config_file)
+    rssi_params_sets = [dict(scene["rssi_params"], **{"ple(n)": ple}) for ple in (2.2, 2.4)]
+    shards = monte_carlo.make_shards(scene, "rssi", scene["animations"], rssi_params_sets, list(range(nr_seeds)), nr_steps)
+
+    results, timings = {}, {}
+    for name, processes in (("calling process", 1), ("pool", nr_processes), ("default", None)):
+        t_start = time.perf_counter()
+        results[name] = monte_carlo.generate(config_file, shards, processes)
+        timings[name] = time.perf_counter() - t_start
+        print(f"{name:15s} | processes: {monte_carlo.worker_processes(len(shards), processes)} | {len(results[name])} rows ({len(shards)} shards) "
+              f"in {timings[name]:.1f} s ({len(results[name]) / timings[name]:.0f} rows/s) | speedup: {timings['calling process'] / timings[name]:.2f}x")
+    print(f"CPUs: {os.cpu_count()}")
+
+    rows = results["calling process"]
+    header = monte_carlo.provenance_columns + monte_carlo.dataset_header(dict(scene, asset_points=scene["asset_points"][:1]), "rssi")
+    seed_0, seed_1 = rows[(rows[:, 0] == 1) & (rows[:, 2] == 2.4) & (rows[:, 5] == 0)], rows[(rows[:, 0] == 1) & (rows[:, 2] == 2.4) & (rows[:, 5] == 1)]
+    provenance = [tuple(shard_rows) for shard_rows in np.unique(rows[:, [0, 2, 5]], axis=0)]
+    checks = {"same rows whichever the processes": all(np.array_equal(rows, other_rows) for other_rows in results.values()), "columns": rows.shape[1] == len(header),
+              "shards": len(provenance) == len(shards), "same paths by seed": np.array_equal(seed_0[:, -2:], seed_1[:, -2:]),
+              "different noise by seed": not np.array_equal(seed_0[:, 7:-2], seed_1[:, 7:-2])}
+    print(" | ".join(f"{name}: {passed}" for name, passed in checks.items()))
+    if not all(checks.values()):
+        sys.exit(1)
@@ -0,0 +1,45 @@
+import sys
+import time
+import random
+import numpy as np
+from scipy import stats
+from src.backend.src import main_agent_module as agent
+from src.backend.src.noise_module import NoiseGenerator, NoiseGenerators
+
+# statistical check of the vectorized noise generator against random_gaussian_dist (two-sample Kolmogorov-Smirnov test),
+# reproducibility of the fixed seed, and timings
+# run from the repository root: python -m src.backend.tests.noise_generator_tests
+
+nr_samples = 100000
+significance_level = 0.001
+
+if __name__ == "__main__":
+    random.seed(0)
+    generator = NoiseGenerator(0)
+    failures = 0
+
+    # (constant of fading, skew index) of the rssi params
+    for constant_fading, skew_index in ((3, 9.6), (3, 1), (5, 0.5), (10, 9.6), (1, 20)):
+        t_start = time.perf_counter()
+        expected = [agent.random_gaussian_dist(-constant_fading, constant_fading, skew_index) for _ in range(nr_samples)]
+        t_sampler = time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        result = generator.skewed_gaussian(-constant_fading, constant_fading, skew_index, nr_samples)
+        t_generator = time.perf_counter() - t_start
+
+        ks_statistic, p_value = stats.ks_2samp(expected, result)
+        failures += p_value < significance_level
+        print(f"cf: {constant_fading:4} | skew: {skew_index:4} | mean: {np.mean(expected):8.4f} vs {np.mean(result):8.4f} | "
+              f"std: {np.std(expected):7.4f} vs {np.std(result):7.4f} | KS: {ks_statistic:.4f} (p-value: {p_value:.3f}) | "
+              f"sampler: {t_sampler * 1000:8.2f} ms | generator: {t_generator * 1000:6.2f} ms")
+
+    # same fixed seed and session -> same samples, different sessions -> different samples
+    first = NoiseGenerators(seed=42).get("session-1").skewed_gaussian(-3, 3, 9.6, 10)
+    second = NoiseGenerators(seed=42).get("session-1").skewed_gaussian(-3, 3, 9.6, 10)
+    other = NoiseGenerators(seed=42).get("session-2").skewed_gaussian(-3, 3, 9.6, 10)
+    reproducible = np.array_equal(first, second) and not np.array_equal(first, other)
+
+    print(f"distributions rejected: {failures} | fixed seed reproducible: {reproducible}")
+    if failures > 0 or not reproducible:
+        sys.exit(1)
@@ -0,0 +1,32 @@
+import sys
+import time
+from src.backend.src.scheduler_module import SessionScheduler
+
+# check the pacing engine holds a steady cadence of many sessions (periodic fires, without new messages):
+# rate of fires by session, jitter, missed deadlines and batches of the sessions due at the same instant
+# run from the repository root: python -m src.backend.tests.pacing_engine_tests [nr_sessions]
+
+nr_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+interval = 1.0
+process_time = 0.0002
+duration = 5.0
+
+if __name__ == "__main__":
+    def process(session_uuid: str, message: object):
+        # busy processing (a tick of a small session)
+        end = time.perf_counter() + process_time
+        while time.perf_counter() < end:
+            pass
+
+    scheduler = SessionScheduler(process, lambda session_uuid: interval, num_workers=4, periodic=True, idle_timeout=duration * 2)
+    scheduler.start()
+    # sessions connected at once (e.g. backend restart), so they are due at the same instants
+    for index in range(nr_sessions):
+        scheduler.put(f"session-{index}", {"uuid": f"session-{index}"})
+    time.sleep(duration)
+    scheduler.stop()
+
+    pacing = scheduler.get_pacing_stats()
+    print(f"sessions: {nr_sessions} | interval: {interval:.1f} s | fires by session: {pacing['fires'] / nr_sessions:.2f} in {duration:.0f} s | "
+          f"jitter mean: {pacing['jitter_mean'] * 1000:.2f} ms | jitter max: {pacing['jitter_max'] * 1000:.2f} ms | "
+          f"missed: {pacing['missed']} | batches: {pacing['batches']} (mean size: {pacing['batch_size_mean']:.1f})")
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.cache_module import CalculateCache
+from src.backend.src.entity_matrices_module import EntityMatrices
+from src.backend.src.geometry_module import quantization_steps
+
+# check of the position quantization of the asset points cache keys along the asset point animation of the map: cache hit rate,
+# and differences of the wall intersections and lobes visibility to the exact positions, by quantization tolerance
+# run from the repository root: python -m src.backend.tests.position_quantization_tests
+
+nr_asset_points = 20
+nr_substeps = 4
+tolerances = (0.1, 0.25, 0.5, 1.0)
+geojson_objs = "src/static-files/geojson_objs/library_ua_floor2"
+
+# features of a geojson file
+def read_features(file_name: str) -> list:
+    with open(os.path.join(geojson_objs, file_name)) as file:
+        return json.load(file)["features"]
+
+if __name__ == "__main__":
+    # read the static files from the local repository
+    agent.host_domain_name_server = "file://" + os.path.abspath("src")
+    agent.god = agent.GOD()
+    map_context = agent.map_contexts.get(0)
+
+    antennas_signatures = [(feature["geometry"]["coordinates"][0], feature["geometry"]["coordinates"][1], feature["properties"]["angle_direction"],
+        feature["properties"]["angle_opening"]) for feature in read_features("library_ua_floor2_antennas.geojson")]
+    path = np.array(read_features("library_ua_floor2_custom_move1.geojson")[0]["geometry"]["coordinates"])
+    # animation path in small steps (substeps between the path points)
+    fractions = np.arange(nr_substeps) / nr_substeps
+    steps_coords = (path[:-1, None, :] + (path[1:] - path[:-1])[:, None, :] * fractions[None, :, None]).reshape(-1, 2)
+    # asset points moving along the path, each one shifted by a fixed offset (up to 1 meter), with omnidirectional lobes
+    offsets = np.random.default_rng(0).uniform(-1, 1, (nr_asset_points, 2)) * np.degrees(1 / agent.avg_earth_radius_m)
+    ticks = [[(round(float(lng), 8), round(float(lat), 8), 0, 360, 0, 0) for lng, lat in step_coords + offsets] for step_coords in steps_coords]
+
+    for tolerance in (None,) + tolerances:
+        session_uuid = f"quantization-{tolerance}"
+        agent.god.setMapId(0, session_uuid)
+        steps = None if tolerance is None else quantization_steps(tolerance, map_context.map_center[1])
+        matrices, exact_matrices = EntityMatrices(), EntityMatrices()
+        calculate_cache, exact_cache = CalculateCache(), CalculateCache()
+
+        walls_mismatches, walls_max_diff, visibility_mismatches, distances_max_diff, nr_pairs = 0, 0, 0, 0.0, 0
+        t_total = 0.0
+        for ap_signatures in ticks:
+            t_start = time.perf_counter()
+            agent.update_entity_matrices(session_uuid, "ap", matrices, ap_signatures, antennas_signatures, calculate_cache, quantization_steps=steps)
+            t_total += time.perf_counter() - t_start
+            agent.update_entity_matrices(session_uuid, "ap", exact_matrices, ap_signatures, antennas_signatures, exact_cache)
+            walls_diff = np.abs(matrices.wall_intersections - exact_matrices.wall_intersections)
+            walls_mismatches += np.count_nonzero(walls_diff)
+            walls_max_diff = max(walls_max_diff, int(walls_diff.max()))
+            visibility_mismatches += np.count_nonzero(matrices.visibility != exact_matrices.visibility)
+            distances_max_diff = max(distances_max_diff, float(np.abs(matrices.distances - exact_matrices.distances).max()))
+            nr_pairs += matrices.distances.size
+
+        stats = calculate_cache.get_stats(session_uuid)
+        error_bound = 0.0 if tolerance is None else tolerance * np.sqrt(2)
+        print(f"tolerance: {str(tolerance):4} m | hit rate: {stats['hit_rate'] * 100:5.1f}% | position error bound: {error_bound:.3f} m | "
+              f"wall intersections mismatches: {walls_mismatches / nr_pairs * 100:5.2f}% (max diff: {walls_max_diff}) | "
+              f"visibility mismatches: {visibility_mismatches / nr_pairs * 100:5.2f}% | distances max diff: {distances_max_diff:.2f} m | "
+              f"tick: {t_total / len(ticks) * 1000:.2f} ms")
+
+    agent.wall_intersections_pool.shutdown()
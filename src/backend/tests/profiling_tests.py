@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import pstats
+import tempfile
+from src.backend.src import main_agent_module as agent
+from src.backend.src.profiling_module import TickProfiler
+
+# check of the on-demand profiling of calculate: capture of N ticks of a session armed by a control message (cProfile pstats
+# and sampling collapsed stacks files), other sessions not profiled, and time of the ticks without a capture armed
+# run from the repository root: python -m src.backend.tests.profiling_tests
+
+nr_ticks = 20
+geojson_objs = "src/static-files/geojson_objs/library_ua_floor2"
+
+class ProfilingClient:
+    def publish(self, topic: str, payload: str):
+        pass
+
+# features of a geojson file
+def read_features(file_name: str) -> list:
+    with open(os.path.join(geojson_objs, file_name)) as file:
+        return json.load(file)["features"]
+
+if __name__ == "__main__":
+    # read the static files from the local repository, and save the profiles on a temporary directory
+    agent.host_domain_name_server = "file://" + os.path.abspath("src")
+    agent.god = agent.GOD()
+    agent.tick_profiler = TickProfiler(tempfile.mkdtemp(), sampling_interval=0.0005)
+    client = ProfilingClient()
+    antennas = [{"LongLat": feature["geometry"]["coordinates"], "DirOpen": [feature["properties"]["angle_direction"], feature["properties"]["angle_opening"]],
+                 "TxPower": feature["properties"]["tx_power"]} for feature in read_features("library_ua_floor2_antennas.geojson")]
+    anchors = [{"LongLat": feature["geometry"]["coordinates"]} for feature in read_features("library_ua_floor2_anchors.geojson")]
+    path = read_features("library_ua_floor2_custom_move1.geojson")[0]["geometry"]["coordinates"]
+
+    # ticks of a session along the animation path
+    def run_ticks(session_uuid: str, offset: int = 0) -> float:
+        t_start = time.perf_counter()
+        for step in range(nr_ticks):
+            agent.god.updateAssetPoint([{"LongLat": path[(offset + step) * 7 % len(path)], "LargeDirOpen": [0, 360], "SmallDirOpen": [0, 0]}], session_uuid)
+            agent.calculate(client, session_uuid, agent.calculate_cache)
+        return (time.perf_counter() - t_start) / nr_ticks
+
+    for session_uuid in ("profiled", "other"):
+        agent.processSessionMessage(session_uuid, (client, {"uuid": session_uuid, "map": 0, "ant": antennas, "anchors": anchors, "algs": ["all"],
+            "read_rate": 1, "rp": {"tx": -20, "ple(n)": 2.4, "cf": 3, "skew": 9.6, "d0": 1, "af": 1}, "status": "open",
+            "ap": [{"LongLat": path[0], "LargeDirOpen": [0, 360], "SmallDirOpen": [0, 0]}]}))
+    run_ticks("profiled")
+    t_disabled = run_ticks("profiled")
+
+    for mode in ("cprofile", "sampling"):
+        # control message of the session (its tick is the first profiled one), then the other session and the profiled session ticks
+        agent.processSessionMessage("profiled", (client, {"uuid": "profiled", "profile": {"ticks": nr_ticks, "mode": mode}}))
+        run_ticks("other")
+        remaining = agent.tick_profiler.get_status().get("remaining_ticks")
+        t_profiled = run_ticks("profiled")
+        status = agent.tick_profiler.get_status()
+        files = [file for file in status["saved_files"] if f"_{mode}_" in file]
+        if mode == "cprofile":
+            stats = pstats.Stats(files[0])
+            # the profile starts inside calculate: the asset points matrices are updated once by tick
+            update_calls = [calls for (file, line, function), (calls, *_) in stats.stats.items() if function == "update_entity_matrices"]
+            content = f"update_entity_matrices calls: {update_calls[0] if update_calls else 0} (expected {nr_ticks})"
+        else:
+            with open(files[0]) as collapsed_file:
+                stacks = [line.rsplit(" ", 1) for line in collapsed_file.read().splitlines()]
+            content = f"stacks: {len(stacks)} | samples: {sum(int(count) for stack, count in stacks)} | in calculate: {all('calculate' in stack for stack, count in stacks)}"
+        print(f"{mode:8s}: files: {[os.path.splitext(file)[1] for file in files]} | other session not profiled: {remaining == nr_ticks - 1} | "
+              f"capture done: {'remaining_ticks' not in status} | {content} | tick: {t_profiled * 1000:.2f} ms (profiled) vs {t_disabled * 1000:.2f} ms (not armed)")
+
+    # a tick that raises still closes its capture (next requests are armed), and a bad control message payload is rejected
+    class FailingClient:
+        def publish(self, topic: str, payload: str):
+            raise ConnectionError("broker gone")
+
+    agent.tick_profiler.request(1, "cprofile", "profiled")
+    try:
+        agent.calculate(FailingClient(), "profiled", agent.calculate_cache)
+    except ConnectionError:
+        pass
+    released = agent.tick_profiler.get_status().get("remaining_ticks") is None and agent.tick_profiler.request(1, "cprofile", "other")
+    run_ticks("other", 1)
+    errors = agent.metrics.get_snapshot()["counters"].get("session_errors_total", {})
+    agent.processSessionMessage("profiled", (client, {"uuid": "profiled", "profile": 5}))
+    rejected = agent.metrics.get_snapshot()["counters"].get("session_errors_total", {}) == errors and agent.tick_profiler.get_status().get("remaining_ticks") is None
+    print(f"failing tick: capture released: {released} | bad payload rejected without error: {rejected}")
+    assert released and rejected
+
+    agent.wall_intersections_pool.shutdown()
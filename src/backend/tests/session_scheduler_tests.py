@@ -0,0 +1,48 @@
+import time
+import threading
+from src.backend.src.scheduler_module import SessionScheduler
+
+# check the session scheduler keeps the messages order of each session, paces each session at its interval
+# (jitter and missed deadlines), and a slow session does not delay the other sessions (for both scheduling policies)
+# run from the repository root: python -m src.backend.tests.session_scheduler_tests
+
+nr_sessions = 20
+nr_messages = 10
+interval = 0.1
+process_time = 0.01
+slow_session_process_time = 0.5
+num_workers = 4
+
+if __name__ == "__main__":
+    for policy in ("round_robin", "deadline"):
+        processed = {f"session-{index}": [] for index in range(nr_sessions)}
+        lock = threading.Lock()
+
+        def process(session_uuid: str, message: int):
+            with lock:
+                processed[session_uuid].append((time.monotonic(), message))
+            # session-0 is a slow session (e.g. a large map)
+            time.sleep(slow_session_process_time if session_uuid == "session-0" else process_time)
+
+        scheduler = SessionScheduler(process, lambda session_uuid: interval, num_workers=num_workers, policy=policy)
+        scheduler.start()
+        t_start = time.monotonic()
+        for message in range(nr_messages):
+            for session_uuid in processed:
+                scheduler.put(session_uuid, message)
+
+        # wait for all the fast sessions
+        while any(len(processed[session_uuid]) < nr_messages for session_uuid in list(processed)[1:]):
+            time.sleep(0.01)
+        t_total = time.monotonic() - t_start
+        scheduler.stop()
+
+        ordered = all([message for _, message in values] == list(range(len(values))) for values in processed.values())
+        gaps = [values[index + 1][0] - values[index][0] for values in list(processed.values())[1:] for index in range(len(values) - 1)]
+        pacing = scheduler.get_pacing_stats()
+        # sequential single worker with a sleep of the interval by message would take nr_sessions * nr_messages * interval
+        print(f"policy: {policy:11} | fast sessions done in: {t_total:.2f} s (sequential: {nr_sessions * nr_messages * interval:.0f} s) | "
+              f"slow session processed: {len(processed['session-0'])}/{nr_messages} | ordered: {ordered} | "
+              f"mean session gap: {sum(gaps) / len(gaps) * 1000:.1f} ms (interval: {interval * 1000:.0f} ms) | "
+              f"jitter mean: {pacing['jitter_mean'] * 1000:.2f} ms | jitter max: {pacing['jitter_max'] * 1000:.2f} ms | "
+              f"missed: {pacing['missed']} | batch size: {pacing['batch_size_mean']:.1f}")
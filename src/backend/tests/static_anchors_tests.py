@@ -0,0 +1,73 @@
+import time
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.static_anchors_module import StaticAnchors, StaticAnchorsStore
+
+# check of the static anchors against the per tick measure_RSSI of each line of sight (same noise samples), the placement
+# of the activations, the rebuilds of the store (only on the anchors or antennas changes), and timings by tick
+# run from the repository root: python -m src.backend.tests.static_anchors_tests
+
+nr_anchors = 200
+nr_antennas = 10
+nr_ticks = 50
+rssi_params = {"tx": -20.0, "ple(n)": 2.4, "cf": 3.0, "skew": 9.6, "d0": 1.0, "af": 1.0}
+
+# rssi and activations of the anchors measured line of sight by line of sight (as on each tick before the static anchors)
+def measure_anchors(distances: list, wall_intersections: list, visibility: list, noise: list, activations_values: list) -> tuple:
+    rssi, activations = [], []
+    noise_index, activations_index = 0, 0
+    for row in range(len(distances)):
+        rssi.append([])
+        activations.append([])
+        for col in range(len(distances[row])):
+            distance = round(distances[row][col], 3)
+            if visibility[row][col]:
+                rssi[row].append(round(agent.measure_RSSI(rssi_params["tx"], rssi_params["ple(n)"], rssi_params["cf"], rssi_params["skew"],
+                    rssi_params["d0"], distance, wall_intersections[row][col] * rssi_params["af"], noise[noise_index]), 2))
+                noise_index += 1
+                if distance <= 10:
+                    activations[row].append(activations_values[activations_index])
+                    activations_index += 1
+                else:
+                    activations[row].append([0, 0, 0])
+            else:
+                rssi[row].append(-170)
+                activations[row].append([0, 0, 0])
+    return rssi, activations
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    distances = rng.uniform(0.5, 30, (nr_anchors, nr_antennas))
+    wall_intersections = rng.integers(0, 5, (nr_anchors, nr_antennas))
+    visibility = rng.random((nr_anchors, nr_antennas)) < 0.6
+
+    builds = []
+    def build() -> StaticAnchors:
+        builds.append(1)
+        return StaticAnchors("signature", distances, wall_intersections, visibility)
+
+    store = StaticAnchorsStore()
+    static_anchors, built = store.get("session", "signature", build)
+    same_anchors, rebuilt = store.get("session", "signature", build)
+    reused = built and not rebuilt and same_anchors is static_anchors and len(builds) == 1
+    store.get("session", "changed signature", build)
+    rebuilds = len(builds) - 1
+
+    t_loop, t_static, equal = 0, 0, True
+    for tick in range(nr_ticks):
+        noise = rng.uniform(-3, 3, static_anchors.nr_directed).tolist()
+        activations_values = rng.random((len(static_anchors.activations_distances), 3)).round(4).tolist()
+
+        t_start = time.perf_counter()
+        expected_rssi, expected_activations = measure_anchors(distances.tolist(), wall_intersections.tolist(), visibility.tolist(), noise, activations_values)
+        t_loop += time.perf_counter() - t_start
+
+        t_start = time.perf_counter()
+        rssi = static_anchors.rssi(rssi_params["tx"], rssi_params["ple(n)"], rssi_params["d0"], rssi_params["af"], noise)
+        activations = static_anchors.activations(activations_values)
+        t_static += time.perf_counter() - t_start
+
+        equal = equal and np.allclose(rssi, expected_rssi, atol=0.011) and activations == expected_activations
+
+    print(f"anchors: {nr_anchors} | antennas: {nr_antennas} | same values: {equal} | reused: {reused} | rebuilds on change: {rebuilds} | "
+          f"tick: {t_loop / nr_ticks * 1000:.2f} ms (by line of sight) vs {t_static / nr_ticks * 1000:.2f} ms (static anchors)")
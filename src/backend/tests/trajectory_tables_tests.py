@@ -0,0 +1,65 @@
+import os
+import json
+import time
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.cache_module import CalculateCache
+from src.backend.src.entity_matrices_module import EntityMatrices
+from src.backend.src.trajectories_module import TrajectoryTables
+
+# check of the trajectory tables of the map animations (same values of the exact geometry), and timings of the playback
+# of the animation by asset points with and without the trajectory tables (the calculate cache misses of each step)
+# run from the repository root: python -m src.backend.tests.trajectory_tables_tests
+
+nr_asset_points = 10
+geojson_objs = "src/static-files/geojson_objs/library_ua_floor2"
+
+# features of a geojson file
+def read_features(file_name: str) -> list:
+    with open(os.path.join(geojson_objs, file_name)) as file:
+        return json.load(file)["features"]
+
+if __name__ == "__main__":
+    # read the static files from the local repository
+    agent.host_domain_name_server = "file://" + os.path.abspath("src")
+    agent.god = agent.GOD()
+    map_context = agent.map_contexts.get(0)
+
+    antennas_signatures = [(feature["geometry"]["coordinates"][0], feature["geometry"]["coordinates"][1], feature["properties"]["angle_direction"],
+        feature["properties"]["angle_opening"]) for feature in read_features("library_ua_floor2_antennas.geojson")]
+    antennas_coords = np.array([signature[:2] for signature in antennas_signatures])
+    path = read_features("library_ua_floor2_custom_move1.geojson")[0]["geometry"]["coordinates"]
+    # asset points along the animation path (each one starting on a different step)
+    offsets = np.linspace(0, len(path), nr_asset_points, endpoint=False).astype(int)
+    ticks = [[(*path[(step + offset) % len(path)], 0, 360, 0, 0) for offset in offsets] for step in range(len(path))]
+
+    # build the tables of the antennas (on the calling thread)
+    tables = TrajectoryTables(agent.wall_intersections_pool, background=False)
+    tables.register_map(0, map_context.config_json["map"], agent.load_map_trajectories(map_context.config_json["map"]))
+    t_start = time.perf_counter()
+    tables.prepare(0, antennas_coords)
+    t_build = time.perf_counter() - t_start
+
+    # same values of the exact geometry
+    points = np.array(path)
+    distances, wall_intersections = tables.lookup(0, points, antennas_coords)
+    lines_array = agent.build_lines_array(points, antennas_coords)
+    exact_wall_intersections = agent.wall_intersections_pool.count(0, lines_array).reshape(len(points), len(antennas_coords))
+    equal = np.array_equal(wall_intersections, exact_wall_intersections) and np.array_equal(distances, agent.measure_distances_matrix(points, antennas_coords))
+
+    # playback of the animation (each step is a cache miss), without and with the trajectory tables
+    timings = {}
+    for name, trajectory_tables in (("measured", TrajectoryTables(agent.wall_intersections_pool)), ("precomputed", tables)):
+        agent.trajectory_tables = trajectory_tables
+        session_uuid = f"trajectories-{name}"
+        agent.god.setMapId(0, session_uuid)
+        matrices, calculate_cache = EntityMatrices(), CalculateCache()
+        t_start = time.perf_counter()
+        for ap_signatures in ticks:
+            agent.update_entity_matrices(session_uuid, "ap", matrices, ap_signatures, antennas_signatures, calculate_cache)
+        timings[name] = (time.perf_counter() - t_start) / len(ticks)
+
+    print(f"positions: {len(tables.maps[0])} | antennas: {len(antennas_coords)} | tables build: {t_build:.2f} s | same values: {equal} | "
+          f"playback step ({nr_asset_points} asset points): {timings['measured'] * 1000:.2f} ms (measured) vs {timings['precomputed'] * 1000:.2f} ms (precomputed)")
+
+    agent.wall_intersections_pool.shutdown()
@@ -0,0 +1,75 @@
+import sys
+import time
+import json
+import geojson
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.geometry_module import compile_walls_array, build_lines_array
+from src.backend.src.spatial_index_module import create_walls_index
+from src.backend.src.worker_pool_module import WallIntersectionsPool
+from src.backend.src.wall_crossings_raster_module import WallCrossingsRasters, default_raster_resolution
+
+# check the wall crossings rasters reproduce the exact counts on the library_ua_floor2 map, and compare timings
+# run from the repository root: python -m src.backend.tests.wall_crossings_raster_benchmark_tests [raster_resolution]
+
+static_files_path = "src/static-files"
+map_objs_path = f"{static_files_path}/geojson_objs/library_ua_floor2"
+
+def load_features(file_name):
+    with open(f"{map_objs_path}/{file_name}") as file:
+        return json.load(file)["features"]
+
+if __name__ == "__main__":
+    with open(f"{static_files_path}/config_files/config-params-library-ua-floor2.json") as file:
+        map_config = json.load(file)["map"]
+    # rasters enabled for the benchmark (disabled on the shipped config), with the resolution of the config (or of the argument)
+    raster_params = map_config.get("wall_crossings_raster", {})
+    map_config["wall_crossings_raster"] = {"enabled": True, "resolution": float(sys.argv[1]) if len(sys.argv) > 1 else
+                                           raster_params.get("resolution", default_raster_resolution)}
+
+    with open(f"{map_objs_path}/library_ua_floor2_custom_map_2d.geojson") as file:
+        geojson_map = geojson.loads(file.read())
+    walls = agent.catch_map_walls(geojson_map, map_config["filter_walls_keywords"], map_config["filter_walls_levels"])
+    walls_array, walls_groups = compile_walls_array(walls)
+
+    pool = WallIntersectionsPool()
+    pool.register_map(0, walls_array, walls_groups, create_walls_index(walls_array, map_config))
+    rasters = WallCrossingsRasters(pool, background=False)
+    rasters.register_map(0, map_config, walls_array, walls_groups, pool.maps[0][2])
+
+    antennas_coords = np.array([f["geometry"]["coordinates"] for f in load_features("library_ua_floor2_antennas.geojson")])
+
+    # anchors, asset points, the animation path points and random points over the map bounds
+    rng = np.random.default_rng(0)
+    points_coords = [f["geometry"]["coordinates"] for f in load_features("library_ua_floor2_anchors.geojson")]
+    points_coords += [f["geometry"]["coordinates"] for f in load_features("library_ua_floor2_asset_points.geojson")]
+    points_coords += load_features("library_ua_floor2_custom_move1.geojson")[0]["geometry"]["coordinates"]
+    points_coords = np.concatenate((np.array(points_coords), np.column_stack((
+        rng.uniform(map_config["map_min_long"], map_config["map_max_long"], 20000),
+        rng.uniform(map_config["map_min_lat"], map_config["map_max_lat"], 20000)))))
+
+    t_start = time.perf_counter()
+    built = [rasters.get_raster(0, antenna) for antenna in antennas_coords]
+    t_build = time.perf_counter() - t_start
+    valid_cells = np.mean([raster.valid.mean() for raster in built])
+    print(f"walls: {len(walls_array)} | antennas: {len(antennas_coords)} | raster cells: {built[0].nr_cols}x{built[0].nr_rows} | "
+          f"served cells: {valid_cells * 100:.1f}% | build: {t_build:.2f} s")
+
+    t_start = time.perf_counter()
+    expected = pool.count(0, build_lines_array(points_coords, antennas_coords)).reshape(len(points_coords), len(antennas_coords))
+    t_exact = time.perf_counter() - t_start
+
+    t_start = time.perf_counter()
+    result = rasters.count(0, points_coords, antennas_coords)
+    t_rasters = time.perf_counter() - t_start
+
+    served = np.mean([raster.lookup(points_coords) >= 0 for raster in built])
+    mismatches = np.argwhere(result != expected)
+    print(f"lines: {expected.size} | exact: {t_exact * 1000:.2f} ms | rasters: {t_rasters * 1000:.2f} ms | "
+          f"served by rasters: {served * 100:.1f}% | mismatches: {len(mismatches)}")
+    for point, antenna in mismatches:
+        print("point:", points_coords[point].tolist(), "| antenna:", antenna, "| exact:", expected[point, antenna], "| raster:", result[point, antenna])
+
+    pool.shutdown()
+    if len(mismatches) > 0:
+        sys.exit(1)
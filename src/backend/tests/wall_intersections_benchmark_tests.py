@@ -0,0 +1,98 @@
+import sys
+import time
+import json
+import geojson
+import numpy as np
+from geojson import Feature, LineString, FeatureCollection
+from turfpy.misc import line_intersect
+from src.backend.src import main_agent_module as agent
+from src.backend.src.geometry_module import compile_walls_array, build_lines_array, count_wall_intersections
+
+# check the wall intersections kernel reproduces the turfpy counts on the library_ua_floor2 map, and compare timings
+# (turfpy runs with the geojson precision set by the backend agent)
+# (the turfpy reference counts the distinct intersections of each line of sight with the walls of the map quadrants it passes)
+# run from the repository root: python -m src.backend.tests.wall_intersections_benchmark_tests [nr_of_lines]
+
+static_files_path = "src/static-files"
+map_objs_path = f"{static_files_path}/geojson_objs/library_ua_floor2"
+
+def load_features(file_name):
+    with open(f"{map_objs_path}/{file_name}") as file:
+        return json.load(file)["features"]
+
+# quadrant of a point around the map center (Q0 Q1 on top, Q3 Q2 on bottom)
+def verify_point_in_quad(some_point: list, map_center: list) -> int:
+    if some_point[0] >= map_center[0]:
+        return 1 if some_point[1] >= map_center[1] else 2
+    return 0 if some_point[1] >= map_center[1] else 3
+
+# quadrants of a line segment (the quadrants of its points, or all the four for opposite quadrants)
+def get_quadrants_of_segment(line_seg: list, map_center: list) -> list:
+    quad_of_line_point1 = verify_point_in_quad(line_seg[0], map_center)
+    quad_of_line_point2 = verify_point_in_quad(line_seg[1], map_center)
+    dif_abs = abs(quad_of_line_point1 - quad_of_line_point2)
+    if dif_abs == 0:
+        return [quad_of_line_point1]
+    if dif_abs == 1 or dif_abs == 3:
+        return [quad_of_line_point1, quad_of_line_point2]
+    return [0, 1, 2, 3]
+
+# walls line segments divided by the quadrants they pass
+def get_line_segment_walls_by_quad(walls: list, map_center: list) -> list:
+    quadrants = [[], [], [], []]
+    for wall in walls:
+        for wall_section in wall:
+            for quad in get_quadrants_of_segment(wall_section.geometry.coordinates, map_center):
+                quadrants[quad].append(wall_section)
+    return quadrants
+
+# turfpy reference: distinct intersection points of a line of sight with the walls of its quadrants
+def process_line_segment(line: Feature, quadrant_array: list, walls_by_quadrant: list) -> int:
+    current_line = []
+    for quad in quadrant_array:
+        for wall in walls_by_quadrant[quad]:
+            intersection = line_intersect(line, wall)
+            if len(intersection.features) > 0 and intersection not in current_line:
+                current_line.append(intersection)
+    return len(current_line)
+
+# load config, map and walls (same steps of the first message on calculate)
+with open(f"{static_files_path}/config_files/config-params-library-ua-floor2.json") as file:
+    config_json = json.load(file)
+map_center = config_json["map"]["map_center"]
+
+with open(f"{map_objs_path}/library_ua_floor2_custom_map_2d.geojson") as file:
+    geojson_map = geojson.loads(file.read())
+
+walls = agent.catch_map_walls(geojson_map, config_json["map"]["filter_walls_keywords"], config_json["map"]["filter_walls_levels"])
+walls_by_quad = get_line_segment_walls_by_quad(walls, map_center)
+walls_array, walls_groups = compile_walls_array(walls)
+
+# lines of sight between antennas and anchors, asset points and the animation path points
+antennas_coords = np.array([f["geometry"]["coordinates"] for f in load_features("library_ua_floor2_antennas.geojson")])
+points_coords = [f["geometry"]["coordinates"] for f in load_features("library_ua_floor2_anchors.geojson")]
+points_coords += [f["geometry"]["coordinates"] for f in load_features("library_ua_floor2_asset_points.geojson")]
+points_coords += load_features("library_ua_floor2_custom_move1.geojson")[0]["geometry"]["coordinates"]
+
+lines_array = build_lines_array(np.array(points_coords), antennas_coords)
+if len(sys.argv) > 1:
+    lines_array = lines_array[:int(sys.argv[1])]
+
+lines = FeatureCollection([Feature(geometry=LineString([(line[0], line[1]), (line[2], line[3])])) for line in lines_array])
+lines_by_quad = [get_quadrants_of_segment(line.geometry.coordinates, map_center) for line in lines.features]
+
+t_start = time.perf_counter()
+expected = [process_line_segment(lines.features[i], lines_by_quad[i], walls_by_quad) for i in range(len(lines.features))]
+t_turfpy = time.perf_counter() - t_start
+
+t_start = time.perf_counter()
+result = count_wall_intersections(lines_array, walls_array, walls_groups)
+t_kernel = time.perf_counter() - t_start
+
+mismatches = np.nonzero(np.array(expected) != result)[0]
+print(f"walls: {len(walls_array)} | lines: {len(lines_array)} | turfpy: {t_turfpy:.3f} s | kernel: {t_kernel * 1000:.3f} ms | "
+      f"speedup: {t_turfpy / t_kernel:.1f}x | mismatches: {len(mismatches)}")
+for i in mismatches:
+    print("line:", lines_array[i].tolist(), "| turfpy:", expected[i], "| kernel:", result[i])
+if len(mismatches) > 0:
+    sys.exit(1)
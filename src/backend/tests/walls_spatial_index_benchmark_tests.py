@@ -0,0 +1,69 @@
+import sys
+import time
+import numpy as np
+from src.backend.src.geometry_module import build_lines_array, count_wall_intersections
+from src.backend.src.spatial_index_module import QuadrantIndex, GridIndex, meters_by_degree_lat
+
+# benchmark of the walls spatial indexes (four quadrants split vs uniform grid) on synthetic floorplans
+# run from the repository root: python -m src.backend.tests.walls_spatial_index_benchmark_tests
+
+# synthetic floorplans are centered on the library_ua_floor2 map center
+map_center = [-8.659912, 40.631228]
+
+def synthetic_floorplan(nr_rooms_by_side, room_size_m=4.0):
+    # grid of square rooms, each room with 4 wall segments (with a door gap on one of them)
+    cell_lat = room_size_m / meters_by_degree_lat
+    cell_long = room_size_m / (meters_by_degree_lat * np.cos(np.radians(map_center[1])))
+    origin_long = map_center[0] - nr_rooms_by_side * cell_long / 2
+    origin_lat = map_center[1] - nr_rooms_by_side * cell_lat / 2
+
+    walls = []
+    for i in range(nr_rooms_by_side):
+        for j in range(nr_rooms_by_side):
+            x0, y0 = origin_long + i * cell_long, origin_lat + j * cell_lat
+            x1, y1 = x0 + cell_long, y0 + cell_lat
+            walls.append((x0, y0, x1, y0))
+            walls.append((x1, y0, x1, y1))
+            walls.append((x1, y1, x0 + cell_long * 0.6, y1))
+            walls.append((x0 + cell_long * 0.3, y1, x0, y1))
+            walls.append((x0, y1, x0, y0))
+
+    walls_array = np.array(walls, dtype=float)
+    bounds = (origin_long, origin_lat, origin_long + nr_rooms_by_side * cell_long, origin_lat + nr_rooms_by_side * cell_lat)
+    return walls_array, np.arange(len(walls_array)), bounds
+
+def random_points(n, bounds, rng):
+    return np.column_stack((rng.uniform(bounds[0], bounds[2], n), rng.uniform(bounds[1], bounds[3], n)))
+
+def timed(function, repeat=3):
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - t_start) / repeat
+
+def benchmark(nr_rooms_by_side, nr_points=100, nr_antennas=10, grid_resolutions=(1, 2, 4, 8)):
+    rng = np.random.default_rng(nr_rooms_by_side)
+    walls_array, walls_groups, bounds = synthetic_floorplan(nr_rooms_by_side)
+    lines_array = build_lines_array(random_points(nr_points, bounds, rng), random_points(nr_antennas, bounds, rng))
+
+    expected, t_dense = timed(lambda: count_wall_intersections(lines_array, walls_array, walls_groups))
+    print(f"walls: {len(walls_array):6d} | lines: {len(lines_array)} | all walls: {t_dense * 1000:9.2f} ms")
+
+    indexes = [("quadrants", QuadrantIndex(walls_array, map_center))]
+    indexes += [(f"grid {resolution} m", GridIndex(walls_array, resolution)) for resolution in grid_resolutions]
+
+    total_mismatches = 0
+    for name, walls_index in indexes:
+        pairs, t_query = timed(lambda: walls_index.query_pairs(lines_array))
+        result, t_total = timed(lambda: count_wall_intersections(lines_array, walls_array, walls_groups, walls_index))
+        mismatches = int(np.sum(result != expected))
+        print(f"    {name:>10s} | tested pairs: {len(pairs[0]):9d} | query: {t_query * 1000:8.2f} ms | "
+              f"total: {t_total * 1000:9.2f} ms | mismatches: {mismatches}")
+        total_mismatches += mismatches
+    return total_mismatches
+
+if __name__ == "__main__":
+    # the indexed counts must match the counts with all the walls
+    mismatches = sum(benchmark(nr_rooms_by_side) for nr_rooms_by_side in (10, 20, 40))
+    if mismatches > 0:
+        sys.exit(1)
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from src.backend.src import main_agent_module as agent
+from src.backend.src.geometry_module import count_wall_intersections
+from src.backend.src.map_artifacts_module import save_map_artifact, load_map_artifact
+from src.backend.src.spatial_index_module import create_walls_index, load_walls_index
+from src.backend.src.worker_pool_module import WallIntersectionsPool
+
+# check the wall intersections worker pool counts the same as the serial kernel, and that a map registered while the
+# worker processes run is loaded by them on its first task (from the map artifact) without restarting the pool
+# run from the repository root: python -m src.backend.tests.worker_pool_tests
+
+nr_lines = 4000
+
+# random lines of sight over the walls bounds of a map
+def random_lines(rng: np.random.Generator, walls_array: np.ndarray, size: int) -> np.ndarray:
+    points = np.concatenate((walls_array[:, 0:2], walls_array[:, 2:4]))
+    low, high = points.min(axis=0), points.max(axis=0)
+    return np.round(np.column_stack((rng.uniform(low, high, (size, 2)), rng.uniform(low, high, (size, 2)))), 8)
+
+if __name__ == "__main__":
+    # read the static files from the local repository (the maps artifacts are compiled or loaded by the map contexts)
+    agent.host_domain_name_server = "file://" + os.path.abspath("src")
+    rng = np.random.default_rng(0)
+    pool = WallIntersectionsPool(num_cores=2, parallel_min_lines=1)
+    artifacts_dir = tempfile.TemporaryDirectory()
+
+    # maps: the library_ua_floor2 map (from its artifact), and a second map with half of its walls (artifact on a temporary directory)
+    map_context = agent.map_contexts.get(0)
+    maps = {0: agent.wall_intersections_pool.maps[0][3]}
+    walls_array, walls_groups = map_context.walls_array[::2], map_context.walls_groups[::2]
+    maps[1] = os.path.join(artifacts_dir.name, "half_walls.npz")
+    save_map_artifact(maps[1], {"walls_array": walls_array, "walls_groups": walls_groups,
+                                **create_walls_index(walls_array, map_context.config_json["map"]).get_arrays()})
+
+    results = []
+    executors = []
+    for map_id, artifact_path in maps.items():
+        arrays = load_map_artifact(artifact_path)
+        walls_array, walls_groups, walls_index = arrays["walls_array"], arrays["walls_groups"], load_walls_index(arrays)
+
+        t_start = time.perf_counter()
+        pool.register_map(map_id, walls_array, walls_groups, walls_index, artifact_path)
+        t_register = time.perf_counter() - t_start
+
+        lines_array = random_lines(rng, walls_array, nr_lines)
+        expected = count_wall_intersections(lines_array, walls_array, walls_groups, walls_index)
+        t_start = time.perf_counter()
+        first = pool.count(map_id, lines_array)
+        t_first = time.perf_counter() - t_start
+        t_start = time.perf_counter()
+        second = pool.count(map_id, lines_array)
+        t_second = time.perf_counter() - t_start
+
+        same_values = np.array_equal(first, expected) and np.array_equal(second, expected)
+        results.append(same_values)
+        executors.append(pool.executor)
+        print(f"map: {map_id} | walls: {len(walls_array)} | register: {t_register * 1000:.3f} ms | first count: {t_first * 1000:.2f} ms | "
+              f"next count: {t_second * 1000:.2f} ms | same values: {same_values}")
+
+    # the maps registered before are still served by the same worker processes
+    for map_id in maps:
+        walls_array, walls_groups, walls_index, artifact_path = pool.maps[map_id]
+        lines_array = random_lines(rng, walls_array, nr_lines)
+        results.append(np.array_equal(pool.count(map_id, lines_array), count_wall_intersections(lines_array, walls_array, walls_groups, walls_index)))
+
+    # a map registered without an artifact (the walls geometry is sent on the tasks)
+    walls_array, walls_groups, walls_index, artifact_path = pool.maps[0]
+    pool.register_map("no_artifact", walls_array, walls_groups, walls_index)
+    lines_array = random_lines(rng, walls_array, nr_lines)
+    results.append(np.array_equal(pool.count("no_artifact", lines_array), count_wall_intersections(lines_array, walls_array, walls_groups, walls_index)))
+    executors.append(pool.executor)
+
+    same_pool = all(executor is executors[0] for executor in executors)
+    print(f"same values on all the maps: {all(results)} | same worker processes: {same_pool}")
+
+    pool.shutdown()
+    agent.wall_intersections_pool.shutdown()
+    artifacts_dir.cleanup()
+    if not all(results) or not same_pool:
+        sys.exit(1)